@@ -0,0 +1,223 @@
+# --- LLM / 임베딩 백엔드 선택 ---
+# LLM_BACKEND=openai (기본) : ChatOpenAI / OpenAIEmbeddings 사용, OPENAI_API_KEY 필요
+# LLM_BACKEND=fake          : 네트워크 없이 동작하는 가짜 챗 모델 + 해싱 임베딩 (부하 테스트/벤치마크용)
+#
+# fake 백엔드 설정
+# FAKE_LLM_LATENCY      첫 토큰까지 지연 (초, 기본 0.3)
+# FAKE_LLM_TOKEN_RATE   초당 토큰 수 (기본 40)
+# FAKE_EMBEDDING_DIM    임베딩 차원 (기본 1536, 기존 Chroma 컬렉션과 같은 차원)
+# FAKE_LLM_RPM          가짜 업스트림의 분당 요청 한도, 넘으면 429 (기본 0 = 무제한, 스케줄러 시험용)
+#
+# priority: ai.llm_scheduler 우선순위 등급 (stream > chat > batch). 모든 호출이 스케줄러를 거친다.
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ai.llm_scheduler import scheduler
+
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+
+
+def is_fake_backend() -> bool:
+    return LLM_BACKEND == "fake"
+
+
+def require_api_key() -> Optional[str]:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key and not is_fake_backend():
+        raise RuntimeError("OPENAI_API_KEY is not set. (오프라인 실행은 LLM_BACKEND=fake)")
+    return api_key
+
+
+def get_chat_model(model_name: str, temperature: float = 0.7, streaming: bool = False,
+                   priority: str = "chat", **kwargs):
+    if is_fake_backend():
+        return FakeChatModel(model_name=model_name, priority=priority)
+
+    from langchain_openai import ChatOpenAI
+    from ai.llm_transport import http_clients
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        streaming=streaming,
+        api_key=require_api_key(),
+        **{**http_clients(priority), **kwargs}
+    )
+
+
+def get_embeddings(priority: str = "chat"):
+    if is_fake_backend():
+        return HashingEmbeddings()
+
+    from langchain_openai import OpenAIEmbeddings
+    from ai.llm_transport import http_clients
+    return OpenAIEmbeddings(api_key=require_api_key(), **http_clients(priority))
+
+
+# ---------------------------
+# 가짜 챗 모델
+# ---------------------------
+FAKE_MENUS = ["김치찌개", "순두부", "비빔밥", "제육덮밥", "돈가스", "칼국수", "냉면", "삼계탕"]
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def stable_hash(text: str) -> int:
+    # 파이썬 hash()는 프로세스마다 달라지므로 blake2b 사용
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def canned_recommendation(prompt: str) -> dict:
+    # 프롬프트에 메뉴 목록이 있으면 그 안에서 고르고, 없으면 기본 목록에서 고른다
+    candidates = re.findall(r"\[([^\[\]()]+?) \(", prompt) or FAKE_MENUS
+    seed = stable_hash(prompt)
+    picked = [candidates[(seed + i) % len(candidates)] for i in range(3)]
+    return {
+        "recommended_menu": picked[0],
+        "recommendation_reason": f"{picked[0]}은(는) 지금 상황과 입맛에 잘 어울리는 메뉴예요.",
+        "alternative_options": list(dict.fromkeys(picked[1:])),
+    }
+
+
+def canned_response(prompt: str) -> str:
+    if "recommended_menu" in prompt:
+        return json.dumps(canned_recommendation(prompt), ensure_ascii=False)
+    menu = canned_recommendation(prompt)["recommended_menu"]
+    return f"- {menu}: 오늘 같은 날 든든하게 먹기 좋아요.\n- 자극적이지 않아서 부담 없이 즐길 수 있어요."
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("fake upstream: rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class FakeUpstream:
+    """window초 동안 limit건을 넘으면 429를 내는 가짜 업스트림 (슬라이딩 윈도)"""
+
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.accepted = 0
+        self.rejected = 0
+        self._times = deque()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        if self.limit <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            while self._times and now - self._times[0] >= self.window:
+                self._times.popleft()
+            if len(self._times) >= self.limit:
+                self.rejected += 1
+                raise FakeRateLimitError(retry_after=self.window - (now - self._times[0]))
+            self._times.append(now)
+            self.accepted += 1
+
+
+fake_upstream = FakeUpstream(int(os.getenv("FAKE_LLM_RPM", "0")))
+
+
+class FakeChatModel(BaseChatModel):
+    """OpenAI 호출 없이 일정한 지연과 토큰 속도로 응답하는 챗 모델"""
+
+    model_name: str = "fake"
+    priority: str = "chat"
+    latency: float = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+    tokens_per_second: float = float(os.getenv("FAKE_LLM_TOKEN_RATE", "40"))
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        return TOKEN_PATTERN.findall(canned_response(prompt))
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _admit(self, tokens: List[str]):
+        # 실제 OpenAI 호출과 같은 스케줄러 경로 (대기열 → 가짜 업스트림 → 429 재시도)
+        scheduler.run(fake_upstream.admit, self.priority, len(tokens))
+
+    async def _aadmit(self, tokens: List[str]):
+        async def admit():
+            fake_upstream.admit()
+        await scheduler.arun(admit, self.priority, len(tokens))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        self._admit(tokens)
+        time.sleep(self.latency + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await self._aadmit(tokens)
+        await asyncio.sleep(self.latency + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages)
+        self._admit(tokens)
+        time.sleep(self.latency)
+        for token in tokens:
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages)
+        await self._aadmit(tokens)
+        await asyncio.sleep(self.latency)
+        for token in tokens:
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+# ---------------------------
+# 해싱 임베딩
+# ---------------------------
+class HashingEmbeddings(Embeddings):
+    """문자 n-gram을 고정 차원으로 해싱한 결정적 임베딩 (프로세스가 달라도 같은 값)"""
+
+    def __init__(self, dim: int = None, ngram_range=(1, 3)):
+        self.dim = dim or int(os.getenv("FAKE_EMBEDDING_DIM", "1536"))
+        self.ngram_range = ngram_range
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        text = " ".join(text.lower().split())
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            for i in range(len(text) - n + 1):
+                h = stable_hash(text[i:i + n])
+                sign = 1.0 if (h >> 63) & 1 else -1.0
+                vector[h % self.dim] += sign
+
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
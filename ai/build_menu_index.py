@@ -0,0 +1,234 @@
+# --- 메뉴 카탈로그 → 벡터 인덱스 증분 빌드 ---
+# 실행: python -m ai.build_menu_index --store numpy|chroma|all
+#
+# 메뉴마다 문서 하나를 만들고 본문+메타데이터의 해시로 변경 여부를 판단한다.
+# 재실행하면 바뀐/추가된 메뉴만 다시 임베딩하고, 카탈로그에서 빠진 메뉴는 삭제한다.
+# 빌드가 끝나면 manifest.json에 카탈로그 버전을 기록하고,
+# 서버는 시작할 때 check_index_manifest()로 인덱스가 현재 카탈로그와 맞는지 확인한다.
+# 임베딩 비용이 큰 빌드는 이 스크립트로만 한다 (서버 import 시점에는 빌드하지 않음).
+
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from ai.backends import LLM_BACKEND, get_embeddings
+from ai.menu_catalog import CATALOG_PATH, catalog_version, load_catalog, render_menu_document
+from ai.vector_index import VECTORS_FILE, NumpyVectorIndex, index_path_for, open_vector_store, vector_store_kind
+
+MENU_DB_PATH = "./chroma_db/menu_db"
+MANIFEST_FILE = "manifest.json"
+BATCH_SIZE = 64
+CONCURRENCY = 4
+
+
+def content_hash(page_content: str, metadata: dict) -> str:
+    payload = page_content + json.dumps(metadata, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def embedding_name(embedding) -> str:
+    model = getattr(embedding, "model", None) or getattr(embedding, "dim", "")
+    return f"{LLM_BACKEND}:{type(embedding).__name__}:{model}"
+
+
+def read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(directory: str, manifest: dict):
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+
+
+def check_index_manifest(directory: str, catalog_path: str = CATALOG_PATH) -> bool:
+    manifest = read_manifest(directory)
+    if not manifest:
+        print(f"⚠️ {directory}: 인덱스 manifest가 없습니다. python -m ai.build_menu_index 로 빌드하세요.")
+        return False
+    current = catalog_version(catalog_path)
+    if manifest.get("catalog_version") != current:
+        print(f"⚠️ {directory}: 인덱스 카탈로그 버전({manifest.get('catalog_version')})이 "
+              f"현재 카탈로그({current})와 다릅니다. 인덱스를 다시 빌드하세요.")
+        return False
+    return True
+
+
+def index_directory(store: str, persist_directory: str = MENU_DB_PATH) -> str:
+    return index_path_for(persist_directory) if store == "numpy" else persist_directory
+
+
+class MenuIndexNotBuilt(RuntimeError):
+    pass
+
+
+def open_menu_index(router: str, persist_directory: str = MENU_DB_PATH):
+    """라우터용 메뉴 인덱스를 열고 manifest를 확인한다. 빌드된 적이 없으면 MenuIndexNotBuilt."""
+    from langchain_chroma import Chroma
+
+    store = vector_store_kind(router)
+    directory = index_directory(store, persist_directory)
+    if not read_manifest(directory):
+        raise MenuIndexNotBuilt(f"{directory}: 메뉴 인덱스가 없습니다. "
+                                f"python -m ai.build_menu_index --store {store} 로 먼저 빌드하세요.")
+    check_index_manifest(directory)
+    return open_vector_store(router, persist_directory, Chroma, get_embeddings())
+
+
+def catalog_documents(catalog_path: str):
+    df = load_catalog(catalog_path)
+    entries = {}
+    for _, row in df.iterrows():
+        page_content, metadata = render_menu_document(row)
+        doc_id = f"menu-{metadata['menu_id']}"
+        entries[doc_id] = (Document(page_content=page_content, metadata=metadata), content_hash(page_content, metadata))
+    return entries
+
+
+async def embed_in_batches(embedding, texts: list[str], batch_size: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed(batch):
+        async with semaphore:
+            return await embedding.aembed_documents(batch)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+def embed_texts(embedding, texts: list[str], batch_size: int, concurrency: int) -> list:
+    if not texts:
+        return []
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(embed_in_batches(embedding, texts, batch_size, concurrency))
+
+    # 서버 기동 중(이벤트 루프 안)에 호출되면 별도 스레드에서 실행
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, embed_in_batches(embedding, texts, batch_size, concurrency)).result()
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """embed_texts로 미리(동시에) 계산한 벡터를 돌려준다. Chroma 공개 API(add_documents)에 벡터를 넘기는 용도"""
+
+    def __init__(self, vectors: dict, embedding):
+        self.vectors = vectors
+        self.embedding = embedding
+
+    def embed_documents(self, texts: list[str]) -> list:
+        missing = [t for t in texts if t not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.embedding.embed_documents(missing)))
+        return [list(self.vectors[t]) for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self.embedding.embed_query(text)
+
+
+def plan_changes(entries: dict, manifest: dict, embedding) -> tuple[list, list]:
+    """(다시 임베딩할 id 목록, 삭제할 id 목록)"""
+    previous = manifest.get("documents", {})
+    if manifest.get("embedding") != embedding_name(embedding):
+        return list(entries), [doc_id for doc_id in previous if doc_id not in entries]
+
+    changed = [doc_id for doc_id, (_, h) in entries.items() if previous.get(doc_id) != h]
+    removed = [doc_id for doc_id in previous if doc_id not in entries]
+    return changed, removed
+
+
+def build_numpy_index(entries, embedding, directory, batch_size, concurrency) -> dict:
+    manifest = read_manifest(directory)
+    changed, removed = plan_changes(entries, manifest, embedding)
+
+    # 변경 없는 문서는 기존 벡터를 재사용
+    existing = {}
+    if manifest and os.path.exists(os.path.join(directory, VECTORS_FILE)):
+        old = NumpyVectorIndex(directory, embedding, mmap=False)
+        existing = {doc_id: old.vectors[i] for i, doc_id in enumerate(old.ids)}
+        changed = sorted(set(changed) | (set(entries) - set(existing)))
+
+    new_vectors = embed_texts(
+        embedding, [entries[doc_id][0].page_content for doc_id in changed], batch_size, concurrency
+    )
+    existing.update(zip(changed, (np.asarray(v, dtype=np.float32) for v in new_vectors)))
+
+    ids = list(entries)
+    NumpyVectorIndex.write(directory, ids, [entries[i][0] for i in ids], np.stack([existing[i] for i in ids]))
+    return {"embedded": len(changed), "removed": len(removed)}
+
+
+def build_chroma_index(entries, embedding, directory, batch_size, concurrency) -> dict:
+    from langchain_chroma import Chroma
+
+    manifest = read_manifest(directory)
+    changed, removed = plan_changes(entries, manifest, embedding)
+
+    # numpy 경로처럼 임베딩은 concurrency개 배치씩 동시에 계산해 두고,
+    # Chroma에는 계산된 벡터를 돌려주는 임베딩 함수를 넘겨 공개 API(add_documents)로 넣는다
+    texts = [entries[doc_id][0].page_content for doc_id in changed]
+    vectors = dict(zip(texts, embed_texts(embedding, texts, batch_size, concurrency)))
+    chroma = Chroma(persist_directory=directory, embedding_function=PrecomputedEmbeddings(vectors, embedding))
+
+    if not manifest:
+        # 예전 샘플 메뉴 등 manifest에 없는 문서는 모두 정리
+        stale = [doc_id for doc_id in chroma.get()["ids"] if doc_id not in entries]
+        removed = sorted(set(removed) | set(stale))
+    if removed:
+        chroma.delete(ids=removed)
+
+    # 같은 id면 덮어쓴다
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        chroma.add_documents([entries[i][0] for i in batch], ids=batch)
+    return {"embedded": len(changed), "removed": len(removed)}
+
+
+def build_menu_index(store: str = "numpy", catalog_path: str = CATALOG_PATH, persist_directory: str = MENU_DB_PATH,
+                     batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY) -> dict:
+    embedding = get_embeddings(priority="batch")
+    entries = catalog_documents(catalog_path)
+
+    directory = index_directory(store, persist_directory)
+    build = build_numpy_index if store == "numpy" else build_chroma_index
+    stats = build(entries, embedding, directory, batch_size, concurrency)
+
+    write_manifest(directory, {
+        "catalog_path": catalog_path,
+        "catalog_version": catalog_version(catalog_path),
+        "embedding": embedding_name(embedding),
+        "count": len(entries),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "documents": {doc_id: h for doc_id, (_, h) in entries.items()},
+    })
+    print(f"✅ {store} 인덱스 빌드 완료: {directory} (전체 {len(entries)}건, "
+          f"임베딩 {stats['embedded']}건, 삭제 {stats['removed']}건)")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", choices=["numpy", "chroma", "all"], default="all")
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--persist-directory", default=MENU_DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    for store in (["numpy", "chroma"] if args.store == "all" else [args.store]):
+        build_menu_index(store, args.catalog, args.persist_directory, args.batch_size, args.concurrency)
@@ -0,0 +1,184 @@
+# --- SQLite 기반 대화 기록 (여러 uvicorn 워커가 공유) ---
+# 대화 기록을 프로세스 메모리 대신 앱 DB(chat_sessions / chat_messages 테이블)에 저장해
+# 다음 메시지가 다른 워커로 가도 문맥이 이어지도록 한다. (sticky session 불필요)
+#
+# - 한 턴의 메시지(사용자+AI)는 add_messages()로 한 트랜잭션에 함께 기록
+# - 요약/잘라내기는 replace_messages()로 삭제+재기록을 한 트랜잭션에서 처리 (중간에 빈 기록이 보이지 않음)
+# - 읽기는 프로세스 내 캐시를 먼저 보고, DB의 (메시지 수, 마지막 id)가 달라졌을 때만
+#   새로 추가된 행을 읽어온다 (다른 워커가 쓴 메시지도 반영됨)
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import messages_from_dict, message_to_dict
+from sqlalchemy import func
+
+from ai import metrics
+from models import ChatMessage, ChatSession, SessionLocal, engine
+
+CACHE_SIZE = int(os.getenv("CHAT_HISTORY_CACHE_SIZE", "512"))
+PURGE_INTERVAL = 60.0
+
+# 여러 프로세스가 동시에 읽고 쓸 수 있도록 WAL 모드 사용
+with engine.connect() as conn:
+    conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # session_id -> (마지막 메시지 id, 메시지 목록)
+_purge_ttl = None
+_purger = None
+
+
+def _cache_put(session_id: str, last_id, messages: list):
+    with _lock:
+        _cache[session_id] = (last_id, messages)
+        _cache.move_to_end(session_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cache_drop(session_id: str):
+    with _lock:
+        _cache.pop(session_id, None)
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+    @property
+    def messages(self):
+        return self.snapshot()[1]
+
+    def snapshot(self) -> tuple:
+        """(마지막 메시지 id, 메시지 목록) — 마지막 id는 replace_messages()에 넘기는 버전"""
+        with SessionLocal() as db:
+            count, last_id = db.query(func.count(ChatMessage.id), func.max(ChatMessage.id)).filter(
+                ChatMessage.session_id == self.session_id
+            ).one()
+            with _lock:
+                cached = _cache.get(self.session_id)
+            if cached and cached[0] == last_id and len(cached[1]) == count:
+                metrics.incr("chat_history.cache_hit")
+                return last_id, list(cached[1])
+
+            metrics.incr("chat_history.cache_miss")
+            # last_id 이후 행은 읽지 않는다 (스냅샷과 버전이 어긋나면 replace_messages에서 중복됨)
+            query = db.query(ChatMessage.id, ChatMessage.message).filter(
+                ChatMessage.session_id == self.session_id, ChatMessage.id <= (last_id or 0)
+            )
+            if cached and cached[0] is not None:
+                # 뒤에 추가된 행만 읽고, 개수가 안 맞으면(삭제/정리됨) 전체를 다시 읽는다
+                rows = query.filter(ChatMessage.id > cached[0]).order_by(ChatMessage.id).all()
+                if len(cached[1]) + len(rows) == count:
+                    messages = cached[1] + messages_from_dict([json.loads(m) for _, m in rows])
+                    _cache_put(self.session_id, last_id, messages)
+                    return last_id, list(messages)
+
+            rows = query.order_by(ChatMessage.id).all()
+            messages = messages_from_dict([json.loads(m) for _, m in rows])
+            _cache_put(self.session_id, last_id, messages)
+            return last_id, list(messages)
+
+    def add_messages(self, messages) -> None:
+        with SessionLocal() as db:
+            db.bulk_insert_mappings(ChatMessage, [
+                {"session_id": self.session_id, "message": json.dumps(message_to_dict(m), ensure_ascii=False)}
+                for m in messages
+            ])
+            db.query(ChatSession).filter(ChatSession.session_id == self.session_id).update(
+                {ChatSession.last_used: time.time()}
+            )
+            db.commit()
+
+    def replace_messages(self, messages, last_id) -> list:
+        """snapshot()으로 읽은 기록(last_id까지)을 messages로 바꾸고 최종 기록을 반환한다.
+        그 뒤에 다른 워커가 추가한 턴은 버리지 않고 messages 뒤에 다시 이어 붙인다."""
+        session = ChatMessage.session_id == self.session_id
+        with SessionLocal() as db:
+            # 삭제를 먼저 해서 쓰기 잠금을 잡은 뒤 읽으므로, 커밋 전까지 끼어드는 턴이 없다
+            db.query(ChatMessage).filter(session, ChatMessage.id <= (last_id or 0)).delete(synchronize_session=False)
+            rows = db.query(ChatMessage.message).filter(session).order_by(ChatMessage.id).all()
+            newer = messages_from_dict([json.loads(m) for (m,) in rows])
+            db.query(ChatMessage).filter(session).delete(synchronize_session=False)
+            db.bulk_insert_mappings(ChatMessage, [
+                {"session_id": self.session_id, "message": json.dumps(message_to_dict(m), ensure_ascii=False)}
+                for m in list(messages) + newer
+            ])
+            db.commit()
+        _cache_drop(self.session_id)
+        return list(messages) + newer
+
+    def clear(self) -> None:
+        with SessionLocal() as db:
+            db.query(ChatMessage).filter(ChatMessage.session_id == self.session_id).delete()
+            db.commit()
+        _cache_drop(self.session_id)
+
+
+# ---------------------------
+# 세션 소유자/마지막 사용 시각 (ConversationStore가 사용)
+# ---------------------------
+def save_session(session_id: str, owner: str):
+    with SessionLocal() as db:
+        db.merge(ChatSession(session_id=session_id, owner=owner, last_used=time.time()))
+        db.commit()
+
+
+def load_session(session_id: str):
+    """(owner, last_used) 또는 None"""
+    with SessionLocal() as db:
+        row = db.query(ChatSession.owner, ChatSession.last_used).filter(
+            ChatSession.session_id == session_id
+        ).first()
+    return tuple(row) if row else None
+
+
+def delete_session(session_id: str) -> bool:
+    with SessionLocal() as db:
+        db.query(ChatMessage).filter(ChatMessage.session_id == session_id).delete()
+        deleted = db.query(ChatSession).filter(ChatSession.session_id == session_id).delete()
+        db.commit()
+    _cache_drop(session_id)
+    return deleted > 0
+
+
+def purge_expired(ttl_seconds: float):
+    """TTL이 지난 세션을 DB에서 삭제"""
+    now = time.time()
+    with SessionLocal() as db:
+        expired = [sid for (sid,) in db.query(ChatSession.session_id).filter(
+            ChatSession.last_used < now - ttl_seconds
+        ).all()]
+        if expired:
+            db.query(ChatMessage).filter(ChatMessage.session_id.in_(expired)).delete(synchronize_session=False)
+            db.query(ChatSession).filter(ChatSession.session_id.in_(expired)).delete(synchronize_session=False)
+            db.commit()
+    for session_id in expired:
+        _cache_drop(session_id)
+    if expired:
+        metrics.incr("chat_history.purged_sessions", len(expired))
+
+
+def _purge_loop():
+    while True:
+        time.sleep(PURGE_INTERVAL)
+        try:
+            purge_expired(_purge_ttl)
+        except Exception as e:
+            print(f"⚠️ chat_history: 만료 세션 정리 실패 ({e})")
+
+
+def start_purger(ttl_seconds: float):
+    """워커마다 PURGE_INTERVAL 간격으로 만료 세션을 지우는 백그라운드 스레드 (요청 경로에서는 정리하지 않음).
+    저장소가 여러 개면 아직 유효한 세션을 지우지 않도록 가장 긴 TTL 기준."""
+    global _purge_ttl, _purger
+    with _lock:
+        _purge_ttl = ttl_seconds if _purge_ttl is None else max(_purge_ttl, ttl_seconds)
+        if _purger is None:
+            _purger = threading.Thread(target=_purge_loop, name="chat-history-purge", daemon=True)
+            _purger.start()
@@ -1,24 +1,31 @@
 # --- FastAPI 기반 상황 기반 메뉴 추천 API (정교화된 버전) ---
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models import SessionLocal, User, Feedback
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from dotenv import load_dotenv
+from ai.backends import get_chat_model, require_api_key
+from ai.conversation_store import ConversationStore
+from ai import metrics
+from ai.hybrid_retrieval import extract_situation_tags
+from ai.menu_catalog import catalog_version
+from ai.prompt_budget import full_menu_tokens, select_menu_candidates
+from ai.prompt_cache import cached_fragment, profile_block, signature
+from ai.sse import SSEMessage, stream_events, sse_response, sse_error_response
 import pandas as pd
 import traceback
+import time
 from collections import Counter
+from functools import lru_cache
 import os
+from typing import Optional
 
 # 환경 변수 로드
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set.")
+OPENAI_API_KEY = require_api_key()
 
 # 라우터 생성
 router = APIRouter(prefix="/api")
@@ -32,61 +39,62 @@ def get_db():
         db.close()
 
 # CSV 로드 및 파싱
-menu_df = pd.read_csv("./data/final_menu_data_with_emotion.csv")
+MENU_CSV_PATH = "./data/final_menu_data_with_emotion.csv"
+menu_df = pd.read_csv(MENU_CSV_PATH)
 menu_df["disease"] = menu_df["disease"].apply(eval)
-
-# 상황 키워드 -> 감성 태그 매핑
-def extract_situation_tags(situation: str) -> list[str]:
-    mapping = {
-        "매콤": ["매움"],
-        "해장": ["속풀이"],
-        "꿀꿀": ["단맛", "중독성"],
-        "가볍": ["가성비", "양많음"],
-        "친구": ["분위기좋음", "특별함"],
-        "추워": ["속풀이"],
-        "덥": ["가성비"],
-        "달달": ["단맛"],
-        "배고": ["양많음"],
-        "야식": ["야식"]
-    }
-    tags = set()
-    for keyword, tag_list in mapping.items():
-        if keyword in situation:
-            tags.update(tag_list)
-    return list(tags)
+MENU_CATALOG_VERSION = catalog_version(MENU_CSV_PATH)
 
 # 위험한 메뉴 제외 함수
 def filter_menu_by_disease(df: pd.DataFrame, diseases: list[str]) -> pd.DataFrame:
     return df[~df['disease'].apply(lambda risks: any(d in risks for d in diseases))]
 
+# (식당, 메뉴)별 좋아요-싫어요 점수 (DB에서 집계)
+def load_feedback_scores(db: Session) -> dict:
+    rows = (
+        db.query(Feedback.place_name, Feedback.menu_name, Feedback.feedback, func.count(Feedback.id))
+        .group_by(Feedback.place_name, Feedback.menu_name, Feedback.feedback)
+        .all()
+    )
+    scores = Counter()
+    for place_name, menu_name, feedback, count in rows:
+        if feedback == "good":
+            scores[(place_name, menu_name)] += count
+        elif feedback == "bad":
+            scores[(place_name, menu_name)] -= count
+    return {key: score for key, score in scores.items() if score}
+
 # 피드백 점수 계산 함수
-def apply_feedback_weights(df: pd.DataFrame, db: Session) -> pd.DataFrame:
-    feedbacks = db.query(Feedback).all()
-    good_counts = Counter((f.place_name, f.menu_name) for f in feedbacks if f.feedback == "good")
-    bad_counts = Counter((f.place_name, f.menu_name) for f in feedbacks if f.feedback == "bad")
+def apply_feedback_weights(df: pd.DataFrame, scores: dict) -> pd.DataFrame:
+    keys = list(zip(df["place_name"], df["menu_name"]))
+    df = df.copy()
+    df["feedback_score"] = [scores.get(key, 0) for key in keys]
+    return df.sort_values(by="feedback_score", ascending=False, kind="stable")
 
-    def compute_score(row):
-        key = (row["place_name"], row["menu_name"])
-        return good_counts[key] - bad_counts[key]
+# 예산 적용 전 메뉴 목록 토큰 수 (비교용 지표). 피드백 정렬과 무관하므로 카탈로그 버전 + 지병 집합당 한 번만 계산
+@lru_cache(maxsize=256)
+def full_menu_tokens_for(catalog_version: str, diseases: tuple) -> int:
+    return full_menu_tokens(filter_menu_by_disease(menu_df, list(diseases)))
 
-    df = df.copy()
-    df["feedback_score"] = df.apply(compute_score, axis=1)
-    return df.sort_values(by="feedback_score", ascending=False)
+# 지병 집합/상황 태그/카탈로그 버전/피드백이 같으면 같은 메뉴 목록 문자열을 재사용
+def build_menu_list(diseases: list[str], situation_tags: list[str], db: Session) -> str:
+    scores = load_feedback_scores(db)
+    key = signature(diseases, situation_tags, MENU_CATALOG_VERSION, sorted((list(k), v) for k, v in scores.items()))
+
+    def render():
+        scored_menu_df = apply_feedback_weights(filter_menu_by_disease(menu_df, diseases), scores)
+        menu_list_str, budget_stats = select_menu_candidates(scored_menu_df, situation_tags)
+        metrics.observe("chatbot_stream.menu_tokens_full",
+                        full_menu_tokens_for(MENU_CATALOG_VERSION, tuple(sorted(set(diseases)))))
+        metrics.observe("chatbot_stream.menu_tokens_selected", budget_stats["selected_tokens"])
+        return menu_list_str
+
+    return cached_fragment("menu_list", key, render)
 
 # GPT 추천 시스템
 class MenuRecommendationSystem:
-    def __init__(self, api_key, menu_list):
-        self.menu_list = menu_list
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o",
-            temperature=0.7,
-            api_key=api_key,
-            streaming=True
-        )
-        self.conversation_stores = {}
-
-        self.prompt_template = ChatPromptTemplate.from_messages([
-            ("system", f"""
+    # 고정 지시문 → 메뉴 목록 → 사용자별 정보 순서로 두어 앞부분이 요청 간에 바이트 단위로 같도록 한다
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", """
 You are the AI chatbot for the Korean food recommendation app \"Today's Menu\".
 
 [Instructions]
@@ -95,37 +103,41 @@ You are the AI chatbot for the Korean food recommendation app \"Today's Menu\".
 - If recommending a dish, provide a short emotional reason (based on 감성 키워드).
 
 [Allowed Menu and Restaurant List]
-{self.menu_list}
+{menu_list}
 
 [Input Info]
-User Profile: {{user_profile}}
-Weather: {{weather}}
-User Message: {{input}}
+User Profile: {user_profile}
+Weather: {weather}
+User Message: {input}
 """),
-            MessagesPlaceholder(variable_name="history"),
-            ("human", "{input}")
-        ])
+        MessagesPlaceholder(variable_name="history"),
+        ("human", "{input}")
+    ])
 
-    def get_session_history(self, session_id: str):
-        if session_id not in self.conversation_stores:
-            self.conversation_stores[session_id] = InMemoryChatMessageHistory()
-        return self.conversation_stores[session_id]
+    def __init__(self):
+        self.llm = get_chat_model("gpt-4o", temperature=0.7, streaming=True, priority="stream")
+        self.conversation_store = ConversationStore("chatbot_stream_conversations")
+        self.conversation = self.create_conversation_chain()
 
     def create_conversation_chain(self):
         chain = self.prompt_template | self.llm
         return RunnableWithMessageHistory(
             chain,
-            self.get_session_history,
+            self.conversation_store.history_for,
             input_messages_key="input",
             history_messages_key="history",
         )
 
+recommendation_system = MenuRecommendationSystem()
+
 # 추천 API
 @router.get("/llm-recommend-stream")
 async def llm_recommend_stream(
+    request: Request,
     user_id: int,
     weather: str,
     situation: str,
+    conversation_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     try:
@@ -138,73 +150,46 @@ async def llm_recommend_stream(
         dislikes = [p.menu_name for p in user.preferences if p.preference_type == "비선호"]
         user_diseases = [d.disease for d in user.diseases]
 
-        user_profile = f"알레르기: {', '.join(allergies) if allergies else '없음'} / 선호 재료: {', '.join(likes) if likes else '없음'} / 비선호 재료: {', '.join(dislikes) if dislikes else '없음'} / 질병: {', '.join(user_diseases) if user_diseases else '없음'}"
+        user_profile = profile_block(allergies, user_diseases, likes, dislikes)
+        menu_list_str = build_menu_list(user_diseases, extract_situation_tags(situation), db)
 
-        safe_menu_df = filter_menu_by_disease(menu_df, user_diseases)
-        scored_menu_df = apply_feedback_weights(safe_menu_df, db)
-
-        situation_tags = extract_situation_tags(situation)
-        relevant_menu_df = scored_menu_df[
-            scored_menu_df["top_tags"].apply(lambda x: any(tag in str(x) for tag in situation_tags))
-        ]
-
-        fallback_df = relevant_menu_df if not relevant_menu_df.empty else scored_menu_df
-
-        menu_list_str = "\n".join(
-            f"- [{row['menu_name']} ({row['place_name']})]({row['url']}) - 감성: {row['top_tags']}"
-            for _, row in fallback_df[['place_name', 'menu_name', 'url', 'top_tags']].drop_duplicates().iterrows()
-        )
-
-        recommendation_system = MenuRecommendationSystem(OPENAI_API_KEY, menu_list_str)
-        conversation = recommendation_system.create_conversation_chain()
+        # 같은 사용자의 conversation_id가 유효하면 이어서, 아니면 새 세션 (응답 헤더로 전달)
+        conversation_store = recommendation_system.conversation_store
+        session_id, _ = conversation_store.get_or_create(conversation_id, user_id)
 
         async def generate():
-            try:
-                if user_diseases:
-                    yield f"data: ⚠️ {', '.join(user_diseases)}에 따라 위험 메뉴를 제외하고 추천해드릴게요.\n\n"
-
-                response_generator = conversation.astream(
-                    {
-                        "input": situation,
-                        "user_profile": user_profile,
-                        "weather": weather or "날씨 정보 없음"
-                    },
-                    config={"configurable": {"session_id": "streaming_session"}}
-                )
+            started = time.perf_counter()
+            first_token = True
+            if user_diseases:
+                yield SSEMessage(f"⚠️ {', '.join(user_diseases)}에 따라 위험 메뉴를 제외하고 추천해드릴게요.")
+
+            response_generator = recommendation_system.conversation.astream(
+                {
+                    "input": situation,
+                    "menu_list": menu_list_str,
+                    "user_profile": user_profile,
+                    "weather": weather or "날씨 정보 없음"
+                },
+                config={"configurable": {"session_id": session_id}}
+            )
 
+            try:
                 async for chunk in response_generator:
-                    content = chunk.content if hasattr(chunk, 'content') else str(chunk)
-                    yield f"data: {content}\n\n"
-
-                yield f"data: [END]\n\n"
-            except Exception as e:
-                traceback.print_exc()
-                yield f"data: 추천 중 오류가 발생했어요. 다시 시도해 주세요.\n\n"
-                yield f"data: [END]\n\n"
-
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-            }
+                    if first_token:
+                        first_token = False
+                        metrics.observe("chatbot_stream.ttft_ms", (time.perf_counter() - started) * 1000)
+                    yield chunk.content if hasattr(chunk, 'content') else str(chunk)
+            finally:
+                conversation_store.trim(session_id)
+
+        return sse_response(
+            stream_events(
+                generate(), "추천 중 오류가 발생했어요. 다시 시도해 주세요.",
+                name="chatbot_stream", request=request
+            ),
+            headers={"X-Conversation-Id": session_id}
         )
 
     except Exception as e:
         traceback.print_exc()
-
-        async def error_response():
-            yield f"data: 서버 오류가 발생했습니다.\n\n"
-            yield f"data: [END]\n\n"
-
-        return StreamingResponse(
-            error_response(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-            }
-        )
+        return sse_error_response("서버 오류가 발생했습니다.")
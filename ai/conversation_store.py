@@ -0,0 +1,231 @@
+# --- 크기/수명이 제한된 대화 기록 저장소 ---
+# 챗봇 대화 기록을 사용자별 세션 id로 보관하되
+#   - 최대 세션 수를 넘으면 가장 오래 안 쓴 세션부터 제거 (LRU)
+#   - 마지막 사용 후 TTL이 지나면 제거
+#   - 세션당 토큰 상한을 넘으면 오래된 메시지부터 잘라냄
+# 해서 오래 떠 있는 워커의 메모리가 계속 늘지 않도록 한다.
+#
+# CONVERSATION_MAX_SESSIONS   최대 세션 수 (기본 1000)
+# CONVERSATION_TTL_SECONDS    유휴 세션 만료 시간 (기본 1800초)
+# CONVERSATION_MAX_TOKENS     세션당 기록 토큰 상한 (기본 2000)
+# CHAT_HISTORY_BACKEND        memory(기본, 워커별 메모리) | sqlite(워커 간 공유, ai.chat_history)
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+
+from ai import metrics
+from ai.prompt_budget import estimate_tokens
+
+MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "1800"))
+MAX_TOKENS = int(os.getenv("CONVERSATION_MAX_TOKENS", "2000"))
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "memory").lower()
+
+
+def message_tokens(message) -> int:
+    return estimate_tokens(str(message.content))
+
+
+def is_summary(message) -> bool:
+    """ai.summary_memory가 기록 맨 앞에 넣는 요약 메시지인지"""
+    return message.additional_kwargs.get("summary", False)
+
+
+@dataclass
+class Session:
+    owner: str
+    history: BaseChatMessageHistory
+    last_used: float = field(default_factory=time.time)
+    tokens: int = 0
+
+
+class ConversationStore:
+    def __init__(self, name: str, max_sessions: int = MAX_SESSIONS, ttl_seconds: float = TTL_SECONDS,
+                 max_tokens: int = MAX_TOKENS, backend: str = CHAT_HISTORY_BACKEND):
+        self.name = name
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        # sqlite: 메시지와 세션 소유자를 DB에 두고, 로컬 dict는 캐시로만 사용
+        self.persistent = None
+        if backend == "sqlite":
+            from ai import chat_history
+            self.persistent = chat_history
+            chat_history.start_purger(ttl_seconds)
+        self._sessions = OrderedDict()  # 마지막 사용 순서 (앞쪽이 가장 오래됨)
+        self._lock = threading.Lock()
+        self._total_tokens = 0
+
+    def new_session_id(self, owner) -> str:
+        return f"conv_{owner}_{uuid.uuid4().hex[:12]}"
+
+    def new_history(self, session_id: str) -> BaseChatMessageHistory:
+        if self.persistent:
+            return self.persistent.SQLiteChatMessageHistory(session_id)
+        return InMemoryChatMessageHistory()
+
+    def _load_persistent(self, session_id: str):
+        """다른 워커에서 만든 세션을 DB에서 찾는다 (DB I/O라 저장소 락 밖에서 호출)"""
+        row = self.persistent.load_session(session_id)
+        if row is None or row[1] < time.time() - self.ttl_seconds:
+            return None
+        owner, last_used = row
+        return Session(owner=owner, history=self.new_history(session_id), last_used=last_used)
+
+    def _touch(self, session_id: str, session: Session, owner):
+        if owner is not None and session.owner != str(owner):
+            return None
+        session.last_used = time.time()
+        self._sessions.move_to_end(session_id)
+        return session.history
+
+    def get(self, session_id: str, owner=None):
+        """세션 기록을 반환한다. 없거나 만료됐거나 다른 사용자의 세션이면 None"""
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return self._touch(session_id, session, owner)
+        if not self.persistent:
+            return None
+
+        loaded = self._load_persistent(session_id)
+        if loaded is None:
+            return None
+        with self._lock:
+            # DB를 읽는 사이 다른 요청이 같은 세션을 등록했으면 그쪽을 쓴다
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = loaded
+                self._evict_lru()
+                self._update_gauges()
+            return self._touch(session_id, session, owner)
+
+    def get_or_create(self, session_id, owner) -> tuple[str, BaseChatMessageHistory]:
+        """(세션 id, 기록) — 요청한 세션이 유효하지 않으면 새 세션을 만든다."""
+        history = self.get(session_id, owner) if session_id else None
+        if history is not None:
+            return session_id, history
+
+        session_id = self.new_session_id(owner)
+        session = Session(owner=str(owner), history=self.new_history(session_id))
+        if self.persistent:
+            self.persistent.save_session(session_id, str(owner))
+        with self._lock:
+            self._evict_expired()
+            self._sessions[session_id] = session
+            self._evict_lru()
+            self._update_gauges()
+        return session_id, session.history
+
+    def history_for(self, session_id: str) -> BaseChatMessageHistory:
+        """RunnableWithMessageHistory용 (get_or_create로 만든 세션만 조회)"""
+        history = self.get(session_id)
+        return history if history is not None else self.new_history(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._total_tokens -= session.tokens
+            self._update_gauges()
+        if self.persistent:
+            return self.persistent.delete_session(session_id)
+        return session is not None
+
+    def rewrite(self, session_id: str, transform) -> bool:
+        """기록을 transform(messages) 결과로 교체한다. (None이면 그대로 둠)
+        기록 읽기/쓰기는 저장소 락 밖에서 하고, 읽은 뒤 추가된 턴은 교체 결과 뒤에 남는다."""
+        session = self._cached(session_id)
+        if session is None:
+            return False
+        version, messages = self._snapshot(session.history)
+        replaced = transform(messages)
+        if replaced is None:
+            return False
+        self._replace(session_id, session, version, replaced)
+        return True
+
+    def trim(self, session_id: str):
+        """대화가 끝난 뒤 호출: 토큰 상한을 넘는 만큼 오래된 메시지를 버린다. (맨 앞 요약은 유지)"""
+        session = self._cached(session_id)
+        if session is None:
+            return
+        version, messages = self._snapshot(session.history)
+        counts = [message_tokens(m) for m in messages]
+        tokens = sum(counts)
+        start = 1 if messages and is_summary(messages[0]) else 0
+        dropped = start
+        while tokens > self.max_tokens and dropped < len(messages):
+            tokens -= counts[dropped]
+            dropped += 1
+
+        if dropped > start:
+            self._replace(session_id, session, version, messages[:start] + messages[dropped:])
+            metrics.incr(f"{self.name}.trimmed_messages", dropped - start)
+        else:
+            with self._lock:
+                if self._sessions.get(session_id) is session:
+                    self._count_tokens(session, messages)
+
+    def _cached(self, session_id: str):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _snapshot(self, history) -> tuple:
+        """(버전, 메시지 목록). 버전은 sqlite면 마지막 메시지 id, 메모리면 메시지 수"""
+        if self.persistent:
+            return history.snapshot()
+        messages = list(history.messages)
+        return len(messages), messages
+
+    def _replace(self, session_id: str, session: Session, version, messages: list):
+        if self.persistent:
+            # 삭제+재기록을 한 트랜잭션으로 (DB I/O라 저장소 락 밖에서)
+            final = session.history.replace_messages(messages, version)
+            with self._lock:
+                if self._sessions.get(session_id) is session:
+                    self._count_tokens(session, final)
+            return
+        with self._lock:
+            # 메모리 기록은 목록을 통째로 바꿔 끼운다 (읽은 뒤 추가된 메시지는 뒤에 유지)
+            session.history.messages = list(messages) + session.history.messages[version:]
+            if self._sessions.get(session_id) is session:
+                self._count_tokens(session, session.history.messages)
+
+    def _count_tokens(self, session: Session, messages: list):
+        tokens = sum(message_tokens(m) for m in messages)
+        self._total_tokens += tokens - session.tokens
+        session.tokens = tokens
+        self._update_gauges()
+
+    def _evict_lru(self):
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            self._total_tokens -= evicted.tokens
+            metrics.incr(f"{self.name}.evicted_lru")
+
+    def _evict_expired(self):
+        # 로컬 캐시만 정리한다. DB의 만료 세션은 chat_history의 백그라운드 스레드가 주기적으로 삭제
+        deadline = time.time() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used > deadline:
+                break
+            self._sessions.popitem(last=False)
+            self._total_tokens -= session.tokens
+            metrics.incr(f"{self.name}.evicted_ttl")
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.gauge(f"{self.name}.sessions", len(self._sessions))
+        metrics.gauge(f"{self.name}.tokens", self._total_tokens)
+
+    def __len__(self):
+        return len(self._sessions)
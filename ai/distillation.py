@@ -0,0 +1,172 @@
+# --- LLM 추천 증류: (요청 서명 → 추천 메뉴) 기록 + 로컬 학생 모델 fast 모드 ---
+# /ai/recommend (ai.improved_ai_model), /menu/llm-recommend (ai.langchain_recommender) 의 gpt-4o 응답은
+# 프로필/상황으로 꽤 예측 가능하므로, LLM이 실제로 답한 요청(tier == "llm")만 골라
+#   DISTILL_LOG_PATH (JSONL): 프로필+상황 특성 벡터 → 추천 메뉴 + 대체 메뉴
+# 로 남기고, python -m ai.train_distilled 가 ai.features 벡터 → 메뉴 분류기(작은 MLP)를 학습한다.
+#   ai/checkpoints/distilled/<버전>/model.pth, metadata.json  (레지스트리 manifest 포함)
+# 로그에는 알레르기/지병 같은 건강 정보 원문 대신 인코딩된 특성 벡터와 특성 스키마 해시만 남긴다
+# (사용자 식별자/기분 문장도 남기지 않음). 스키마가 바뀌면 이전 줄은 학습에서 건너뛴다.
+#
+# 서빙: 요청에 mode="fast"가 오면 LLM을 부르지 않고 학생 모델로 바로 응답한다 (tier = "fast").
+#   가중치는 NumPy 배열로 옮겨 요청 스레드에서 행렬곱 두 번으로 계산하고(추론 워커 대기열을 거치지 않음),
+#   알레르기/지병 위험 메뉴와 이전 추천은 순위에서 뺀다. 이유 문장은 감성 태그 템플릿(ai.rule_recommender).
+#   학생 모델이 없거나 특성 스키마가 다르면 기존 LLM 경로로 처리한다.
+# 일치율: 일반 모드에서 LLM이 답할 때마다 학생 모델의 top-1을 같이 계산해
+#   <이름>.distill.agree / <이름>.distill.disagree 카운터로 남긴다 (/metrics). 학습 시 검증 일치율은 metadata.json.
+#
+# DISTILL_LOG_PATH  교사 응답 로그 (기본 ./data/distill_pairs.jsonl, 빈 값이면 기록 안 함)
+#                   백그라운드 스레드가 기록하고 크기가 넘으면 회전한다 (ai.jsonl_log)
+
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+
+from ai import metrics
+from ai.features import RequestContext, UserProfile, encode_batch, feature_names
+from ai.hybrid_retrieval import ALLERGENS, DISEASES, bitmask
+from ai.jsonl_log import JsonlLog, read_jsonl
+from ai.menu_catalog import get_catalog
+from ai.model_serving import RELOAD_INTERVAL
+from ai.models.menu_model import CHECKPOINT_DIR, latest_checkpoint, load_metadata
+from ai.rule_recommender import is_safe_for_disease, template_reason
+
+DISTILL_DIR = os.path.join(CHECKPOINT_DIR, "distilled")
+DISTILL_LOG_PATH = os.getenv("DISTILL_LOG_PATH", "./data/distill_pairs.jsonl")
+NO_RECOMMENDATION = "추천 불가"
+FAST_OPTIONS = 3  # 추천 1개 + 대체 2개
+
+_teacher_log = JsonlLog(DISTILL_LOG_PATH, "distillation.teacher_log")
+_state_lock = threading.Lock()
+_state = {"checked": None, "directory": None, "model": None}
+
+
+class DistilledRecommender:
+    def __init__(self, directory: str):
+        metadata = load_metadata(directory)
+        state = torch.load(os.path.join(directory, "model.pth"), map_location="cpu")
+        self.w1 = state["fc1.weight"].numpy().T.copy()
+        self.b1 = state["fc1.bias"].numpy().copy()
+        self.w2 = state["fc2.weight"].numpy().T.copy()
+        self.b2 = state["fc2.bias"].numpy().copy()
+        self.version = metadata["version"]
+        self.menus = metadata["menus"]
+        self.schema_matches = metadata["feature_schema"]["names"] == feature_names()
+
+        # 메뉴명 → 카탈로그 첫 행(이유 템플릿용) + 같은 이름 행들의 알레르기/지병 합집합 비트마스크
+        df = get_catalog()
+        rows = {}
+        allergy_bits, disease_bits = {}, {}
+        for _, row in df[df["menu_name"].isin(self.menus)].iterrows():
+            name = row["menu_name"]
+            rows.setdefault(name, row)
+            allergy_bits[name] = allergy_bits.get(name, 0) | bitmask(row["allergy_list"], ALLERGENS)
+            disease_bits[name] = disease_bits.get(name, 0) | bitmask(row["disease_list"], DISEASES)
+        self.rows = rows
+        self.allergy_bits = np.array([allergy_bits.get(name, 0) for name in self.menus], dtype=np.int64)
+        self.disease_bits = np.array([disease_bits.get(name, 0) for name in self.menus], dtype=np.int64)
+        self.in_catalog = np.array([name in rows for name in self.menus])
+
+    def scores(self, features: np.ndarray) -> np.ndarray:
+        hidden = np.maximum(features @ self.w1 + self.b1, 0.0)
+        return hidden @ self.w2 + self.b2
+
+    def rank(self, profile: UserProfile, context: RequestContext, k: int = FAST_OPTIONS, exclude=()) -> list[str]:
+        scores = self.scores(encode_batch([profile], [context])[0])
+        allowed = self.in_catalog \
+            & ((self.allergy_bits & bitmask(profile.allergies, ALLERGENS)) == 0) \
+            & ((self.disease_bits & bitmask(profile.diseases, DISEASES)) == 0)
+        ranked = []
+        for i in np.argsort(-np.where(allowed, scores, -np.inf)):
+            name = self.menus[i]
+            if not allowed[i] or len(ranked) == k:
+                break
+            if name not in exclude and is_safe_for_disease(name, list(profile.diseases)):
+                ranked.append(name)
+        return ranked
+
+    def recommend(self, profile: UserProfile, context: RequestContext, context_text: str = "", exclude=()) -> dict:
+        names = self.rank(profile, context, FAST_OPTIONS, exclude)
+        if not names:
+            return {"recommended_menu": NO_RECOMMENDATION,
+                    "recommendation_reason": "알레르기/지병을 고려했을 때 추천할 수 있는 메뉴가 없습니다",
+                    "alternative_options": []}
+        return {
+            "recommended_menu": names[0],
+            "recommendation_reason": template_reason(self.rows[names[0]], context_text),
+            "alternative_options": names[1:],
+        }
+
+
+def get_student():
+    """distilled/LATEST가 가리키는 학생 모델 (RELOAD_INTERVAL마다 바뀌었는지 확인, 없으면 None)"""
+    now = time.monotonic()
+    with _state_lock:
+        if _state["checked"] is not None and now - _state["checked"] < RELOAD_INTERVAL:
+            return _state["model"]
+        _state["checked"] = now
+        directory = latest_checkpoint(DISTILL_DIR)
+        if directory != _state["directory"]:
+            try:
+                _state["model"] = DistilledRecommender(directory) if directory else None
+                if _state["model"] is not None and not _state["model"].schema_matches:
+                    print(f"⚠️ distillation: {directory}의 특성 스키마가 현재 ai.features와 다릅니다. 다시 학습하세요.")
+            except Exception as e:
+                print(f"⚠️ distillation: {directory} 로드 실패 ({e})")
+                _state["model"] = None
+            _state["directory"] = directory
+        return _state["model"]
+
+
+def fast_recommend(name: str, profile: UserProfile, context: RequestContext, context_text: str = "",
+                   exclude=()):
+    """학생 모델 응답 (tier = "fast"), 쓸 수 없으면 None → 호출 쪽에서 LLM 경로로 처리"""
+    student = get_student()
+    if student is None or not student.schema_matches:
+        metrics.incr(f"{name}.fast_unavailable")
+        return None
+    started = time.perf_counter()
+    result = student.recommend(profile, context, context_text, exclude)
+    metrics.observe(f"{name}.fast_ms", (time.perf_counter() - started) * 1000)
+    metrics.incr(f"{name}.tier.fast")
+    return {**result, "tier": "fast", "model_version": student.version}
+
+
+def feature_schema_id() -> str:
+    """로그 줄의 특성 벡터가 어떤 ai.features 어휘로 만들어졌는지 (이름 목록 해시)"""
+    return hashlib.sha1("\n".join(feature_names()).encode("utf-8")).hexdigest()[:12]
+
+
+def record_teacher(name: str, profile: UserProfile, context: RequestContext, result: dict, exclude=()):
+    """LLM이 직접 답한 응답만 학습 쌍으로 기록하고, 학생 모델이 있으면 top-1 일치 여부를 센다."""
+    if result.get("tier") != "llm" or result.get("recommended_menu") in (None, NO_RECOMMENDATION):
+        return
+
+    student = get_student()
+    if student is not None and student.schema_matches:
+        agree = student.rank(profile, context, 1, exclude) == [result["recommended_menu"]]
+        metrics.incr(f"{name}.distill.agree" if agree else f"{name}.distill.disagree")
+
+    if not DISTILL_LOG_PATH:
+        return
+    _teacher_log.append({
+        "ts": time.time(),
+        "endpoint": name,
+        "schema": feature_schema_id(),
+        "features": [round(float(v), 4) for v in encode_batch([profile], [context])[0]],
+        "menu": result["recommended_menu"],
+        "alternatives": list(result.get("alternative_options", [])),
+    })
+
+
+def read_pairs(path: str = DISTILL_LOG_PATH) -> list[dict]:
+    """현재 특성 스키마로 기록된 학습 쌍 (회전된 이전 파일 포함)"""
+    rows = read_jsonl(path)
+    current = feature_schema_id()
+    pairs = [row for row in rows if row.get("schema") == current and "features" in row]
+    if len(pairs) < len(rows):
+        print(f"⚠️ distillation: 특성 스키마가 다른 {len(rows) - len(pairs)}줄은 건너뜁니다.")
+    return pairs
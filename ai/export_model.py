@@ -0,0 +1,107 @@
+# --- 메뉴 추천 모델 TorchScript / int8 동적 양자화 내보내기 ---
+# 실행: python -m ai.export_model [--checkpoint ai/checkpoints/<버전>]  (기본: LATEST)
+#
+# float 체크포인트(model.pth)에서 두 변형을 만들어 같은 디렉터리에 저장한다.
+#   model.ts.pt       TorchScript (파이썬 클래스 없이 로드, eager 오버헤드 감소)
+#   model.int8.ts.pt  nn.Linear 가중치를 int8로 동적 양자화한 뒤 TorchScript로 저장
+# 검증 입력(학습 검증 split, 없으면 임의 프로필 벡터)에서 float 모델과 top-1 일치율 / top-5 겹침 /
+# 최대 확률 차이를 비교하고, 기준을 넘어야 metadata.json의 variants.<이름>.parity.passed 가 true가 된다.
+# 서빙(ai.models.menu_model.serving_model_path)은 통과한 변형만 사용한다.
+
+import argparse
+import json
+import os
+
+import torch
+import torch.nn as nn
+
+from ai.features import USER_DIM
+from ai.models.menu_model import VARIANT_FILES, latest_checkpoint, load_checkpoint
+
+MIN_TOP1_AGREEMENT = 0.99
+MIN_TOP5_OVERLAP = 0.95
+PARITY_SAMPLES = 2048
+
+
+def parity_inputs(menu_ids: list[int], samples: int = PARITY_SAMPLES, seed: int = 0) -> torch.Tensor:
+    """학습 검증 split의 실제 입력 + 부족분은 0/1 임의 특성 벡터"""
+    inputs = []
+    try:
+        from ai.train_model import FeedbackExamples
+        for x, _, _ in FeedbackExamples("valid", menu_ids):
+            inputs.append(x)
+            if len(inputs) >= samples:
+                break
+    except Exception as e:
+        print(f"  검증 데이터를 읽지 못해 임의 입력만 사용합니다 ({e})")
+
+    generator = torch.Generator().manual_seed(seed)
+    missing = samples - len(inputs)
+    random_inputs = (torch.rand(missing, USER_DIM, generator=generator) < 0.2).float()
+    return torch.cat([torch.stack(inputs), random_inputs]) if inputs else random_inputs
+
+
+def parity(reference: nn.Module, candidate, inputs: torch.Tensor) -> dict:
+    with torch.inference_mode():
+        expected, actual = reference(inputs), candidate(inputs)
+    k = min(5, expected.shape[1])
+    expected_top, actual_top = expected.topk(k, dim=1).indices, actual.topk(k, dim=1).indices
+    top1 = (expected_top[:, 0] == actual_top[:, 0]).float().mean().item()
+    overlap = sum(len(set(e.tolist()) & set(a.tolist())) for e, a in zip(expected_top, actual_top))
+    top5 = overlap / (k * len(inputs))
+    return {
+        "samples": len(inputs),
+        "top1_agreement": top1,
+        "top5_overlap": top5,
+        "max_abs_diff": (expected - actual).abs().max().item(),
+        "passed": top1 >= MIN_TOP1_AGREEMENT and top5 >= MIN_TOP5_OVERLAP,
+    }
+
+
+def to_torchscript(model: nn.Module, example: torch.Tensor):
+    return torch.jit.freeze(torch.jit.trace(model.eval(), example))
+
+
+def to_int8(model: nn.Module, example: torch.Tensor):
+    quantized = torch.ao.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+    return torch.jit.trace(quantized, example)
+
+
+EXPORTERS = {"torchscript": to_torchscript, "int8": to_int8}
+
+
+def export_variants(model: nn.Module, directory: str, inputs: torch.Tensor) -> dict:
+    variants = {}
+    for name, exporter in EXPORTERS.items():
+        scripted = exporter(model, inputs[:1])
+        path = os.path.join(directory, VARIANT_FILES[name])
+        torch.jit.save(scripted, path)
+        variants[name] = {
+            "file": VARIANT_FILES[name],
+            "size_bytes": os.path.getsize(path),
+            "parity": parity(model, torch.jit.load(path), inputs),
+        }
+        print(f"  {name:12s} {variants[name]['size_bytes'] / 1024:8.1f} KB  {variants[name]['parity']}")
+    return variants
+
+
+def export_checkpoint(directory: str) -> dict:
+    model, metadata = load_checkpoint(directory)
+    print(f"export {directory} (float {os.path.getsize(os.path.join(directory, VARIANT_FILES['float'])) / 1024:.1f} KB)")
+    inputs = parity_inputs([m["menu_id"] for m in metadata["menus"]])
+
+    metadata["variants"] = export_variants(model, directory, inputs)
+    with open(os.path.join(directory, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    return metadata["variants"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=None, help="기본값: ai/checkpoints/LATEST")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or latest_checkpoint()
+    if checkpoint is None:
+        raise SystemExit("체크포인트가 없습니다. 먼저 python -m ai.train_model 을 실행하세요.")
+    export_checkpoint(checkpoint)
@@ -0,0 +1,257 @@
+# --- PyTorch 추천 모델 입력 특성 인코딩 ---
+# 학습(ai/train_model.py)과 서빙(ai_recommend_api.py)이 같은 고정 어휘와 같은 순서로
+# float32 벡터를 만들도록 한 곳에 모은 것. 요청마다 인코더를 fit 하지 않는다.
+#
+# 벡터 = [사용자 부분 | 상황 부분]
+#   사용자: 알레르기 multi-hot, 지병 multi-hot, 선호 감성 태그, 비선호 감성 태그
+#           (선호/비선호는 메뉴명이면 카탈로그의 감성 태그, 아니면 "매운 음식" 같은 키워드로 태그에 매핑)
+#   상황  : 날씨 one-hot, 혼밥 여부, 예산(만원 단위, 0~5)
+# 피드백/리뷰/추천 기록 라벨에는 상황 정보가 없으므로, 그 라벨로 학습하는 메뉴 분류기와 투 타워는
+# 사용자 부분만(user_schema) 입력으로 쓴다. 상황까지 쓰는 것은 요청 상황이 함께 기록되는 증류 학생 모델(schema).
+#
+# 메뉴(아이템) 특성: 알레르기/지병 multi-hot, 대표 감성 태그, 리뷰 감성 비율(emotion_summary), 가격
+#   → 투 타워 모델(ai.models.two_tower)의 아이템 타워 입력
+#
+# 사용자 부분은 user_id별로 캐시하고, 마이페이지/회원정보 수정 시 invalidate_user()로 지운다.
+# 다른 워커 프로세스의 캐시는 USER_CACHE_TTL 후에 다시 계산된다.
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from ai.hybrid_retrieval import ALLERGENS, BUDGET_RANGES, DISEASES
+from ai.menu_catalog import get_catalog
+
+# 카탈로그 top_tags 에 나오는 감성 태그
+TASTE_TAGS = ["친절함", "분위기좋음", "가성비", "재방문", "포장추천", "양많음", "매움", "중독성", "단맛", "속풀이", "특별함"]
+WEATHERS = ["맑음", "흐림", "비", "눈", "더움", "추움"]
+
+# 자유 입력 선호("매운 음식", "국물 요리")를 감성 태그로
+PREFERENCE_KEYWORDS = {
+    "매운": ["매움"], "매콤": ["매움"], "얼큰": ["매움", "속풀이"],
+    "단맛": ["단맛"], "달달": ["단맛"], "디저트": ["단맛"],
+    "국물": ["속풀이"], "해장": ["속풀이"],
+    "든든": ["양많음"], "푸짐": ["양많음"],
+    "저렴": ["가성비"], "가성비": ["가성비"],
+    "포장": ["포장추천"], "분위기": ["분위기좋음"],
+}
+# 날씨 문자열("비오는 날", "더운 날")의 키워드 → WEATHERS 항목
+WEATHER_KEYWORDS = {"맑": "맑음", "흐": "흐림", "비": "비", "눈": "눈", "더": "더움", "덥": "더움", "추": "추움"}
+
+MAX_BUDGET = 5.0  # 만원
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = 300
+
+USER_SLOTS = [("allergy", ALLERGENS), ("disease", DISEASES), ("like", TASTE_TAGS), ("dislike", TASTE_TAGS)]
+CONTEXT_SLOTS = [("weather", WEATHERS)]
+USER_DIM = sum(len(vocab) for _, vocab in USER_SLOTS)
+CONTEXT_DIM = sum(len(vocab) for _, vocab in CONTEXT_SLOTS) + 2  # + solo, budget
+FEATURE_DIM = USER_DIM + CONTEXT_DIM
+ITEM_SLOTS = [("allergy", ALLERGENS), ("disease", DISEASES), ("tag", TASTE_TAGS), ("emotion", TASTE_TAGS)]
+ITEM_DIM = sum(len(vocab) for _, vocab in ITEM_SLOTS) + 1  # + price
+SCHEMA_VERSION = 1
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    allergies: tuple = ()
+    diseases: tuple = ()
+    likes: tuple = ()
+    dislikes: tuple = ()
+
+    @classmethod
+    def from_user(cls, user) -> "UserProfile":
+        return cls(
+            allergies=tuple(a.allergy for a in user.allergies),
+            diseases=tuple(d.disease for d in user.diseases),
+            likes=tuple(p.menu_name for p in user.preferences if p.preference_type == "선호"),
+            dislikes=tuple(p.menu_name for p in user.preferences if p.preference_type == "비선호"),
+        )
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    weather: str = ""
+    solo: bool = False
+    budget: object = None  # 원 단위 숫자 또는 "1~2만원" 같은 예산 문자열
+
+
+def feature_names() -> list[str]:
+    names = [f"{slot}:{value}" for slot, vocab in USER_SLOTS + CONTEXT_SLOTS for value in vocab]
+    return names + ["solo", "budget"]
+
+
+def user_feature_names() -> list[str]:
+    return [f"{slot}:{value}" for slot, vocab in USER_SLOTS for value in vocab]
+
+
+def item_feature_names() -> list[str]:
+    return [f"{slot}:{value}" for slot, vocab in ITEM_SLOTS for value in vocab] + ["price"]
+
+
+def schema() -> dict:
+    """체크포인트 메타데이터에 함께 저장해 학습/서빙 어휘가 같은지 확인하는 용도"""
+    return {"version": SCHEMA_VERSION, "dim": FEATURE_DIM, "names": feature_names()}
+
+
+def user_schema() -> dict:
+    """사용자 부분만 쓰는 모델(메뉴 분류기, 투 타워 사용자 타워)의 입력 스키마"""
+    return {"version": SCHEMA_VERSION, "dim": USER_DIM, "names": user_feature_names()}
+
+
+def item_schema() -> dict:
+    return {"version": SCHEMA_VERSION, "dim": ITEM_DIM, "names": item_feature_names()}
+
+
+# ---------------------------
+# 값 → 어휘 인덱스
+# ---------------------------
+@lru_cache(maxsize=1)
+def _menu_tags() -> dict:
+    df = get_catalog()
+    return {name: tags for name, tags in zip(df["menu_name"], df["tag_list"])}
+
+
+@lru_cache(maxsize=4096)
+def preference_tags(text: str) -> tuple:
+    text = (text or "").strip()
+    tags = set(_menu_tags().get(text, []))
+    for keyword, mapped in PREFERENCE_KEYWORDS.items():
+        if keyword in text:
+            tags.update(mapped)
+    return tuple(TASTE_TAGS.index(t) for t in sorted(tags) if t in TASTE_TAGS)
+
+
+def weather_index(weather: str):
+    for keyword, value in WEATHER_KEYWORDS.items():
+        if keyword in (weather or ""):
+            return WEATHERS.index(value)
+    return None
+
+
+def budget_value(budget) -> float:
+    if budget is None or budget == "":
+        return 0.0
+    if isinstance(budget, (int, float)):
+        won = float(budget)
+    else:
+        low, high = next((r for key, r in BUDGET_RANGES.items() if key in str(budget)), (None, None))
+        if low is None:
+            return 0.0
+        won = (low + high) / 2 if high is not None else low * 1.25
+    return min(MAX_BUDGET, max(0.0, won / 10000))
+
+
+# ---------------------------
+# 배치 인코딩
+# ---------------------------
+def _multi_hot(out: np.ndarray, offset: int, rows: list[list[int]]):
+    row_idx = [i for i, cols in enumerate(rows) for _ in cols]
+    col_idx = [offset + c for cols in rows for c in cols]
+    if row_idx:
+        out[row_idx, col_idx] = 1.0
+
+
+def _tag_weights(out: np.ndarray, offset: int, preferences: list[tuple]):
+    """선호 항목들의 태그 빈도를 행별 최대값 1로 정규화"""
+    row_idx = [i for i, items in enumerate(preferences) for item in items for _ in preference_tags(item)]
+    col_idx = [offset + c for items in preferences for item in items for c in preference_tags(item)]
+    if not row_idx:
+        return
+    block = out[:, offset:offset + len(TASTE_TAGS)]
+    np.add.at(out, (row_idx, col_idx), 1.0)
+    block /= np.maximum(block.max(axis=1, keepdims=True), 1.0)
+
+
+def encode_profiles(profiles: list[UserProfile]) -> np.ndarray:
+    out = np.zeros((len(profiles), USER_DIM), dtype=np.float32)
+    offset = 0
+    _multi_hot(out, offset, [[ALLERGENS.index(a) for a in p.allergies if a in ALLERGENS] for p in profiles])
+    offset += len(ALLERGENS)
+    _multi_hot(out, offset, [[DISEASES.index(d) for d in p.diseases if d in DISEASES] for p in profiles])
+    offset += len(DISEASES)
+    _tag_weights(out, offset, [p.likes for p in profiles])
+    offset += len(TASTE_TAGS)
+    _tag_weights(out, offset, [p.dislikes for p in profiles])
+    return out
+
+
+def encode_contexts(contexts: list[RequestContext]) -> np.ndarray:
+    out = np.zeros((len(contexts), CONTEXT_DIM), dtype=np.float32)
+    weather = [weather_index(c.weather) for c in contexts]
+    _multi_hot(out, 0, [[w] if w is not None else [] for w in weather])
+    out[:, len(WEATHERS)] = [1.0 if c.solo else 0.0 for c in contexts]
+    out[:, len(WEATHERS) + 1] = [budget_value(c.budget) for c in contexts]
+    return out
+
+
+def parse_emotions(value) -> dict:
+    """ "재방문:4, 친절함:11" → {"재방문": 4, "친절함": 11} """
+    counts = {}
+    for part in str(value or "").split(","):
+        tag, _, count = part.partition(":")
+        if tag.strip() and count.strip().isdigit():
+            counts[tag.strip()] = int(count)
+    return counts
+
+
+def encode_items(df) -> np.ndarray:
+    """카탈로그 DataFrame(ai.menu_catalog.load_catalog 형태) → (n, ITEM_DIM) float32"""
+    out = np.zeros((len(df), ITEM_DIM), dtype=np.float32)
+    offset = 0
+    _multi_hot(out, offset, [[ALLERGENS.index(a) for a in lst if a in ALLERGENS] for lst in df["allergy_list"]])
+    offset += len(ALLERGENS)
+    _multi_hot(out, offset, [[DISEASES.index(d) for d in lst if d in DISEASES] for lst in df["disease_list"]])
+    offset += len(DISEASES)
+    _multi_hot(out, offset, [[TASTE_TAGS.index(t) for t in lst if t in TASTE_TAGS] for lst in df["tag_list"]])
+    offset += len(TASTE_TAGS)
+
+    # 리뷰 감성 언급 비율 (행 합 1)
+    emotions = [parse_emotions(v) for v in df["emotion_summary"]]
+    row_idx = [i for i, e in enumerate(emotions) for tag in e if tag in TASTE_TAGS]
+    col_idx = [offset + TASTE_TAGS.index(tag) for e in emotions for tag in e if tag in TASTE_TAGS]
+    out[row_idx, col_idx] = [e[tag] for e in emotions for tag in e if tag in TASTE_TAGS]
+    block = out[:, offset:offset + len(TASTE_TAGS)]
+    block /= np.maximum(block.sum(axis=1, keepdims=True), 1.0)
+    offset += len(TASTE_TAGS)
+
+    out[:, offset] = np.clip(df["menu_price"].to_numpy(dtype=np.float32) / 10000, 0, MAX_BUDGET)
+    return out
+
+
+def encode_batch(profiles: list[UserProfile], contexts: list[RequestContext]) -> np.ndarray:
+    """(n, FEATURE_DIM) float32"""
+    return np.hstack([encode_profiles(profiles), encode_contexts(contexts)])
+
+
+# ---------------------------
+# 사용자 벡터 캐시
+# ---------------------------
+_lock = threading.Lock()
+_user_cache = OrderedDict()
+
+
+def user_vector(user) -> np.ndarray:
+    now = time.time()
+    with _lock:
+        cached = _user_cache.get(user.id)
+        if cached and now - cached[0] < USER_CACHE_TTL:
+            _user_cache.move_to_end(user.id)
+            return cached[1]
+
+    vector = encode_profiles([UserProfile.from_user(user)])[0]
+    with _lock:
+        _user_cache[user.id] = (now, vector)
+        _user_cache.move_to_end(user.id)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return vector
+
+
+def invalidate_user(user_id: int):
+    with _lock:
+        _user_cache.pop(user_id, None)
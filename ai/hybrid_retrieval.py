@@ -0,0 +1,165 @@
+# --- 메타데이터 선필터 + 하이브리드 랭킹 검색 ---
+# 1) 알레르기 비트마스크, 지병 위험, 지역, 가격대, 이전 추천 메뉴로 후보를 먼저 걸러내고
+# 2) 남은 후보를 벡터 유사도와 키워드/감성 태그 일치도를 섞은 점수로 정렬한다.
+# 모델에게 "알레르기 피해줘"라고 부탁하는 대신 안전한 메뉴만 프롬프트에 넣는 것이 목적.
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from ai.vector_index import NumpyVectorIndex
+
+ALLERGENS = ["달걀", "갑각류", "밀", "땅콩/대두", "우유", "고기"]
+DISEASES = ["고혈압", "당뇨", "신장질환", "저혈압"]
+
+# 예산 문자열 → (최소, 최대) 가격
+BUDGET_RANGES = {
+    "낮음": (0, 10000),
+    "중간": (10000, 20000),
+    "높음": (20000, None),
+    "1만원 미만": (0, 10000),
+    "1~2만원": (10000, 20000),
+    "2~3만원": (20000, 30000),
+    "3~4만원": (30000, 40000),
+    "4만원 이상": (40000, None),
+}
+
+# 상황 키워드 -> 감성 태그 매핑
+SITUATION_TAGS = {
+    "매콤": ["매움"],
+    "해장": ["속풀이"],
+    "꿀꿀": ["단맛", "중독성"],
+    "가볍": ["가성비", "양많음"],
+    "친구": ["분위기좋음", "특별함"],
+    "추워": ["속풀이"],
+    "덥": ["가성비"],
+    "달달": ["단맛"],
+    "배고": ["양많음"],
+    "야식": ["야식"]
+}
+
+VECTOR_WEIGHT = 0.7
+CANDIDATE_MULTIPLIER = 8
+
+
+def extract_situation_tags(situation: str) -> list[str]:
+    tags = set()
+    for keyword, tag_list in SITUATION_TAGS.items():
+        if keyword in (situation or ""):
+            tags.update(tag_list)
+    return sorted(tags)
+
+
+def bitmask(values, vocabulary: list[str]) -> int:
+    mask = 0
+    for value in values:
+        value = value.strip()
+        if value in vocabulary:
+            mask |= 1 << vocabulary.index(value)
+    return mask
+
+
+def split_metadata(value) -> list[str]:
+    return [v.strip() for v in str(value or "").split(",") if v.strip()]
+
+
+@dataclass
+class RetrievalFilters:
+    allergies: List[str] = field(default_factory=list)
+    diseases: List[str] = field(default_factory=list)
+    region: Optional[str] = None
+    budget: Optional[str] = None
+    exclude_menus: List[str] = field(default_factory=list)
+
+    def price_range(self):
+        return BUDGET_RANGES.get((self.budget or "").strip(), (None, None))
+
+    def allows(self, metadata: dict) -> bool:
+        """메타데이터 한 건이 필터를 통과하는지 (Chroma 등 후처리용)"""
+        if bitmask(split_metadata(metadata.get("allergy")), ALLERGENS) & bitmask(self.allergies, ALLERGENS):
+            return False
+        if bitmask(split_metadata(metadata.get("disease")), DISEASES) & bitmask(self.diseases, DISEASES):
+            return False
+        if self.region and metadata.get("region") not in (None, self.region):
+            return False
+        low, high = self.price_range()
+        price = metadata.get("price")
+        if price is not None and ((low is not None and price < low) or (high is not None and price > high)):
+            return False
+        return metadata.get("menu_name") not in self.exclude_menus
+
+
+# ---------------------------
+# NumPy 인덱스: 컬럼 배열로 한 번에 마스크 계산
+# ---------------------------
+_column_cache = {}
+
+
+def filter_columns(index: NumpyVectorIndex) -> dict:
+    key = id(index)
+    if key not in _column_cache:
+        metas = [doc.metadata for doc in index.documents]
+        _column_cache[key] = {
+            "allergy": np.array([bitmask(split_metadata(m.get("allergy")), ALLERGENS) for m in metas], dtype=np.int64),
+            "disease": np.array([bitmask(split_metadata(m.get("disease")), DISEASES) for m in metas], dtype=np.int64),
+            "price": np.array([m.get("price", 0) for m in metas], dtype=np.int64),
+            "region": np.array([m.get("region") or "" for m in metas], dtype=object),
+            "menu_name": np.array([m.get("menu_name") or "" for m in metas], dtype=object),
+        }
+    return _column_cache[key]
+
+
+def filter_mask(index: NumpyVectorIndex, filters: RetrievalFilters) -> np.ndarray:
+    columns = filter_columns(index)
+    mask = (columns["allergy"] & bitmask(filters.allergies, ALLERGENS)) == 0
+    mask &= (columns["disease"] & bitmask(filters.diseases, DISEASES)) == 0
+    if filters.region:
+        mask &= columns["region"] == filters.region
+    low, high = filters.price_range()
+    if low is not None:
+        mask &= columns["price"] >= low
+    if high is not None:
+        mask &= columns["price"] <= high
+    if filters.exclude_menus:
+        mask &= ~np.isin(columns["menu_name"], list(filters.exclude_menus))
+    return mask
+
+
+def keyword_score(doc: Document, keywords: list[str]) -> float:
+    if not keywords:
+        return 0.0
+    text = doc.page_content + " " + str(doc.metadata.get("tags", ""))
+    return sum(1 for kw in keywords if kw and kw in text) / len(keywords)
+
+
+def hybrid_search(store, query: str, filters: RetrievalFilters, k: int = 5,
+                  keywords: Optional[list[str]] = None, vector_weight: float = VECTOR_WEIGHT) -> List[Document]:
+    keywords = [kw for kw in (keywords or []) if kw]
+    fetch_k = k * CANDIDATE_MULTIPLIER
+
+    if isinstance(store, NumpyVectorIndex):
+        rows, sims = store.search_by_vector(store.embedding.embed_query(query), k=fetch_k,
+                                            mask=filter_mask(store, filters))
+        candidates = [(store.documents[i], float(s)) for i, s in zip(rows, sims)]
+    else:
+        # Chroma: 지역/가격은 where 절로, 비트마스크 조건은 후처리로 거른다
+        where = []
+        if filters.region:
+            where.append({"region": filters.region})
+        low, high = filters.price_range()
+        if low is not None:
+            where.append({"price": {"$gte": low}})
+        if high is not None:
+            where.append({"price": {"$lte": high}})
+        chroma_filter = None if not where else where[0] if len(where) == 1 else {"$and": where}
+        results = store.similarity_search_with_relevance_scores(query, k=fetch_k, filter=chroma_filter)
+        candidates = [(doc, score) for doc, score in results if filters.allows(doc.metadata)]
+
+    ranked = sorted(
+        candidates,
+        key=lambda c: vector_weight * c[1] + (1 - vector_weight) * keyword_score(c[0], keywords),
+        reverse=True
+    )
+    return [doc for doc, _ in ranked[:k]]
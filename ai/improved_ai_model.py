@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from langchain.schema import Document
 from models import User, UserAllergy, UserDisease, UserPreference, Menu, SessionLocal
+from ai.backends import get_chat_model, get_embeddings, require_api_key
+from ai.build_menu_index import open_menu_index
+from ai.prompt_cache import compile_template
+from ai.structured_output import COMPACT_FORMAT_INSTRUCTIONS, invoke_structured
+from ai.hybrid_retrieval import RetrievalFilters, extract_situation_tags, hybrid_search
+from ai.orchestrator import BUDGET_SECONDS, fallback_recommendation, recommend_with_budget
+from ai.distillation import fast_recommend, record_teacher
+from ai.features import RequestContext, UserProfile
 import os
 import json
 from typing import List, Optional
@@ -19,18 +25,16 @@ import os
 
 load_dotenv()
 # 환경 변수
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
+OPENAI_API_KEY = require_api_key()
 
 # LLM 세팅
-llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, api_key=OPENAI_API_KEY)
+llm = get_chat_model("gpt-4o", temperature=0.7, timeout=BUDGET_SECONDS, max_retries=0)
 
 # VectorDB 설정
 MENU_DB_PATH = "./chroma_db/menu_db"
 
 try:
-    menu_db = Chroma(persist_directory=MENU_DB_PATH, embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY))
+    menu_db = open_menu_index("improved_ai", MENU_DB_PATH)
     menu_retriever = menu_db.as_retriever(search_kwargs={"k": 5})
 except:
     menu_db = None
@@ -48,6 +52,36 @@ class RecommendRequest(BaseModel):
     budget: str
     mood: Optional[str] = None
     previous_recommendations: List[str] = []
+    mode: str = "llm"  # "fast": LLM 대신 증류 학생 모델로 즉시 응답 (ai.distillation)
+
+# 고정 지시문/출력 형식을 앞에 두어 요청 간 prompt prefix가 동일하도록 구성 (한 번만 컴파일)
+RECOMMEND_PROMPT = compile_template("""
+You are an AI assistant that recommends food menus based on user preferences, allergies, health conditions, and context.
+
+[Instructions]
+1. Prioritize allergies and diseases when selecting food.
+2. Consider mood, budget, and weather in the recommendation.
+3. Recommend one best menu with a short reason (1–2 sentences).
+4. Suggest 2–3 alternative options.
+5. Use the format exactly as below.
+
+{format_instructions}
+
+[User Information]
+- Username: {username}
+- Allergies: {allergies}
+- Diseases: {diseases}
+- Preferences: {preferences}
+- Dislikes: {dislikes}
+- Weather: {weather}
+- Eating Alone: {alone}
+- Budget: {budget}
+- Mood: {mood}
+- Previous Recommendations: {previous_recommendations}
+
+[Related Menu Data]
+{menu_context}
+""")
 
 def get_db():
     db = SessionLocal()
@@ -76,61 +110,55 @@ def recommend_menu(req: RecommendRequest, db: Session = Depends(get_db)):
     if req.budget not in ["낮음", "중간", "높음"]:
         raise HTTPException(status_code=400, detail="예산은 낮음/중간/높음 중 하나여야 합니다.")
 
-    if menu_retriever:
-        search_query = f"예산: {req.budget} 날씨: {req.weather} 선호: {preferences_text}"
-        relevant_menus = menu_retriever.get_relevant_documents(search_query)
-        menu_context = "\n".join([f"메뉴 {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
-    else:
-        menu_context = "관련 메뉴 정보 없음"
-
-    parser = PydanticOutputParser(pydantic_object=MenuRecommendation)
-
-    prompt = ChatPromptTemplate.from_template("""
-You are an AI assistant that recommends food menus based on user preferences, allergies, health conditions, and context.
-
-[User Information]
-- Username: {username}
-- Allergies: {allergies}
-- Diseases: {diseases}
-- Preferences: {preferences}
-- Dislikes: {dislikes}
-- Weather: {weather}
-- Eating Alone: {alone}
-- Budget: {budget}
-- Mood: {mood}
-- Previous Recommendations: {previous_recommendations}
-
-[Related Menu Data]
-{menu_context}
-
-[Instructions]
-1. Prioritize allergies and diseases when selecting food.
-2. Consider mood, budget, and weather in the recommendation.
-3. Recommend one best menu with a short reason (1–2 sentences).
-4. Suggest 2–3 alternative options.
-5. Use the format exactly as below.
-
-{format_instructions}
-""")
-
-    formatted_prompt = prompt.format(
-        username=req.username,
-        allergies=allergies_text,
-        diseases=diseases_text,
-        preferences=preferences_text,
-        dislikes=dislikes_text,
-        weather=req.weather,
-        alone=req.alone,
-        budget=req.budget,
-        mood=req.mood or "정보 없음",
-        previous_recommendations=previous_text,
-        menu_context=menu_context,
-        format_instructions=parser.get_format_instructions()
-    )
-
-    try:
-        response = llm.invoke(formatted_prompt)
-        result = parser.parse(response.content)
-        return result.dict()
-    except Exception as e:
-        return {"recommended_menu": "추천 실패", "recommendation_reason": str(e), "alternative_options": []}
+    profile = UserProfile(tuple(allergies), tuple(diseases), tuple(preferences), tuple(dislikes))
+    context = RequestContext(weather=req.weather, solo=req.alone == "혼자", budget=req.budget)
+    if req.mode == "fast":
+        result = fast_recommend("ai_recommend", profile, context, context_text=req.mood or req.weather,
+                                exclude=req.previous_recommendations)
+        if result is not None:
+            return result
+
+    # 검색 + LLM 호출 + 파싱 전체를 지연 예산 안에서 실행
+    def call_llm():
+        if menu_db:
+            # 알레르기/지병/예산/이전 추천은 검색 단계에서 제외하고, 나머지는 유사도+태그로 정렬
+            search_query = f"예산: {req.budget} 날씨: {req.weather} 선호: {preferences_text}"
+            filters = RetrievalFilters(
+                allergies=allergies, diseases=diseases, budget=req.budget,
+                exclude_menus=req.previous_recommendations
+            )
+            keywords = extract_situation_tags(f"{req.mood or ''} {req.weather}") + preferences
+            relevant_menus = hybrid_search(menu_db, search_query, filters, k=5, keywords=keywords)
+            menu_context = "\n".join([f"메뉴 {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
+        else:
+            menu_context = "관련 메뉴 정보 없음"
+
+        formatted_prompt = RECOMMEND_PROMPT.format(
+            username=req.username,
+            allergies=allergies_text,
+            diseases=diseases_text,
+            preferences=preferences_text,
+            dislikes=dislikes_text,
+            weather=req.weather,
+            alone=req.alone,
+            budget=req.budget,
+            mood=req.mood or "정보 없음",
+            previous_recommendations=previous_text,
+            menu_context=menu_context,
+            format_instructions=COMPACT_FORMAT_INSTRUCTIONS
+        )
+
+        # 구조화 출력 → 로컬 JSON 복구 → 카탈로그 메뉴명 검증 (실패하면 규칙 기반으로 대체)
+        return invoke_structured(llm, formatted_prompt, MenuRecommendation, "ai_recommend")
+
+    # 예산 안에 LLM 응답이 없거나 실패하면 규칙 기반 추천으로 대체
+    def fallback():
+        return fallback_recommendation(
+            req.budget, allergies, diseases, context=req.mood or req.weather,
+            alone=req.alone, exclude_menus=req.previous_recommendations
+        )
+
+    result = recommend_with_budget("ai_recommend", call_llm, fallback)
+    # LLM이 직접 답한 응답은 증류 학습 쌍으로 기록 + 학생 모델과의 일치율 집계
+    record_teacher("ai_recommend", profile, context, result, exclude=req.previous_recommendations)
+    return result
@@ -1,32 +1,29 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_chroma import Chroma
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from langchain.schema import Document
 import os
 import json
 from typing import List, Optional
 from models import User, SessionLocal
+from ai.backends import get_chat_model, get_embeddings, require_api_key
+from ai.build_menu_index import open_menu_index
+from ai.intent_gate import OFF_TOPIC_REPLY, is_off_topic_mood
+from ai.prompt_cache import compile_template
+from ai.structured_output import COMPACT_FORMAT_INSTRUCTIONS, invoke_structured
 from dotenv import load_dotenv
 
 router = APIRouter(prefix="/menu")
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
+OPENAI_API_KEY = require_api_key()
 
 MENU_DB_PATH = "./chroma_db/menu_db"
 
-llm = ChatOpenAI(
-    model_name="gpt-4o",
-    temperature=0.7,
-    openai_api_key=OPENAI_API_KEY
-)
+llm = get_chat_model("gpt-4o", temperature=0.7)
 
 class MenuRecommendation(BaseModel):
     recommended_menu: str
@@ -45,6 +42,34 @@ class LLMRecommendRequest(BaseModel):
     mood: Optional[str] = None
     previous_recommendations: List[str] = []
 
+# 고정 지시문/출력 형식을 앞에 두어 요청 간 prompt prefix가 동일하도록 구성 (한 번만 컴파일)
+RECOMMEND_PROMPT = compile_template("""
+You are a smart, friendly AI assistant that recommends meals based on user data.
+
+[Instructions]
+- Recommend 1 best-fitting meal and explain briefly why it's suitable (1–2 sentences).
+- Suggest 2–3 alternative options.
+- Avoid allergens and health risks.
+- Do not repeat previously recommended menus.
+- Follow this JSON format exactly:
+{format_instructions}
+
+[User Info]
+Username: {username}
+Allergies: {allergies}
+Diseases: {diseases}
+Likes: {preferences}
+Dislikes: {dislikes}
+Weather: {weather}
+Eating Alone: {alone}
+Budget: {budget}
+Mood: {mood}
+Previous Recommendations: {previous_recommendations}
+
+[Candidate Menus]
+{menu_context}
+""")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -52,32 +77,14 @@ def get_db():
     finally:
         db.close()
 
-def initialize_menu_db():
-    sample_menus = [
-        {"name": "김치찌개", "ingredients": ["김치", "돼지고기", "두부"], "type": "한식", "price_range": "중간"},
-        {"name": "비빔밥", "ingredients": ["쌀", "나물", "계란", "고추장"], "type": "한식", "price_range": "중간"},
-        {"name": "파스타", "ingredients": ["면", "소스", "올리브유"], "type": "양식", "price_range": "중간"},
-        {"name": "스테이크", "ingredients": ["소고기", "감자", "샐러드"], "type": "양식", "price_range": "높음"},
-        {"name": "라멘", "ingredients": ["면", "돼지고기", "계란", "국물"], "type": "일식", "price_range": "중간"},
-        {"name": "초밥", "ingredients": ["쌀", "생선", "와사비"], "type": "일식", "price_range": "높음"},
-    ]
-    documents = []
-    for menu in sample_menus:
-        content = f"Name: {menu['name']}\nType: {menu['type']}\nIngredients: {', '.join(menu['ingredients'])}\nPrice Range: {menu['price_range']}"
-        doc = Document(page_content=content, metadata=menu)
-        documents.append(doc)
-
-    embedding_function = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    db = Chroma.from_documents(documents=documents, embedding=embedding_function, persist_directory=MENU_DB_PATH)
-    db.persist()
-    return db
-
+# 실제 메뉴 카탈로그(final_menu_data.csv)로 만든 인덱스 사용 (빌드는 python -m ai.build_menu_index)
 try:
-    menu_db = Chroma(persist_directory=MENU_DB_PATH, embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY))
-except:
-    menu_db = initialize_menu_db()
-
-menu_retriever = menu_db.as_retriever(search_kwargs={"k": 5})
+    menu_db = open_menu_index("improved_langchain_recommender", MENU_DB_PATH)
+    menu_retriever = menu_db.as_retriever(search_kwargs={"k": 5})
+except Exception as e:
+    print(f"⚠️ improved_langchain_recommender: 메뉴 인덱스를 열 수 없습니다. 후보 메뉴 없이 추천합니다. ({e})")
+    menu_db = None
+    menu_retriever = None
 
 @router.post("/llm-recommend")
 def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)):
@@ -85,11 +92,11 @@ def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)
     if not user:
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
 
-    irrelevant_keywords = ["심심", "뭐해", "ㅎㅇ", "하이", "안녕", "노잼", "ㅋㅋ", "ㅎㅎ", "hi", "hello", "bored"]
-    if input_data.mood and any(k in input_data.mood.lower() for k in irrelevant_keywords):
+    # 인사/잡담 같은 기분 입력은 LLM 호출 전에 차단 (분류기는 자유 대화용이라 mood에는 쓰지 않음)
+    if input_data.mood and is_off_topic_mood(input_data.mood):
         return {
             "recommended_menu": "추천 불가",
-            "recommendation_reason": "저는 음식 추천만 도와드릴 수 있어요. 음식 관련 요청을 해주세요 :)",
+            "recommendation_reason": OFF_TOPIC_REPLY,
             "alternative_options": []
         }
 
@@ -107,39 +114,12 @@ def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)
         raise HTTPException(status_code=400, detail=f"예산은 {valid_budget} 중 하나여야 합니다.")
 
     search_query = f"예산: {input_data.budget} 날씨: {input_data.weather} 선호: {', '.join(input_data.preferences)}"
-    relevant_menus = menu_retriever.get_relevant_documents(search_query)
-
-    menu_context = "\n".join([f"Menu {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
-    parser = PydanticOutputParser(pydantic_object=MenuRecommendation)
-
-    prompt_template = ChatPromptTemplate.from_template("""
-You are a smart, friendly AI assistant that recommends meals based on user data.
-
-[User Info]
-Username: {username}
-Allergies: {allergies}
-Diseases: {diseases}
-Likes: {preferences}
-Dislikes: {dislikes}
-Weather: {weather}
-Eating Alone: {alone}
-Budget: {budget}
-Mood: {mood}
-Previous Recommendations: {previous_recommendations}
-
-[Candidate Menus]
-{menu_context}
-
-[Instructions]
-- Recommend 1 best-fitting meal and explain briefly why it's suitable (1–2 sentences).
-- Suggest 2–3 alternative options.
-- Avoid allergens and health risks.
-- Do not repeat previously recommended menus.
-- Follow this JSON format exactly:
-{format_instructions}
-""")
-
-    prompt = prompt_template.format(
+    if menu_retriever:
+        relevant_menus = menu_retriever.get_relevant_documents(search_query)
+        menu_context = "\n".join([f"Menu {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
+    else:
+        menu_context = "No menu information available"
+    prompt = RECOMMEND_PROMPT.format(
         username=input_data.username,
         allergies=", ".join(input_data.allergies) or "None",
         diseases=", ".join(input_data.diseases) or "None",
@@ -151,20 +131,16 @@ Previous Recommendations: {previous_recommendations}
         mood=input_data.mood or "Not specified",
         previous_recommendations=", ".join(input_data.previous_recommendations) or "None",
         menu_context=menu_context,
-        format_instructions=parser.get_format_instructions()
+        format_instructions=COMPACT_FORMAT_INSTRUCTIONS
     )
 
     try:
-        response = llm.invoke(prompt)
-        if not response.content.strip():
-            return {"recommended_menu": "추천 실패", "recommendation_reason": "AI 응답이 비어있습니다.", "alternative_options": []}
-        parsed_response = parser.parse(response.content)
-        return parsed_response.dict()
+        # 구조화 출력 → 로컬 JSON 복구 → 카탈로그 메뉴명 검증
+        return invoke_structured(llm, prompt, MenuRecommendation, "improved_llm_recommend")
     except Exception as e:
-        result_text = getattr(response, "content", "").strip() if 'response' in locals() else ""
         return {
             "recommended_menu": "추천 처리 중 오류 발생",
-            "recommendation_reason": f"오류: {str(e)} | 응답 내용: {result_text}",
+            "recommendation_reason": f"오류: {str(e)}",
             "alternative_options": []
         }
 
@@ -183,7 +159,7 @@ def chat_with_menu_assistant(chat_data: dict):
     message = chat_data.get("message", "")
     chat_history = chat_data.get("history", [])
     context = "\n".join([f"User: {msg['user']}\nAssistant: {msg['assistant']}" for msg in chat_history[-5:]])
-    chat_prompt = ChatPromptTemplate.from_template("""
+    chat_prompt = compile_template("""
 You are the friendly and concise AI assistant of the 'Today's Menu' app.
 
 [Conversation History]
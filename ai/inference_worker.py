@@ -0,0 +1,121 @@
+# --- 마이크로 배치 PyTorch 추론 워커 ---
+# 요청마다 배치 1로 forward를 돌리면 요청 스레드(Starlette threadpool)마다 PyTorch intra-op 스레드가
+# 코어를 나눠 쓰려고 경쟁한다. 워커 스레드 하나가 모델을 소유하고,
+# 동시에 들어온 입력을 최대 MAX_BATCH_SIZE개 / 첫 요청 후 MAX_WAIT_MS 동안 모아 forward 한 번으로 처리한다.
+# 호출 쪽은 submit()이 돌려주는 Future를 기다린다 (async 엔드포인트는 asyncio.wrap_future).
+# 기다리다 포기한(취소된) 요청은 큐에서 꺼낼 때 건너뛰고, 배치 하나가 실패해도 워커 스레드는 계속 돈다.
+#
+# INFERENCE_MAX_BATCH    배치 최대 크기 (기본 64)
+# INFERENCE_MAX_WAIT_MS  첫 요청 이후 배치를 모으는 최대 시간 (기본 2ms)
+# INFERENCE_THREADS      워커의 torch.set_num_threads 값 (기본 min(4, 코어 수))
+# INFERENCE_TIMEOUT      predict()가 결과를 기다리는 최대 시간 (기본 2초)
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import torch
+
+from ai import metrics
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+NUM_THREADS = int(os.getenv("INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
+PREDICT_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "2"))
+
+
+class InferenceWorker:
+    def __init__(self, model: torch.nn.Module, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS, num_threads: int = NUM_THREADS, name: str = "inference",
+                 input_dim: int = None):
+        self.model = model
+        # 길이가 다른 입력 하나가 배치 전체를 깨뜨리지 않게 미리 확인한다.
+        # 지정하지 않으면 첫 Linear 가중치 (hidden, input)에서 읽는다 (양자화 모델은 파라미터가 없으므로 지정 필요)
+        self.input_dim = input_dim or next(model.parameters()).shape[1]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_threads = num_threads
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+                self._thread.start()
+
+    def submit(self, features: list[float]) -> Future:
+        """입력 벡터 하나 → 확률 벡터(list[float])를 담을 Future"""
+        if len(features) != self.input_dim:
+            raise ValueError(f"입력 길이는 {self.input_dim}이어야 합니다. (받은 길이: {len(features)})")
+        future = Future()
+        self._queue.put((torch.tensor(features, dtype=torch.float32), future, time.perf_counter()))
+        self.start()
+        return future
+
+    def stop(self):
+        """큐에 이미 들어온 요청까지 처리한 뒤 워커 스레드를 끝낸다 (모델 교체 시 이전 워커 정리).
+        교체 직전에 이 워커를 잡은 요청이 뒤늦게 submit 하면 스레드를 다시 띄워 처리하고 다시 끝낸다."""
+        self._stopping = True
+        self._queue.put(None)  # 대기 중인 get()을 깨운다
+
+    def predict(self, features: list[float], timeout: float = PREDICT_TIMEOUT) -> list[float]:
+        """timeout 안에 결과가 없으면 요청을 취소하고 concurrent.futures.TimeoutError"""
+        future = self.submit(features)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            metrics.incr(f"{self.name}.timeout")
+            raise
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # 코어는 이 스레드만 쓰도록 intra-op 스레드 수를 고정
+        torch.set_num_threads(self.num_threads)
+        while True:
+            batch = []
+            try:
+                # 이미 취소된 요청(타임아웃, 연결 끊김)은 forward에서 빼고, 나머지는 실행 중으로 표시해 취소를 막는다
+                batch = [item for item in self._collect()
+                         if item is not None and item[1].set_running_or_notify_cancel()]
+                if batch:
+                    self._forward(batch)
+            except Exception as e:
+                # 배치 하나의 오류로 워커 스레드가 죽어 이후 요청이 모두 멈추지 않도록 해당 배치만 실패 처리
+                print(f"⚠️ {self.name}: 배치 처리 실패 ({e})")
+                metrics.incr(f"{self.name}.batch_error")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if self._stopping:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+
+    def _forward(self, batch: list):
+        started = time.perf_counter()
+        with torch.inference_mode():
+            outputs = self.model(torch.stack([features for features, _, _ in batch])).tolist()
+
+        metrics.observe(f"{self.name}.batch_size", len(batch))
+        metrics.observe(f"{self.name}.forward_ms", (time.perf_counter() - started) * 1000)
+        for (_, future, enqueued), output in zip(batch, outputs):
+            metrics.observe(f"{self.name}.queue_ms", (started - enqueued) * 1000)
+            future.set_result(output)
@@ -0,0 +1,123 @@
+# --- 음식과 무관한 메시지를 LLM 호출 전에 거르는 로컬 분류기 ---
+# 문자 n-gram(1~3) 해싱 + 로지스틱 회귀. 학습은 python -m ai.train_intent_gate 로 오프라인에서 하고
+# 가중치는 ai/models/intent_gate.json (0이 아닌 가중치만)으로 배포한다.
+# 메시지 하나 판정에 수십 µs 수준이라 요청 경로에서 바로 호출해도 된다.
+# 아티팩트가 없으면 예전 irrelevant_keywords 부분 문자열 방식으로 동작한다.
+# 판단 근거가 적은 짧은 메시지(MIN_GATE_CHARS 미만)는 차단하지 않고 통과시킨다 (fail open).
+# 분류기는 자유 대화 메시지(/chat)로 학습했으므로 그 경로에만 쓴다. 추천 API의 mood 필드는
+# "날씨가 너무 추워", "친구랑 만나" 같은 상황 문장이라 분류기가 off-topic으로 보기 쉬우므로
+# 기존처럼 인사/잡담 키워드만 막는다 (is_off_topic_mood).
+#
+# INTENT_GATE_THRESHOLD  off-topic으로 볼 확률 기준 (기본: 아티팩트에 저장된 값)
+# INTENT_LOG_PATH        설정하면 판정한 메시지를 JSONL로 남긴다 (라벨링 후 재학습용)
+
+import json
+import math
+import os
+import re
+import zlib
+
+from ai import metrics
+
+GATE_PATH = "./ai/models/intent_gate.json"
+FEATURE_DIM = 1 << 16
+NGRAM_RANGE = (1, 3)
+MIN_GATE_CHARS = 4  # 공백 제외 글자 수. "밥", "국밥", "ㅋㅋ"처럼 짧은 입력은 판정하지 않음
+
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH")
+
+OFF_TOPIC_REPLY = "저는 음식 추천만 도와드릴 수 있어요. 음식 관련 요청을 해주세요 :)"
+
+# 아티팩트가 없을 때 쓰는 기존 키워드 목록
+IRRELEVANT_KEYWORDS = ["심심", "뭐해", "ㅎㅇ", "하이", "안녕", "노잼", "ㅋㅋ", "ㅎㅎ", "hi", "hello", "bored"]
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _whitespace.sub(" ", (text or "").lower()).strip()
+
+
+def features(text: str) -> dict:
+    """해싱된 n-gram 인덱스 -> 값 (L2 정규화)"""
+    padded = f" {normalize(text)} "
+    counts = {}
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            idx = zlib.crc32(padded[i:i + n].encode("utf-8")) % FEATURE_DIM
+            counts[idx] = counts.get(idx, 0) + 1
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {idx: v / norm for idx, v in counts.items()}
+
+
+def has_irrelevant_keyword(text: str) -> bool:
+    lowered = (text or "").lower()
+    return any(k in lowered for k in IRRELEVANT_KEYWORDS)
+
+
+def sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class IntentGate:
+    def __init__(self, weights: dict = None, bias: float = 0.0, threshold: float = 0.5):
+        self.weights = weights
+        self.bias = bias
+        self.threshold = float(os.getenv("INTENT_GATE_THRESHOLD", threshold))
+
+    @classmethod
+    def load(cls, path: str = GATE_PATH) -> "IntentGate":
+        if not os.path.exists(path):
+            print(f"⚠️ {path} 없음: 키워드 기반 필터로 동작합니다. (python -m ai.train_intent_gate)")
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            artifact = json.load(f)
+        weights = {int(k): v for k, v in artifact["weights"].items()}
+        return cls(weights, artifact["bias"], artifact["threshold"])
+
+    def score(self, text: str) -> float:
+        """off-topic일 확률"""
+        if self.weights is None:
+            return 1.0 if has_irrelevant_keyword(text) else 0.0
+        z = self.bias + sum(self.weights.get(idx, 0.0) * v for idx, v in features(text).items())
+        return sigmoid(z)
+
+    def is_off_topic(self, text: str) -> bool:
+        if not text:
+            return False
+        if len(normalize(text).replace(" ", "")) < MIN_GATE_CHARS:
+            metrics.incr("intent_gate.passed_short")
+            return False
+        score = self.score(text)
+        blocked = score >= self.threshold
+        # 차단 건수 = 절약한 LLM 호출 수
+        metrics.incr("intent_gate.blocked" if blocked else "intent_gate.passed")
+        if INTENT_LOG_PATH:
+            with open(INTENT_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text, "score": round(score, 4), "blocked": blocked}, ensure_ascii=False) + "\n")
+        return blocked
+
+
+_gate = None
+
+
+def get_gate() -> IntentGate:
+    global _gate
+    if _gate is None:
+        _gate = IntentGate.load()
+    return _gate
+
+
+def is_off_topic(text: str) -> bool:
+    """자유 대화 메시지용 (분류기)"""
+    return get_gate().is_off_topic(text)
+
+
+def is_off_topic_mood(mood: str) -> bool:
+    """추천 요청의 mood 필드용: 인사/잡담 키워드만 차단한다"""
+    blocked = has_irrelevant_keyword(mood)
+    if blocked:
+        metrics.incr("intent_gate.mood_blocked")
+    return blocked
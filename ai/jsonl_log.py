@@ -0,0 +1,90 @@
+# --- 요청 경로에서 쓰는 JSONL 로그 (백그라운드 기록 + 크기 제한/회전) ---
+# 요청 처리 중에는 줄을 큐에 넣기만 하고, 로그마다 데몬 스레드 하나가 모아서 파일에 이어 쓴다.
+# 파일이 max_bytes를 넘으면 <path>.1 로 옮기고(기존 .1은 덮어씀) 새 파일에 쓰므로
+# 로그 하나의 디스크 사용량은 대략 2 × max_bytes 이하다. read_jsonl()은 <path>.1 → <path> 순서로 읽는다.
+# 디스크가 느려 큐가 가득 차면 기다리지 않고 줄을 버린 뒤 <이름>.dropped 카운터만 올린다.
+#
+# JSONL_LOG_MAX_BYTES  로그 파일 하나의 최대 크기 (기본 50MB)
+
+import json
+import os
+import queue
+import threading
+
+from ai import metrics
+
+MAX_BYTES = int(os.getenv("JSONL_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+QUEUE_SIZE = 10000
+
+
+def rotated_path(path: str) -> str:
+    return path + ".1"
+
+
+class JsonlLog:
+    def __init__(self, path: str, name: str, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.name = name
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def append(self, record: dict):
+        """요청 경로에서 호출: 파일 I/O 없이 큐에만 넣는다. (path가 빈 값이면 기록 안 함)"""
+        if not self.path:
+            return
+        try:
+            self._queue.put_nowait(json.dumps(record, ensure_ascii=False) + "\n")
+        except queue.Full:
+            metrics.incr(f"{self.name}.dropped")
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"{self.name}-log", daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        """큐에 쌓인 줄이 모두 파일에 쓰일 때까지 기다린다 (배치 작업/테스트용)"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(lines)
+            except OSError as e:
+                print(f"⚠️ {self.name}: 로그 기록 실패 ({e})")
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+    def _write(self, lines: list[str]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, rotated_path(self.path))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+
+def read_jsonl(path: str) -> list[dict]:
+    """회전된 이전 파일(<path>.1)과 현재 파일을 오래된 순서로 읽는다. (기록 중 끊긴 줄은 건너뜀)"""
+    rows = []
+    for candidate in (rotated_path(path), path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+    return rows
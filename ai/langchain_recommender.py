@@ -1,25 +1,30 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_chroma import Chroma
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from langchain.schema import Document
 import os
 import json
 from typing import List, Optional
 from models import User, SessionLocal
+from ai.backends import get_chat_model, get_embeddings, require_api_key
+from ai.build_menu_index import open_menu_index
+from ai.intent_gate import OFF_TOPIC_REPLY, is_off_topic_mood
+from ai.prompt_cache import compile_template
+from ai.structured_output import COMPACT_FORMAT_INSTRUCTIONS, invoke_structured
+from ai.hybrid_retrieval import RetrievalFilters, extract_situation_tags, hybrid_search
+from ai.orchestrator import BUDGET_SECONDS, fallback_recommendation, recommend_with_budget
+from ai.distillation import fast_recommend, record_teacher
+from ai.features import RequestContext, UserProfile
 
 router = APIRouter(prefix="/menu")
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set.")
+OPENAI_API_KEY = require_api_key()
 
 MENU_DB_PATH = "./chroma_db/menu_db"
 
-llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, api_key=OPENAI_API_KEY)
+llm = get_chat_model("gpt-4o", temperature=0.7, timeout=BUDGET_SECONDS, max_retries=0)
 
 class MenuRecommendation(BaseModel):
     recommended_menu: str = Field(description="추천된 메뉴")
@@ -37,6 +42,37 @@ class LLMRecommendRequest(BaseModel):
     budget: str
     mood: Optional[str] = None
     previous_recommendations: List[str] = []
+    mode: str = "llm"  # "fast": LLM 대신 증류 학생 모델로 즉시 응답 (ai.distillation)
+
+# 고정 지시문/출력 형식을 앞에 두어 요청 간 prompt prefix가 동일하도록 구성 (한 번만 컴파일)
+RECOMMEND_PROMPT = compile_template("""
+You are a helpful AI that recommends meals considering health conditions, allergies, preferences, mood, and weather.
+
+[Instructions]
+1. Avoid allergens and inappropriate ingredients for the user's health conditions.
+2. Consider their preferences, mood, budget, and weather.
+3. Do not recommend previous menus again.
+4. Recommend **one main menu** with a brief explanation (1–2 sentences).
+5. Also suggest **2–3 alternative options**.
+6. Follow the output format exactly as described below.
+
+{format_instructions}
+
+[User Information]
+- Username: {username}
+- Allergies: {allergies}
+- Diseases: {diseases}
+- Preferences: {preferences}
+- Dislikes: {dislikes}
+- Weather: {weather}
+- Eating Alone: {alone}
+- Budget: {budget}
+- Mood: {mood}
+- Previous Recommendations: {previous_recommendations}
+
+[Relevant Menu Data]
+{menu_context}
+""")
 
 def get_db():
     db = SessionLocal()
@@ -45,30 +81,12 @@ def get_db():
     finally:
         db.close()
 
-def initialize_menu_db():
-    sample_menus = [
-        {"name": "김치찌개", "ingredients": ["김치", "돼지고기"], "type": "한식", "price_range": "중간"},
-        {"name": "비빔밥", "ingredients": ["쌀", "나물"], "type": "한식", "price_range": "중간"},
-        {"name": "스테이크", "ingredients": ["소고기"], "type": "양식", "price_range": "높음"},
-    ]
-
-    documents = []
-    for menu in sample_menus:
-        content = f"이름: {menu['name']}\n종류: {menu['type']}\n재료: {', '.join(menu['ingredients'])}\n가격대: {menu['price_range']}"
-        doc = Document(page_content=content, metadata=menu)
-        documents.append(doc)
-
-    embedding_function = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
-    db = Chroma.from_documents(documents, embedding_function, persist_directory=MENU_DB_PATH)
-    db.persist()
-    return db
-
+# 실제 메뉴 카탈로그(final_menu_data.csv)로 만든 인덱스 사용 (빌드는 python -m ai.build_menu_index)
 try:
-    menu_db = Chroma(persist_directory=MENU_DB_PATH, embedding_function=OpenAIEmbeddings(api_key=OPENAI_API_KEY))
-    menu_retriever = menu_db.as_retriever(search_kwargs={"k": 5})
-except:
-    menu_db = initialize_menu_db()
-    menu_retriever = menu_db.as_retriever(search_kwargs={"k": 5})
+    menu_db = open_menu_index("langchain_recommender", MENU_DB_PATH)
+except Exception as e:
+    print(f"⚠️ langchain_recommender: 메뉴 인덱스를 열 수 없습니다. 후보 메뉴 없이 추천합니다. ({e})")
+    menu_db = None
 
 @router.post("/llm-recommend")
 def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)):
@@ -76,12 +94,11 @@ def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # 음식과 무관한 기분 입력 차단
-    irrelevant_keywords = ["심심", "뭐해", "ㅎㅇ", "하이", "안녕", "노잼", "ㅋㅋ", "ㅎㅎ", "hi", "hello", "bored"]
-    if input_data.mood and any(k in input_data.mood.lower() for k in irrelevant_keywords):
+    # 인사/잡담 같은 기분 입력은 LLM 호출 전에 차단 (분류기는 자유 대화용이라 mood에는 쓰지 않음)
+    if input_data.mood and is_off_topic_mood(input_data.mood):
         return {
             "recommended_menu": "추천 불가",
-            "recommendation_reason": "저는 음식 추천만 도와드릴 수 있어요. 음식 관련 요청을 해주세요 :)",
+            "recommendation_reason": OFF_TOPIC_REPLY,
             "alternative_options": []
         }
     
@@ -90,64 +107,57 @@ def llm_recommend(input_data: LLMRecommendRequest, db: Session = Depends(get_db)
     input_data.preferences = input_data.preferences or [p.menu_name for p in user.preferences if p.preference_type == "선호"]
     input_data.dislikes = input_data.dislikes or [p.menu_name for p in user.preferences if p.preference_type == "비선호"]
 
-    search_query = f"예산: {input_data.budget} 날씨: {input_data.weather} 선호: {', '.join(input_data.preferences)}"
-    relevant_menus = menu_retriever.get_relevant_documents(search_query)
-    
-    menu_context = "\n".join([f"메뉴 {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
-
-    parser = PydanticOutputParser(pydantic_object=MenuRecommendation)
-
-    prompt_template = ChatPromptTemplate.from_template("""
-You are a helpful AI that recommends meals considering health conditions, allergies, preferences, mood, and weather.
-
-[User Information]
-- Username: {username}
-- Allergies: {allergies}
-- Diseases: {diseases}
-- Preferences: {preferences}
-- Dislikes: {dislikes}
-- Weather: {weather}
-- Eating Alone: {alone}
-- Budget: {budget}
-- Mood: {mood}
-- Previous Recommendations: {previous_recommendations}
-
-[Relevant Menu Data]
-{menu_context}
-
-[Instructions]
-1. Avoid allergens and inappropriate ingredients for the user's health conditions.
-2. Consider their preferences, mood, budget, and weather.
-3. Do not recommend previous menus again.
-4. Recommend **one main menu** with a brief explanation (1–2 sentences).
-5. Also suggest **2–3 alternative options**.
-6. Follow the output format exactly as described below.
-
-{format_instructions}
-""")
-
-    prompt = prompt_template.format(
-        username=input_data.username,
-        allergies=", ".join(input_data.allergies),
-        diseases=", ".join(input_data.diseases),
-        preferences=", ".join(input_data.preferences),
-        dislikes=", ".join(input_data.dislikes),
-        weather=input_data.weather,
-        alone=input_data.alone,
-        budget=input_data.budget,
-        mood=input_data.mood or "정보 없음",
-        previous_recommendations=", ".join(input_data.previous_recommendations),
-        menu_context=menu_context,
-        format_instructions=parser.get_format_instructions()
-    )
-
-    try:
-        response = llm.invoke(prompt)
-        parsed = parser.parse(response.content)
-        return parsed.dict()
-    except Exception as e:
-        return {
-            "recommended_menu": "추천 실패",
-            "recommendation_reason": f"오류 발생: {str(e)}",
-            "alternative_options": []
-        }
+    profile = UserProfile(tuple(input_data.allergies), tuple(input_data.diseases),
+                          tuple(input_data.preferences), tuple(input_data.dislikes))
+    context = RequestContext(weather=input_data.weather, solo=input_data.alone == "혼자", budget=input_data.budget)
+    if input_data.mode == "fast":
+        result = fast_recommend("menu_llm_recommend", profile, context,
+                                context_text=input_data.mood or input_data.weather,
+                                exclude=input_data.previous_recommendations)
+        if result is not None:
+            return result
+
+    # 검색 + LLM 호출 + 파싱 전체를 지연 예산 안에서 실행
+    def call_llm():
+        search_query = f"예산: {input_data.budget} 날씨: {input_data.weather} 선호: {', '.join(input_data.preferences)}"
+        filters = RetrievalFilters(
+            allergies=input_data.allergies, diseases=input_data.diseases, budget=input_data.budget,
+            exclude_menus=input_data.previous_recommendations
+        )
+        keywords = extract_situation_tags(f"{input_data.mood or ''} {input_data.weather}") + input_data.preferences
+        if menu_db:
+            relevant_menus = hybrid_search(menu_db, search_query, filters, k=5, keywords=keywords)
+            menu_context = "\n".join([f"메뉴 {i+1}: {doc.page_content}" for i, doc in enumerate(relevant_menus)])
+        else:
+            menu_context = "관련 메뉴 정보 없음"
+
+        prompt = RECOMMEND_PROMPT.format(
+            username=input_data.username,
+            allergies=", ".join(input_data.allergies),
+            diseases=", ".join(input_data.diseases),
+            preferences=", ".join(input_data.preferences),
+            dislikes=", ".join(input_data.dislikes),
+            weather=input_data.weather,
+            alone=input_data.alone,
+            budget=input_data.budget,
+            mood=input_data.mood or "정보 없음",
+            previous_recommendations=", ".join(input_data.previous_recommendations),
+            menu_context=menu_context,
+            format_instructions=COMPACT_FORMAT_INSTRUCTIONS
+        )
+
+        # 구조화 출력 → 로컬 JSON 복구 → 카탈로그 메뉴명 검증 (실패하면 규칙 기반으로 대체)
+        return invoke_structured(llm, prompt, MenuRecommendation, "menu_llm_recommend")
+
+    # 예산 안에 LLM 응답이 없거나 실패하면 규칙 기반 추천으로 대체
+    def fallback():
+        return fallback_recommendation(
+            input_data.budget, input_data.allergies, input_data.diseases,
+            context=input_data.mood or input_data.weather, alone=input_data.alone,
+            exclude_menus=input_data.previous_recommendations
+        )
+
+    result = recommend_with_budget("menu_llm_recommend", call_llm, fallback)
+    # LLM이 직접 답한 응답은 증류 학습 쌍으로 기록 + 학생 모델과의 일치율 집계
+    record_teacher("menu_llm_recommend", profile, context, result, exclude=input_data.previous_recommendations)
+    return result
@@ -0,0 +1,298 @@
+# --- 프로세스 내 LLM 호출 스케줄러 ---
+# 모든 OpenAI 호출(챗/임베딩)은 ai.llm_transport를 거쳐 이 스케줄러에서 순서를 받는다.
+#   - 분당 요청 수 / 분당 토큰 수 토큰 버킷 (LLM_RPM, LLM_TPM)
+#   - 우선순위: stream(상황 스트림·챗봇 스트림) > chat(대화·추천) > batch(미리 생성·요약·인덱스 빌드)
+#     같은 등급 안에서는 먼저 온 순서, batch는 버킷에 여유(BATCH_RESERVE)가 있을 때만 나간다.
+#   - 429 / 5xx / 연결 실패는 지터를 준 지수 백오프로 재시도하고(Retry-After 우선),
+#     429를 받으면 잠시 모든 대기 호출을 멈춰 한꺼번에 다시 두드리지 않게 한다.
+#   - 대기 시간(llm_scheduler.queue_ms.<등급>), 대기열 길이, 재시도/포기 횟수를 ai.metrics에 기록한다.
+# 대기는 폴링하지 않는다. 대기열 맨 앞 호출만 버킷이 찰 시각(또는 429 정지가 끝날 시각)까지 타이머로 자고,
+# 나머지는 앞 호출이 허가되거나 빠질 때 깨워 준다 (스레드는 threading.Event, 코루틴은 asyncio.Event).
+# 스레드 호출과 공유하는 상태는 짧은 락으로만 보호하고, 락을 잡은 채로 기다리지 않는다.
+#
+# 호출 쪽에서 등급을 바꾸려면 with priority_scope("batch"): ... (contextvar, asyncio 태스크/to_thread에 전파됨)
+# 지연 예산이 있는 호출은 with deadline_scope(time.monotonic() + 예산): ... 으로 감싼다. 그 시각이 지나면
+# 대기열에서 더 기다리지 않고(DeadlineExceeded), 백오프가 시각을 넘기는 재시도는 하지 않고 마지막 오류를 올린다.
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from ai import metrics
+
+PRIORITIES = {"stream": 0, "chat": 1, "batch": 2}
+DEFAULT_PRIORITY = "chat"
+
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TPM", "200000"))
+BURST_SECONDS = 10.0  # 버킷 크기 = 10초 분량 (분당 한도를 첫 1초에 다 쓰지 않도록)
+BATCH_RESERVE = 0.25  # batch는 버킷이 25% 이상 남아 있을 때만 사용
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 20.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_priority = contextvars.ContextVar("llm_priority", default=None)
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class UpstreamBusy(Exception):
+    """재시도할 만한 업스트림 응답 (429/5xx/연결 실패). response는 마지막 시도에서 그대로 돌려줄 응답."""
+
+    def __init__(self, status_code: int, retry_after: float = None, response=None):
+        super().__init__(f"upstream busy ({status_code})")
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.response = response
+
+
+class DeadlineExceeded(Exception):
+    """deadline_scope의 시각이 지나 대기열에서 빠짐"""
+
+
+@contextlib.contextmanager
+def priority_scope(name: str):
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(default: str = DEFAULT_PRIORITY) -> str:
+    return _priority.get() or default
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: float):
+    """deadline: time.monotonic() 기준 시각. 이미 더 이른 deadline 안이면 그쪽을 유지한다."""
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def parse_retry_after(value) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_hint(exc: Exception):
+    """재시도 대상이면 (status, Retry-After 초), 아니면 None"""
+    if isinstance(exc, UpstreamBusy):
+        return exc.status_code, exc.retry_after
+    status = getattr(exc, "status_code", None)
+    if status in RETRY_STATUSES:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        return status, parse_retry_after(getattr(exc, "retry_after", None) or headers.get("retry-after"))
+    return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """amount를 꺼낸 뒤에도 capacity*reserve 이상 남기려면 기다려야 하는 시간"""
+        needed = min(amount, self.capacity) + self.capacity * reserve - self.level
+        return max(0.0, needed / self.rate) if needed > 0 else 0.0
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    """대기 중인 호출 하나. 맨 앞이 되거나 다시 확인할 일이 생기면 wake()로 깨운다."""
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:  # 루프가 이미 닫힘
+            pass
+
+
+class LLMScheduler:
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, burst_seconds: float = BURST_SECONDS, name: str = "llm_scheduler"):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.max_retries = max_retries
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waiting = []
+        self._waiters = {}
+        self._seq = itertools.count()
+
+    # ---------------------------
+    # 대기열
+    # ---------------------------
+    def _enter(self, priority: str, waiter: _Waiter):
+        ticket = (PRIORITIES.get(priority, PRIORITIES[DEFAULT_PRIORITY]), next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+            self._waiters[ticket] = waiter
+            metrics.gauge(f"{self.name}.queue_depth", len(self._waiting))
+        return ticket
+
+    def _wake_head(self):
+        """(락 안에서) 새로 맨 앞이 된 호출을 깨워 자기 차례를 확인하게 한다."""
+        if self._waiting:
+            self._waiters[self._waiting[0]].wake()
+
+    def _leave(self, ticket):
+        with self._lock:
+            if ticket in self._waiters:
+                was_head = self._waiting[0] == ticket
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                del self._waiters[ticket]
+                if was_head:
+                    self._wake_head()
+            metrics.gauge(f"{self.name}.queue_depth", len(self._waiting))
+
+    def _try_grant(self, ticket, priority: str, tokens: int):
+        """허가되면 0, 맨 앞이면 다시 확인할 때까지의 시간, 맨 앞이 아니면 None (깨워 줄 때까지 대기)"""
+        with self._lock:
+            if self._waiting[0] != ticket:
+                return None
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            reserve = BATCH_RESERVE if priority == "batch" else 0.0
+            wait = max(self.requests.wait_time(1, reserve), self.tokens.wait_time(tokens, reserve))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            heapq.heappop(self._waiting)
+            del self._waiters[ticket]
+            self._wake_head()
+            metrics.gauge(f"{self.name}.queue_depth", len(self._waiting))
+            return 0.0
+
+    def _granted(self, priority: str, started: float):
+        metrics.observe(f"{self.name}.queue_ms.{priority}", (time.monotonic() - started) * 1000)
+
+    def _wait_limit(self, wait, deadline):
+        """wait(None이면 깨워 줄 때까지)를 deadline까지로 자른다. deadline이 지났으면 DeadlineExceeded"""
+        if deadline is None:
+            return wait
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            metrics.incr(f"{self.name}.deadline_exceeded")
+            raise DeadlineExceeded()
+        return remaining if wait is None else min(wait, remaining)
+
+    def acquire(self, priority: str, tokens: int, deadline: float = None):
+        waiter = _Waiter()
+        ticket, started = self._enter(priority, waiter), time.monotonic()
+        try:
+            while True:
+                waiter.event.clear()
+                wait = self._try_grant(ticket, priority, tokens)
+                if wait == 0:
+                    break
+                waiter.event.wait(self._wait_limit(wait, deadline))
+        except BaseException:
+            self._leave(ticket)
+            raise
+        self._granted(priority, started)
+
+    async def aacquire(self, priority: str, tokens: int, deadline: float = None):
+        waiter = _Waiter(asyncio.get_running_loop())
+        ticket, started = self._enter(priority, waiter), time.monotonic()
+        try:
+            while True:
+                waiter.event.clear()
+                wait = self._try_grant(ticket, priority, tokens)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), self._wait_limit(wait, deadline))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._leave(ticket)
+            raise
+        self._granted(priority, started)
+
+    # ---------------------------
+    # 재시도
+    # ---------------------------
+    def _backoff(self, exc: Exception, attempt: int, deadline: float = None):
+        """재시도할 경우 기다릴 시간, 재시도하지 않으면 None"""
+        hint = retry_hint(exc)
+        if hint is None or attempt >= self.max_retries:
+            if hint is not None:
+                metrics.incr(f"{self.name}.gave_up")
+            return None
+        status, retry_after = hint
+        # full jitter: [0, min(cap, base * 2^attempt)] 중 임의의 값, 서버가 준 Retry-After가 더 길면 그것을 따름
+        delay = max(retry_after or 0.0, random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt)))
+        if status == 429:
+            metrics.incr(f"{self.name}.rate_limited")
+            with self._lock:
+                self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or delay))
+        # 호출 쪽 예산 안에 다시 보낼 수 없으면 기다리지 않는다 (버려진 호출이 자리를 잡고 있지 않도록)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            metrics.incr(f"{self.name}.deadline_gave_up")
+            return None
+        metrics.incr(f"{self.name}.retries")
+        return delay
+
+    def run(self, call, priority: str = None, tokens: int = 1):
+        priority = current_priority(priority or DEFAULT_PRIORITY)
+        deadline = _deadline.get()
+        for attempt in itertools.count():
+            self.acquire(priority, tokens, deadline)
+            try:
+                return call()
+            except Exception as e:
+                delay = self._backoff(e, attempt, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def arun(self, call, priority: str = None, tokens: int = 1):
+        priority = current_priority(priority or DEFAULT_PRIORITY)
+        deadline = _deadline.get()
+        for attempt in itertools.count():
+            await self.aacquire(priority, tokens, deadline)
+            try:
+                return await call()
+            except Exception as e:
+                delay = self._backoff(e, attempt, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+
+scheduler = LLMScheduler()
@@ -1,22 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import User, SessionLocal
 from pydantic import BaseModel
 from typing import List, Optional
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
+from ai.backends import get_chat_model, get_embeddings, require_api_key
+from ai.conversation_store import ConversationStore
+from ai.intent_gate import is_off_topic
+from ai.summary_memory import ConversationSummarizer, WindowSummaryMemory
 
 router = APIRouter(prefix="/chatbot")
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set.")
+OPENAI_API_KEY = require_api_key()
 
 # DB 
 def get_db():
@@ -38,18 +38,16 @@ class ChatResponse(BaseModel):
     conversation_id: str
     suggested_actions: List[str] = []
 
-# 대화 메모리
-conversation_memories = {}
+# 대화 메모리 (사용자별 세션, 최대 개수/TTL/토큰 상한 적용)
+conversation_store = ConversationStore("chatbot_conversations")
+# 오래된 턴은 응답 후 백그라운드에서 요약으로 접는다
+summarizer = ConversationSummarizer(conversation_store)
 
 # 챗봇 클래스
 class TodayMenuChatbot:
-    def __init__(self, openai_api_key):
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7,
-            api_key=openai_api_key
-        )
-        self.embeddings = OpenAIEmbeddings(api_key=openai_api_key)
+    def __init__(self):
+        self.llm = get_chat_model("gpt-3.5-turbo", temperature=0.7)
+        self.embeddings = get_embeddings()
 
         self.prompt_template = PromptTemplate.from_template("""
 The following is a conversation between a user and 'Today's Menu' AI assistant.
@@ -71,8 +69,10 @@ User: {input}
 AI Assistant:
 """)
 
-    def create_conversation_chain(self, user_info):
-        memory = ConversationBufferMemory(ai_prefix="AI Assistant", human_prefix="User")
+    def create_conversation_chain(self, user_info, history):
+        memory = WindowSummaryMemory(
+            chat_memory=history, memory_key="chat_history", ai_prefix="AI Assistant", human_prefix="User"
+        )
         prompt = self.prompt_template.partial(user_info=user_info)
         return ConversationChain(llm=self.llm, memory=memory, prompt=prompt, verbose=True)
 
@@ -91,10 +91,10 @@ AI Assistant:
 
         return suggestions[:3]
 
-chatbot = TodayMenuChatbot(OPENAI_API_KEY)
+chatbot = TodayMenuChatbot()
 
 @router.post("/chat", response_model=ChatResponse)
-def chat_with_bot(request: ChatRequest, db: Session = Depends(get_db)):
+def chat_with_bot(request: ChatRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == request.username).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -112,23 +112,20 @@ Preferred Menus: {', '.join(preferences) if preferences else 'None'}
 Disliked Menus: {', '.join(dislikes) if dislikes else 'None'}
 """
 
-    irrelevant_keywords = ["심심", "뭐해", "ㅎㅇ", "하이", "안녕", "노잼", "ㅋㅋ", "ㅎㅎ", "hi", "hello", "bored"]
-    if any(keyword in request.message.lower() for keyword in irrelevant_keywords):
+    # 음식과 무관한 메시지는 LLM 호출 전에 로컬 분류기로 차단
+    if is_off_topic(request.message):
         return ChatResponse(
             response="I'm here to help with meal recommendations. Please ask a food-related question.",
             conversation_id=request.conversation_id or f"conv_{request.username}_manual",
             suggested_actions=[]
         )
 
-    if not request.conversation_id or request.conversation_id not in conversation_memories:
-        conversation_id = f"conv_{user.username}_{len(conversation_memories) + 1}"
-        conversation = chatbot.create_conversation_chain(user_info)
-        conversation_memories[conversation_id] = conversation
-    else:
-        conversation_id = request.conversation_id
-        conversation = conversation_memories[conversation_id]
+    conversation_id, history = conversation_store.get_or_create(request.conversation_id, user.username)
+    conversation = chatbot.create_conversation_chain(user_info, history)
 
     response = conversation.predict(input=request.message)
+    conversation_store.trim(conversation_id)
+    background_tasks.add_task(summarizer.maybe_summarize, conversation_id)
     suggestions = chatbot.get_suggested_actions(request.message, response)
 
     return ChatResponse(
@@ -139,7 +136,6 @@ Disliked Menus: {', '.join(dislikes) if dislikes else 'None'}
 
 @router.delete("/conversation/{conversation_id}")
 def end_conversation(conversation_id: str):
-    if conversation_id in conversation_memories:
-        del conversation_memories[conversation_id]
+    if conversation_store.delete(conversation_id):
         return {"status": "success", "message": "Conversation ended."}
     raise HTTPException(status_code=404, detail="Conversation not found")
\ No newline at end of file
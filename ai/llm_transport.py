@@ -0,0 +1,109 @@
+# --- OpenAI 클라이언트용 httpx 전송 계층 ---
+# ChatOpenAI / OpenAIEmbeddings에 http_client / http_async_client로 넣으면
+# 모든 요청이 ai.llm_scheduler를 거친다 (토큰 추정 → 대기열 → 전송 → 429/5xx 재시도).
+# 재시도는 스케줄러가 맡으므로 클라이언트 쪽 max_retries는 0으로 둔다.
+
+import json
+
+import httpx
+
+from ai.llm_scheduler import RETRY_STATUSES, UpstreamBusy, parse_retry_after, scheduler
+from ai.prompt_budget import estimate_tokens
+
+DEFAULT_COMPLETION_TOKENS = 300
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def request_tokens(request: httpx.Request) -> int:
+    """요청 본문으로 TPM 버킷에서 꺼낼 토큰 수 추정 (입력 + 최대 출력)"""
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return DEFAULT_COMPLETION_TOKENS
+    if "input" in body:  # embeddings
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return sum(estimate_tokens(i) if isinstance(i, str) else len(i) for i in inputs) or 1
+    prompt = sum(estimate_tokens(_text(m.get("content"))) for m in body.get("messages", []))
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return prompt + completion
+
+
+def _busy(response: httpx.Response) -> UpstreamBusy:
+    return UpstreamBusy(response.status_code, parse_retry_after(response.headers.get("retry-after")), response)
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    def __init__(self, priority: str, inner: httpx.BaseTransport = None):
+        self.priority = priority
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+
+        def send():
+            try:
+                response = self.inner.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                raise UpstreamBusy(0)
+            if response.status_code in RETRY_STATUSES:
+                # 연결을 돌려주고 본문은 남겨서, 마지막 시도면 그대로 클라이언트에 넘긴다
+                response.read()
+                response.close()
+                raise _busy(response)
+            return response
+
+        try:
+            return scheduler.run(send, self.priority, request_tokens(request))
+        except UpstreamBusy as e:
+            if e.response is None:
+                raise httpx.ConnectError("upstream unavailable", request=request)
+            return e.response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncScheduledTransport(httpx.AsyncBaseTransport):
+    def __init__(self, priority: str, inner: httpx.AsyncBaseTransport = None):
+        self.priority = priority
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+
+        async def send():
+            try:
+                response = await self.inner.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                raise UpstreamBusy(0)
+            if response.status_code in RETRY_STATUSES:
+                await response.aread()
+                await response.aclose()
+                raise _busy(response)
+            return response
+
+        try:
+            return await scheduler.arun(send, self.priority, request_tokens(request))
+        except UpstreamBusy as e:
+            if e.response is None:
+                raise httpx.ConnectError("upstream unavailable", request=request)
+            return e.response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def http_clients(priority: str) -> dict:
+    """ChatOpenAI / OpenAIEmbeddings 생성자에 그대로 넘길 kwargs"""
+    return {
+        "http_client": httpx.Client(transport=ScheduledTransport(priority)),
+        "http_async_client": httpx.AsyncClient(transport=AsyncScheduledTransport(priority)),
+        "max_retries": 0,
+    }
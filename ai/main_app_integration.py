@@ -11,6 +11,7 @@ from ai.llm_service import router as llm_router
 from ai.langchain_recommender import router as langchain_router
 from ai.improved_ai_model import router as ai_model_router
 from ai.chatbot_integration import router as chatbot_router
+from ai.backends import LLM_BACKEND
 
 # API 키 검증
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -62,7 +63,8 @@ async def health_check():
             "ai_model": "active",
             "chatbot": "active"
         },
-        "openai_api": "available" if OPENAI_API_KEY else "unavailable"
+        "openai_api": "available" if OPENAI_API_KEY else "unavailable",
+        "llm_backend": LLM_BACKEND
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+# --- 메뉴 카탈로그 로드 / 버전 / 문서 렌더링 ---
+# data/final_menu_data.csv (menu_id, restaurant_id, 알러지, 지병, 감성 태그, 가격, 지역 포함)를
+# 한 곳에서 읽어 벡터 인덱스 빌드와 서버가 같은 형태로 사용하도록 한다.
+
+import ast
+import hashlib
+from functools import lru_cache
+
+import pandas as pd
+
+CATALOG_PATH = "./data/final_menu_data.csv"
+
+
+def split_tags(value) -> list[str]:
+    if pd.isna(value):
+        return []
+    return [t.strip() for t in str(value).split(",") if t.strip() and t.strip() != "없음"]
+
+
+def parse_diseases(value) -> list[str]:
+    if pd.isna(value):
+        return []
+    try:
+        return list(ast.literal_eval(str(value)))
+    except (ValueError, SyntaxError):
+        return split_tags(value)
+
+
+def catalog_version(path: str = CATALOG_PATH) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def load_catalog(path: str = CATALOG_PATH) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df["region"] = df["region"].str.strip()
+    df["menu_price"] = df["menu_price"].astype(int)
+    df["allergy_list"] = df["allergy"].apply(split_tags)
+    df["disease_list"] = df["disease"].apply(parse_diseases)
+    df["tag_list"] = df["top_tags"].apply(split_tags)
+    return df
+
+
+@lru_cache(maxsize=4)
+def get_catalog(path: str = CATALOG_PATH) -> pd.DataFrame:
+    return load_catalog(path)
+
+
+def render_menu_document(row) -> tuple[str, dict]:
+    """메뉴 한 행을 (임베딩할 본문, 스칼라 메타데이터)로 변환한다."""
+    allergies = ", ".join(row["allergy_list"]) or "없음"
+    diseases = ", ".join(row["disease_list"]) or "없음"
+    tags = ", ".join(row["tag_list"]) or "없음"
+
+    page_content = (
+        f"메뉴: {row['menu_name']}\n"
+        f"식당: {row['place_name']} ({row['region']})\n"
+        f"가격: {row['menu_price']}원\n"
+        f"알레르기: {allergies}\n"
+        f"주의 질환: {diseases}\n"
+        f"감성 태그: {tags}"
+    )
+    metadata = {
+        "menu_id": int(row["menu_id"]),
+        "restaurant_id": int(row["restaurant_id"]),
+        "menu_name": row["menu_name"],
+        "place_name": row["place_name"],
+        "region": row["region"],
+        "price": int(row["menu_price"]),
+        "allergy": ", ".join(row["allergy_list"]),
+        "disease": ", ".join(row["disease_list"]),
+        "tags": ", ".join(row["tag_list"]),
+        "url": row["url"],
+    }
+    return page_content, metadata
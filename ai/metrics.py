@@ -0,0 +1,57 @@
+# --- 프로세스 내 간단한 성능 지표 수집 ---
+# 카운터와 지연 시간(샘플)만 모아두고, /metrics 등에서 snapshot()으로 조회한다.
+
+import threading
+from collections import defaultdict, deque
+
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_gauges = {}
+
+
+def incr(name: str, value: int = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def gauge(name: str, value: float):
+    """현재 값(세션 수, 메모리 사용량 등)을 덮어써서 기록"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float):
+    with _lock:
+        _timings[name].append(value)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: list(samples) for name, samples in _timings.items()}
+
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {
+            name: {
+                "count": len(samples),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            }
+            for name, samples in timings.items()
+        },
+    }
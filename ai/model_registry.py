@@ -0,0 +1,173 @@
+# --- 로컬 모델 레지스트리 (체크포인트 디렉터리 + manifest.json) ---
+# ai/checkpoints/<버전>/ 디렉터리(model.pth + metadata.json)는 그대로 두고,
+# 어떤 버전이 있고 어느 버전을 서빙/섀도 평가하는지를 manifest.json 하나에 기록한다.
+#
+#   ai/checkpoints/manifest.json
+#     {"active": "<버전>", "previous": "<버전>", "shadow": "<버전>|null",
+#      "versions": {"<버전>": {"created_at", "registered_at", "catalog_version", "metrics"}}}
+#
+# 서빙(ai.model_serving)은 manifest가 바뀌면 재시작 없이 새 active/shadow 모델로 교체한다.
+# LATEST 파일도 active와 같게 맞춰 두므로 latest_checkpoint()를 쓰는 도구(ai.export_model 등)는 그대로 동작한다.
+# manifest가 없던 기존 디렉터리는 하위 버전 디렉터리와 LATEST로 manifest를 만들어 읽는다.
+#
+# 실행: python -m ai.model_registry list
+#       python -m ai.model_registry promote <버전>
+#       python -m ai.model_registry shadow <버전>|off
+#       python -m ai.model_registry rollback
+
+import argparse
+import json
+import os
+import time
+
+from ai.models.menu_model import CHECKPOINT_DIR, LATEST_FILE, latest_checkpoint, load_metadata
+
+MANIFEST_FILE = "manifest.json"
+
+
+def manifest_path(checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+    return os.path.join(checkpoint_dir, MANIFEST_FILE)
+
+
+def manifest_mtime(checkpoint_dir: str = CHECKPOINT_DIR):
+    """manifest(없으면 LATEST)의 수정 시각, 둘 다 없으면 None"""
+    for name in (MANIFEST_FILE, LATEST_FILE):
+        try:
+            return os.path.getmtime(os.path.join(checkpoint_dir, name))
+        except OSError:
+            continue
+    return None
+
+
+def _entry(directory: str) -> dict:
+    metadata = load_metadata(directory)
+    return {
+        "created_at": metadata.get("created_at"),
+        "registered_at": time.time(),
+        "catalog_version": metadata.get("catalog_version"),
+        "metrics": metadata.get("metrics", {}),
+    }
+
+
+def read_manifest(checkpoint_dir: str = CHECKPOINT_DIR) -> dict:
+    try:
+        with open(manifest_path(checkpoint_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+
+    # manifest 이전에 저장된 체크포인트: 버전 디렉터리 + LATEST에서 만든다
+    versions = {}
+    if os.path.isdir(checkpoint_dir):
+        for name in sorted(os.listdir(checkpoint_dir)):
+            directory = os.path.join(checkpoint_dir, name)
+            if os.path.exists(os.path.join(directory, "metadata.json")):
+                versions[name] = _entry(directory)
+    latest = latest_checkpoint(checkpoint_dir)
+    return {"active": os.path.basename(latest) if latest else None, "previous": None, "shadow": None,
+            "versions": versions}
+
+
+def write_manifest(manifest: dict, checkpoint_dir: str = CHECKPOINT_DIR):
+    """manifest와 LATEST를 각각 임시 파일 → os.replace로 원자적으로 바꾼다"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = manifest_path(checkpoint_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+    if manifest.get("active"):
+        latest = os.path.join(checkpoint_dir, LATEST_FILE)
+        with open(latest + ".tmp", "w", encoding="utf-8") as f:
+            f.write(manifest["active"])
+        os.replace(latest + ".tmp", latest)
+
+
+def version_dir(version: str, checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+    return os.path.join(checkpoint_dir, version)
+
+
+def _require(manifest: dict, version: str):
+    if version not in manifest["versions"]:
+        raise ValueError(f"등록되지 않은 버전입니다: {version} (python -m ai.model_registry list)")
+
+
+def register(directory: str, checkpoint_dir: str = CHECKPOINT_DIR, activate: bool = True) -> str:
+    """save_checkpoint가 저장한 디렉터리를 manifest에 추가한다. activate면 바로 서빙 버전으로 올린다."""
+    version = os.path.basename(os.path.normpath(directory))
+    manifest = read_manifest(checkpoint_dir)
+    manifest["versions"][version] = _entry(directory)
+    if activate:
+        _activate(manifest, version)
+    write_manifest(manifest, checkpoint_dir)
+    return version
+
+
+def _activate(manifest: dict, version: str):
+    if manifest.get("active") != version:
+        manifest["previous"] = manifest.get("active")
+        manifest["active"] = version
+    if manifest.get("shadow") == version:
+        manifest["shadow"] = None
+
+
+def promote(version: str, checkpoint_dir: str = CHECKPOINT_DIR):
+    manifest = read_manifest(checkpoint_dir)
+    _require(manifest, version)
+    _activate(manifest, version)
+    write_manifest(manifest, checkpoint_dir)
+
+
+def rollback(checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+    manifest = read_manifest(checkpoint_dir)
+    if not manifest.get("previous"):
+        raise ValueError("되돌릴 이전 버전이 없습니다.")
+    version = manifest["previous"]
+    _require(manifest, version)
+    _activate(manifest, version)
+    write_manifest(manifest, checkpoint_dir)
+    return version
+
+
+def set_shadow(version, checkpoint_dir: str = CHECKPOINT_DIR):
+    """섀도 평가할 후보 버전 지정 (None이면 해제)"""
+    manifest = read_manifest(checkpoint_dir)
+    if version is not None:
+        _require(manifest, version)
+        if version == manifest.get("active"):
+            raise ValueError(f"{version}은 이미 서빙 중인 버전입니다.")
+    manifest["shadow"] = version
+    write_manifest(manifest, checkpoint_dir)
+
+
+def print_versions(checkpoint_dir: str = CHECKPOINT_DIR):
+    manifest = read_manifest(checkpoint_dir)
+    for version, entry in sorted(manifest["versions"].items()):
+        role = "active" if version == manifest.get("active") else "shadow" if version == manifest.get("shadow") else ""
+        scores = " ".join(f"{key}={value:.4f}" for key, value in entry.get("metrics", {}).items()
+                          if key in ("loss", "top1", "top5") and value is not None)
+        print(f"{version:18s} {role:7s} catalog={entry.get('catalog_version')} {scores}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["list", "promote", "shadow", "rollback"])
+    parser.add_argument("version", nargs="?", help="promote/shadow 대상 버전 (shadow off 로 해제)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            print_versions(args.checkpoint_dir)
+        elif args.command == "rollback":
+            print(f"active → {rollback(args.checkpoint_dir)}")
+        elif not args.version:
+            raise ValueError(f"{args.command}에는 버전이 필요합니다.")
+        elif args.command == "promote":
+            promote(args.version, args.checkpoint_dir)
+            print(f"active → {args.version}")
+        else:
+            set_shadow(None if args.version == "off" else args.version, args.checkpoint_dir)
+            print(f"shadow → {args.version}")
+    except ValueError as e:
+        raise SystemExit(f"⚠️ {e}")
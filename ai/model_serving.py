@@ -0,0 +1,208 @@
+# --- 메뉴 모델 서빙: 레지스트리 기반 무중단 교체 + 섀도 평가 ---
+# 서빙할 모델은 하드코딩된 경로가 아니라 레지스트리(ai.model_registry)의 active 버전이다.
+#
+# 교체: 요청은 ModelServer.current()가 돌려주는 LoadedModel(버전, 워커, 메뉴 매핑) 스냅샷 하나만 쓴다.
+#   MODEL_RELOAD_INTERVAL 초마다 manifest 수정 시각을 확인하고, 바뀌었으면 백그라운드 스레드에서
+#   새 버전을 로드 + 워밍업한 뒤 참조 하나를 바꿔 끼운다. 이전 워커는 받은 요청을 끝까지 처리하고 멈춘다.
+#   로드에 실패하면 ⚠️ 로그만 남기고 기존 모델을 계속 쓴다.
+#
+# 섀도: manifest에 shadow 버전이 있으면 같이 로드해 두고, 실제 요청의 SHADOW_SAMPLE_RATE 비율만
+#   같은 입력으로 후보 모델에도 보낸다. 응답은 기다리지 않고(콜백), top-1 메뉴 일치 여부와
+#   지연 차이(후보 - 서빙)를 metrics(menu_model.shadow.*)와 SHADOW_LOG_PATH(JSONL)에 남긴다.
+#   python -m ai.model_serving 으로 로그를 요약한다.
+#
+# MODEL_RELOAD_INTERVAL  manifest 확인 간격 (기본 5초)
+# SHADOW_SAMPLE_RATE     섀도로 보낼 요청 비율 (기본 0.1)
+# SHADOW_LOG_PATH        섀도 비교 로그 (기본 ./data/shadow_menu_model.jsonl, 빈 값이면 기록 안 함)
+#                        백그라운드 스레드가 기록하고 크기가 넘으면 회전한다 (ai.jsonl_log)
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from ai import metrics
+from ai.features import user_feature_names
+from ai.inference_worker import InferenceWorker
+from ai.jsonl_log import JsonlLog, read_jsonl
+from ai.model_registry import manifest_mtime, read_manifest, version_dir
+from ai.models.menu_model import CHECKPOINT_DIR, load_menu_model, load_metadata, serving_model_path
+
+RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", "./data/shadow_menu_model.jsonl")
+SHADOW_THREADS = 1  # 섀도 평가가 서빙 워커의 코어를 빼앗지 않도록
+WARMUP_TIMEOUT = 60.0  # 첫 forward(스레드 풀/커널 초기화 포함)는 요청 타임아웃보다 오래 걸릴 수 있다
+
+_shadow_log = JsonlLog(SHADOW_LOG_PATH, "menu_model.shadow_log")
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str
+    worker: InferenceWorker
+    menus: list
+    schema_matches: bool
+
+    def top_menu(self, prediction: list[float]) -> dict:
+        return self.menus[max(range(len(prediction)), key=prediction.__getitem__)]
+
+
+def load_version(directory: str, name: str = "menu_inference", num_threads: int = None) -> LoadedModel:
+    metadata = load_metadata(directory)
+    dim = metadata["feature_schema"]["dim"]
+    options = {"num_threads": num_threads} if num_threads else {}
+    worker = InferenceWorker(load_menu_model(serving_model_path(directory, metadata)), name=name,
+                             input_dim=dim, **options)
+    # 교체 직후 첫 요청이 스레드 시작/첫 forward 비용을 떠안지 않도록 미리 한 번 돌린다
+    worker.predict([0.0] * dim, timeout=WARMUP_TIMEOUT)
+    schema_matches = metadata["feature_schema"]["names"] == user_feature_names()
+    if not schema_matches:
+        print(f"⚠️ model_serving: {directory}의 특성 스키마가 현재 ai.features와 다릅니다. 다시 학습하세요.")
+    return LoadedModel(os.path.basename(os.path.normpath(directory)), worker, metadata["menus"], schema_matches)
+
+
+class ModelServer:
+    def __init__(self, checkpoint_dir: str = CHECKPOINT_DIR, reload_interval: float = RELOAD_INTERVAL,
+                 shadow_sample_rate: float = SHADOW_SAMPLE_RATE):
+        self.checkpoint_dir = checkpoint_dir
+        self.reload_interval = reload_interval
+        self.shadow_sample_rate = shadow_sample_rate
+        self.active = None
+        self.candidate = None
+        self._mtime = None
+        self._checked = time.monotonic()
+        self._reloading = False
+        self._lock = threading.Lock()
+        self.reload()
+        if self.active is None:
+            print("⚠️ model_serving: 서빙할 체크포인트가 없습니다. (python -m ai.train_model)")
+
+    # ---------------------------
+    # 교체
+    # ---------------------------
+    def current(self):
+        """지금 서빙 중인 LoadedModel (없으면 None). 요청 하나는 처음 받은 스냅샷을 끝까지 쓴다."""
+        self._maybe_reload()
+        return self.active
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if self._reloading or now - self._checked < self.reload_interval:
+                return
+            self._checked = now
+            if manifest_mtime(self.checkpoint_dir) == self._mtime:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_in_background, name="model-reload", daemon=True).start()
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        finally:
+            self._reloading = False
+
+    def reload(self):
+        mtime = manifest_mtime(self.checkpoint_dir)
+        manifest = read_manifest(self.checkpoint_dir)
+        self.active = self._swap(self.active, manifest.get("active"), "menu_inference")
+        self.candidate = self._swap(self.candidate, manifest.get("shadow"), "menu_shadow", SHADOW_THREADS)
+        self._mtime = mtime
+
+    def _swap(self, current, version, name: str, num_threads: int = None):
+        if current is not None and current.version == version:
+            return current
+        if version is None:
+            loaded = None
+        else:
+            try:
+                loaded = load_version(version_dir(version, self.checkpoint_dir), name, num_threads)
+            except Exception as e:
+                print(f"⚠️ model_serving: {version} 로드 실패, 기존 모델을 계속 사용합니다. ({e})")
+                return current
+            print(f"✅ model_serving: {name} → {version}")
+        if current is not None:
+            current.worker.stop()
+        return loaded
+
+    # ---------------------------
+    # 섀도 평가
+    # ---------------------------
+    def shadow(self, served: LoadedModel, features: list[float], prediction: list[float], served_ms: float):
+        """서빙 결과가 나온 뒤 호출한다. 샘플된 요청만 후보 모델에 보내고 결과는 기다리지 않는다."""
+        candidate = self.candidate
+        if candidate is None or not candidate.schema_matches or random.random() >= self.shadow_sample_rate:
+            return
+        started = time.perf_counter()
+        try:
+            future = candidate.worker.submit(features)
+        except ValueError:
+            metrics.incr("menu_model.shadow.error")
+            return
+        served_menu = served.top_menu(prediction)
+        future.add_done_callback(
+            lambda f: _record_shadow(served.version, served_menu, served_ms, candidate, f,
+                                     (time.perf_counter() - started) * 1000))
+
+
+def _record_shadow(served_version: str, served_menu: dict, served_ms: float, candidate: LoadedModel, future,
+                   candidate_ms: float):
+    if future.cancelled() or future.exception() is not None:
+        metrics.incr("menu_model.shadow.error")
+        return
+    candidate_menu = candidate.top_menu(future.result())
+    agree = candidate_menu["menu_id"] == served_menu["menu_id"]
+    metrics.incr("menu_model.shadow.agree" if agree else "menu_model.shadow.disagree")
+    metrics.observe("menu_model.shadow.latency_delta_ms", candidate_ms - served_ms)
+
+    _shadow_log.append({
+        "ts": time.time(),
+        "active": served_version,
+        "shadow": candidate.version,
+        "agree": agree,
+        "active_menu_id": served_menu["menu_id"],
+        "shadow_menu_id": candidate_menu["menu_id"],
+        "active_ms": round(served_ms, 3),
+        "shadow_ms": round(candidate_ms, 3),
+    })
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server() -> ModelServer:
+    """프로세스당 하나 (ai_recommend_api와 app.py가 같은 모델/워커를 공유)"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ModelServer()
+        return _server
+
+
+def summarize_shadow_log(path: str = SHADOW_LOG_PATH) -> dict:
+    """(서빙 버전, 후보 버전)별 일치율과 지연 차이 p50/p95"""
+    pairs = {}
+    for row in read_jsonl(path):
+        pair = pairs.setdefault((row["active"], row["shadow"]), {"agree": 0, "deltas": []})
+        pair["agree"] += row["agree"]
+        pair["deltas"].append(row["shadow_ms"] - row["active_ms"])
+    return {
+        pair: {
+            "samples": len(stats["deltas"]),
+            "agreement": stats["agree"] / len(stats["deltas"]),
+            "latency_delta_p50_ms": metrics.percentile(stats["deltas"], 50),
+            "latency_delta_p95_ms": metrics.percentile(stats["deltas"], 95),
+        }
+        for pair, stats in pairs.items()
+    }
+
+
+if __name__ == "__main__":
+    for (active, shadow), summary in summarize_shadow_log().items():
+        print(f"{active} vs {shadow}: samples={summary['samples']} agreement={summary['agreement']:.3f} "
+              f"Δlatency p50={summary['latency_delta_p50_ms']:+.3f}ms p95={summary['latency_delta_p95_ms']:+.3f}ms")
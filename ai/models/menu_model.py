@@ -0,0 +1,86 @@
+# --- 메뉴 추천 MLP (PyTorch) ---
+# ai_recommend_api.py / app.py / 학습 스크립트가 각자 복사해 쓰던 MenuRecommender 정의를 한 곳으로 모은 것.
+# state_dict 키(fc1, fc2)는 기존 체크포인트(ai/menu_model.pth)와 같다.
+#
+# 학습 결과(python -m ai.train_model)는 버전별 디렉터리에 저장된다.
+#   ai/checkpoints/<버전>/model.pth      state_dict
+#   ai/checkpoints/<버전>/metadata.json  특성 스키마, 출력 인덱스 → menu_id 매핑, 지표
+#   ai/checkpoints/LATEST               서빙할 버전 이름
+# python -m ai.export_model 은 같은 디렉터리에 TorchScript / int8 동적 양자화 변형을 추가한다.
+#   model.ts.pt, model.int8.ts.pt  (MENU_MODEL_VARIANT=float|torchscript|int8 로 서빙 변형 선택)
+
+import json
+import os
+
+import torch
+import torch.nn as nn
+
+INPUT_DIM = 20
+HIDDEN_DIM = 64
+OUTPUT_DIM = 50
+MODEL_PATH = "./ai/menu_model.pth"
+CHECKPOINT_DIR = "./ai/checkpoints"
+LATEST_FILE = "LATEST"
+VARIANT_FILES = {"float": "model.pth", "torchscript": "model.ts.pt", "int8": "model.int8.ts.pt"}
+SERVING_VARIANT = os.getenv("MENU_MODEL_VARIANT", "float")
+
+
+class MenuRecommender(nn.Module):
+    def __init__(self, input_dim, hidden_dim, output_dim):
+        super(MenuRecommender, self).__init__()
+        self.fc1 = nn.Linear(input_dim, hidden_dim)
+        self.relu = nn.ReLU()
+        self.fc2 = nn.Linear(hidden_dim, output_dim)
+        self.softmax = nn.Softmax(dim=1)
+
+    def forward(self, x):
+        x = self.fc1(x)
+        x = self.relu(x)
+        x = self.fc2(x)
+        return self.softmax(x)
+
+
+def load_menu_model(path: str = MODEL_PATH):
+    """state_dict(.pth)면 MenuRecommender로, TorchScript(.ts.pt)면 torch.jit.load로 읽는다.
+    state_dict의 차원은 가중치 모양에서 읽는다 (입력 특성 수가 바뀌어도 같은 로더 사용)"""
+    if path.endswith(".ts.pt"):
+        model = torch.jit.load(path, map_location="cpu")
+        model.eval()
+        return model
+    state = torch.load(path, map_location="cpu")
+    hidden_dim, input_dim = state["fc1.weight"].shape
+    model = MenuRecommender(input_dim, hidden_dim, state["fc2.weight"].shape[0])
+    model.load_state_dict(state)
+    model.eval()
+    return model
+
+
+def latest_checkpoint(checkpoint_dir: str = CHECKPOINT_DIR):
+    """LATEST가 가리키는 체크포인트 디렉터리, 없으면 None"""
+    try:
+        with open(os.path.join(checkpoint_dir, LATEST_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    directory = os.path.join(checkpoint_dir, version)
+    return directory if os.path.isdir(directory) else None
+
+
+def load_metadata(directory: str) -> dict:
+    with open(os.path.join(directory, "metadata.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_checkpoint(directory: str) -> tuple[MenuRecommender, dict]:
+    return load_menu_model(os.path.join(directory, "model.pth")), load_metadata(directory)
+
+
+def serving_model_path(directory: str, metadata: dict, variant: str = SERVING_VARIANT) -> str:
+    """요청한 변형이 내보내져 있고 정확도 동등성 검사를 통과했으면 그 파일, 아니면 float 모델"""
+    if variant != "float":
+        info = metadata.get("variants", {}).get(variant)
+        path = os.path.join(directory, VARIANT_FILES.get(variant, ""))
+        if info and info["parity"]["passed"] and os.path.exists(path):
+            return path
+        print(f"⚠️ {directory}: '{variant}' 변형이 없거나 동등성 검사를 통과하지 못해 float 모델을 사용합니다.")
+    return os.path.join(directory, VARIANT_FILES["float"])
@@ -0,0 +1,106 @@
+# --- 투 타워 메뉴 검색 모델 ---
+# 사용자 타워: ai.features 사용자 벡터 → 임베딩 (학습 라벨에 상황 정보가 없어 사용자 부분만 사용)
+# 아이템 타워: ai.features.encode_items 메뉴 속성(알레르기/지병/감성 태그/리뷰 감성/가격) → 임베딩
+# 점수는 두 임베딩(L2 정규화)의 내적 / TEMPERATURE.
+#
+# 아이템 임베딩은 카탈로그를 읽을 때 한 번 행렬로 계산해 두므로(ItemIndex),
+# 카탈로그에 메뉴가 추가/변경돼도 출력층을 다시 학습하지 않고 바로 후보가 된다.
+# 서빙은 사용자 타워 forward 한 번 + 행렬 내적, 알레르기/지병 비트마스크로 위험 메뉴를 먼저 지운 뒤 top-k.
+#
+#   ai/checkpoints/two_tower/<버전>/model.pth, metadata.json, two_tower/LATEST  (python -m ai.train_two_tower)
+
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from ai.features import ITEM_DIM, USER_DIM, encode_items, user_vector
+from ai.hybrid_retrieval import ALLERGENS, DISEASES, bitmask
+from ai.menu_catalog import CATALOG_PATH, get_catalog
+from ai.models.menu_model import CHECKPOINT_DIR, load_metadata
+
+TWO_TOWER_DIR = os.path.join(CHECKPOINT_DIR, "two_tower")
+EMBEDDING_DIM = 32
+TOWER_HIDDEN_DIM = 64
+TEMPERATURE = 0.1
+
+
+class Tower(nn.Module):
+    def __init__(self, input_dim, hidden_dim, embedding_dim):
+        super(Tower, self).__init__()
+        self.fc1 = nn.Linear(input_dim, hidden_dim)
+        self.relu = nn.ReLU()
+        self.fc2 = nn.Linear(hidden_dim, embedding_dim)
+
+    def forward(self, x):
+        return F.normalize(self.fc2(self.relu(self.fc1(x))), dim=1)
+
+
+class TwoTowerModel(nn.Module):
+    def __init__(self, user_dim=USER_DIM, item_dim=ITEM_DIM, hidden_dim=TOWER_HIDDEN_DIM,
+                 embedding_dim=EMBEDDING_DIM):
+        super(TwoTowerModel, self).__init__()
+        self.user_tower = Tower(user_dim, hidden_dim, embedding_dim)
+        self.item_tower = Tower(item_dim, hidden_dim, embedding_dim)
+
+    def forward(self, user_x, item_x):
+        """(사용자 배치, 아이템 전체) → (배치, 아이템 수) 로짓"""
+        return self.user_tower(user_x) @ self.item_tower(item_x).T / TEMPERATURE
+
+
+class ItemIndex:
+    """카탈로그 전체의 아이템 임베딩 행렬 + 알레르기/지병 비트마스크"""
+
+    def __init__(self, model: TwoTowerModel, df):
+        self.menus = df[["menu_id", "menu_name", "place_name", "menu_price"]].to_dict("records")
+        with torch.inference_mode():
+            self.embeddings = model.item_tower(torch.from_numpy(encode_items(df))).numpy()
+        self.allergy_bits = np.array([bitmask(a, ALLERGENS) for a in df["allergy_list"]], dtype=np.int64)
+        self.disease_bits = np.array([bitmask(d, DISEASES) for d in df["disease_list"]], dtype=np.int64)
+        self.menu_ids = np.array([m["menu_id"] for m in self.menus], dtype=np.int64)
+
+    def top_k(self, user_embedding: np.ndarray, allergies: list[str], diseases: list[str], k: int = 5,
+              exclude_ids=()) -> list[tuple[int, float]]:
+        """(행 번호, 점수) 상위 k개. 위험 메뉴는 top-k 전에 제외한다."""
+        scores = self.embeddings @ user_embedding / TEMPERATURE
+        allowed = ((self.allergy_bits & bitmask(allergies, ALLERGENS)) == 0) \
+            & ((self.disease_bits & bitmask(diseases, DISEASES)) == 0)
+        if exclude_ids:
+            allowed &= ~np.isin(self.menu_ids, list(exclude_ids))
+        candidates = np.flatnonzero(allowed)
+        if len(candidates) == 0:
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class TwoTowerRecommender:
+    def __init__(self, model: TwoTowerModel, metadata: dict, catalog_path: str = CATALOG_PATH):
+        self.model = model.eval()
+        self.metadata = metadata
+        self.index = ItemIndex(self.model, get_catalog(catalog_path))
+
+    def user_embedding(self, features: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            return self.model.user_tower(torch.from_numpy(features).unsqueeze(0))[0].numpy()
+
+    def recommend(self, user, k: int = 5, exclude_ids=()) -> list[dict]:
+        allergies = [a.allergy for a in user.allergies]
+        diseases = [d.disease for d in user.diseases]
+        embedding = self.user_embedding(user_vector(user))
+        return [
+            {**self.index.menus[i], "score": score}
+            for i, score in self.index.top_k(embedding, allergies, diseases, k, exclude_ids)
+        ]
+
+
+def load_two_tower(directory: str, catalog_path: str = CATALOG_PATH) -> TwoTowerRecommender:
+    metadata = load_metadata(directory)
+    model = TwoTowerModel(metadata["feature_schema"]["dim"], metadata["item_schema"]["dim"],
+                          metadata["hidden_dim"], metadata["embedding_dim"])
+    model.load_state_dict(torch.load(os.path.join(directory, "model.pth"), map_location="cpu"))
+    return TwoTowerRecommender(model, metadata, catalog_path)
@@ -0,0 +1,73 @@
+# --- 지연 예산 기반 단계별 추천 ---
+# 요청마다 지연 예산(RECOMMEND_BUDGET_SECONDS)을 두고 LLM 호출을 그 안에서만 기다린다.
+# 예산을 넘기거나 호출/파싱이 실패하면 규칙 기반 추천(ai.rule_recommender)과
+# 감성 태그 템플릿 이유로 즉시 응답한다. 응답의 "tier"로 어느 단계가 만들었는지 알 수 있다.
+#   tier = "llm"  : LLM 응답
+#   tier = "rule" : 규칙 기반 대체 응답
+#
+# 업스트림이 느려도 응답 지연의 상한은 대략 예산 + 규칙 추천 시간(수 ms)이다.
+# 진행 중인 LLM 호출은 RECOMMEND_LLM_WORKERS개로 제한하고, 자리가 없으면 대기열에 쌓지 않고 바로 규칙 기반으로 응답한다.
+# LLM 호출은 예산이 끝나는 시각을 스케줄러 deadline으로 넘겨(ai.llm_scheduler.deadline_scope) 실행하므로,
+# 예산을 넘겨 버려진 호출은 대기열/재시도 백오프에서 바로 끝나고 진행 중인 시도(클라이언트 timeout)만 마저 끝낸다.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from ai import metrics
+from ai.llm_scheduler import deadline_scope
+from ai.rule_recommender import rule_recommend, template_reason
+
+BUDGET_SECONDS = float(os.getenv("RECOMMEND_BUDGET_SECONDS", "4.0"))
+MAX_WORKERS = int(os.getenv("RECOMMEND_LLM_WORKERS", "16"))
+
+# 예산을 넘긴 LLM 호출은 결과를 버린다. 스레드는 스케줄러 deadline으로 곧 끝난다
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="llm-tier")
+_in_flight = threading.BoundedSemaphore(MAX_WORKERS)
+
+
+def fallback_recommendation(budget: str, allergies: list[str], diseases: list[str], context: str = "",
+                            alone: str = "", exclude_menus: list[str] = ()) -> dict:
+    rows, message = rule_recommend(budget, allergies, diseases, alone=alone, exclude_menus=exclude_menus, k=4)
+    if not rows:
+        return {"recommended_menu": "추천 불가", "recommendation_reason": message, "alternative_options": []}
+    main, alternatives = rows[0], rows[1:]
+    return {
+        "recommended_menu": main["menu_name"],
+        "recommendation_reason": template_reason(main, context),
+        "alternative_options": [row["menu_name"] for row in alternatives],
+    }
+
+
+def recommend_with_budget(name: str, llm_call, fallback, budget: float = BUDGET_SECONDS) -> dict:
+    """llm_call()을 budget초 안에 받으면 그 결과를, 아니면 fallback() 결과를 tier와 함께 반환한다."""
+    started = time.perf_counter()
+    if not _in_flight.acquire(blocking=False):
+        metrics.incr(f"{name}.llm_saturated")
+        return _finish(name, fallback(), "rule", started)
+
+    future = _executor.submit(_call_with_deadline, llm_call, time.monotonic() + budget)
+    future.add_done_callback(lambda _: _in_flight.release())
+    try:
+        result, tier = future.result(timeout=budget), "llm"
+    except FutureTimeout:
+        metrics.incr(f"{name}.llm_timeout")
+        result, tier = fallback(), "rule"
+    except Exception as e:
+        print(f"⚠️ {name}: LLM 추천 실패, 규칙 기반으로 대체 ({e})")
+        metrics.incr(f"{name}.llm_error")
+        result, tier = fallback(), "rule"
+    return _finish(name, result, tier, started)
+
+
+def _call_with_deadline(llm_call, deadline: float):
+    # 실행 스레드에서 contextvar를 설정해야 스케줄러(ai.llm_transport → scheduler.run)가 읽는다
+    with deadline_scope(deadline):
+        return llm_call()
+
+
+def _finish(name: str, result: dict, tier: str, started: float) -> dict:
+    metrics.incr(f"{name}.tier.{tier}")
+    metrics.observe(f"{name}.latency_ms", (time.perf_counter() - started) * 1000)
+    return {**result, "tier": tier}
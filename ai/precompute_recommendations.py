@@ -0,0 +1,144 @@
+# --- 상황 스트림 추천 답변 미리 생성 (배치) ---
+# 실행: python -m ai.precompute_recommendations [--top 200] [--min-count 2] [--force]
+#
+# 요청 서명 로그(ai.precomputed.REQUEST_LOG_PATH)에서 자주 나온 (상황, 날씨, 알레르기, 지병) 조합과
+# 제한 조건이 없는 기본 조합(정해진 상황 × 날씨)을 모아 답변을 생성하고,
+# 현재 카탈로그 버전의 테이블 파일로 저장한다.
+# 같은 카탈로그 버전의 테이블이 이미 있으면 빠진 서명만 생성하므로, 크론으로 주기 실행하면
+# 카탈로그가 바뀔 때 새 버전 테이블이 만들어지고 서버는 자동으로 새 파일을 읽는다.
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+from ai.backends import LLM_BACKEND
+from ai.jsonl_log import read_jsonl
+from ai.llm_scheduler import priority_scope
+from ai.menu_catalog import CATALOG_PATH, catalog_version
+from ai.precomputed import REQUEST_LOG_PATH, request_signature, signature_key, table_path
+
+TOP_SIGNATURES = 200
+MIN_COUNT = 2
+CONCURRENCY = 4
+REQUESTS_PER_MINUTE = 60
+DEFAULT_WEATHERS = ["맑음", "비", "흐림", "눈"]
+
+
+def frequent_signatures(log_path: str, top: int, min_count: int) -> list[dict]:
+    counts = Counter()
+    signatures = {}
+    for row in read_jsonl(log_path):
+        try:
+            sig = request_signature(**row)
+        except (AttributeError, TypeError):
+            continue
+        key = signature_key(sig)
+        counts[key] += 1
+        signatures[key] = sig
+    return [signatures[key] for key, count in counts.most_common(top) if count >= min_count]
+
+
+def default_signatures(situations: list[str]) -> list[dict]:
+    return [request_signature(s, w, [], []) for s in situations for w in DEFAULT_WEATHERS]
+
+
+class RateLimiter:
+    """요청 시작 간격을 60/rpm 초 이상으로 벌린다."""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_at = max(self.next_at, time.monotonic()) + self.interval
+
+
+async def generate_all(signatures: list[dict], concurrency: int, requests_per_minute: int) -> dict:
+    # 라우터 모듈의 체인/검색을 그대로 써서 라이브 응답과 같은 입력으로 생성한다
+    from llm_recommend_api import generate_answer
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+    entries, failed = {}, 0
+
+    async def generate(sig):
+        nonlocal failed
+        async with semaphore:
+            await limiter.wait()
+            try:
+                answer = await generate_answer(sig["situation"], sig["weather"], sig["allergies"], sig["diseases"])
+            except Exception as e:
+                failed += 1
+                print(f"  실패 {sig}: {e}")
+                return
+        if answer.strip():
+            entries[signature_key(sig)] = {**sig, "answer": answer}
+
+    await asyncio.gather(*(generate(sig) for sig in signatures))
+    if failed:
+        print(f"  실패 {failed}건 (다음 실행에서 다시 시도)")
+    return entries
+
+
+def write_table(path: str, version: str, entries: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "catalog_version": version,
+            "backend": LLM_BACKEND,
+            "generated_at": time.time(),
+            "entries": entries,
+        }, f, ensure_ascii=False)
+    # 서버가 읽는 도중 반쯤 쓰인 파일을 보지 않도록 교체는 rename 한 번으로
+    os.replace(tmp_path, path)
+
+
+def precompute(catalog_path: str, log_path: str, top: int, min_count: int,
+               concurrency: int, requests_per_minute: int, force: bool = False):
+    from llm_recommend_api import SITUATION_DB_SITUATIONS
+
+    version = catalog_version(catalog_path)
+    path = table_path(version)
+    entries = {}
+    if os.path.exists(path) and not force:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+
+    candidates = {}
+    for sig in default_signatures(SITUATION_DB_SITUATIONS) + frequent_signatures(log_path, top, min_count):
+        candidates.setdefault(signature_key(sig), sig)
+    missing = [sig for key, sig in candidates.items() if key not in entries]
+    print(f"catalog={version} 대상 {len(candidates)}개, 기존 {len(entries)}개, 생성 {len(missing)}개")
+
+    if missing:
+        started = time.perf_counter()
+        # 라이브 요청보다 뒤로 밀리도록 batch 등급으로 스케줄링
+        with priority_scope("batch"):
+            entries.update(asyncio.run(generate_all(missing, concurrency, requests_per_minute)))
+        print(f"  생성 완료 {time.perf_counter() - started:.1f}s")
+
+    write_table(path, version, entries)
+    print(f"saved {path} ({len(entries)} entries)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--log", default=REQUEST_LOG_PATH)
+    parser.add_argument("--top", type=int, default=TOP_SIGNATURES)
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE)
+    parser.add_argument("--force", action="store_true", help="기존 테이블을 무시하고 전부 다시 생성")
+    args = parser.parse_args()
+
+    precompute(args.catalog, args.log, args.top, args.min_count, args.concurrency, args.rpm, args.force)
@@ -0,0 +1,81 @@
+# --- 자주 들어오는 상황 스트림 요청의 미리 생성된 답변 ---
+# /api/llm-recommend-stream 의 입력 공간은 작다 (정해진 상황 5개, 몇 가지 날씨, 알레르기/지병 조합).
+# 요청마다 (상황, 날씨, 알레르기 집합, 지병 집합) 서명을 로그로 남기고,
+# python -m ai.precompute_recommendations 가 자주 나온 서명의 답변을 미리 만들어
+# 카탈로그 버전별 파일(data/precomputed/llm_stream_<버전>.json)로 저장한다.
+# 서버는 현재 카탈로그 버전의 파일에서 서명이 정확히 일치할 때만 미리 만든 답변을 쓴다.
+# 카탈로그 파일의 수정 시각이 바뀌면 버전을 다시 계산해 새 버전의 테이블로 넘어간다.
+#
+# PRECOMPUTE_LOG_PATH  요청 서명 로그 (기본 ./data/llm_stream_requests.jsonl, 빈 값이면 기록 안 함)
+#                      백그라운드 스레드가 기록하고 크기가 넘으면 회전한다 (ai.jsonl_log)
+
+import json
+import os
+import threading
+
+from ai import metrics
+from ai.jsonl_log import JsonlLog
+from ai.menu_catalog import CATALOG_PATH, catalog_version
+from ai.prompt_cache import signature
+
+PRECOMPUTED_DIR = "./data/precomputed"
+REQUEST_LOG_PATH = os.getenv("PRECOMPUTE_LOG_PATH", "./data/llm_stream_requests.jsonl")
+
+_lock = threading.Lock()
+_table = {"path": None, "mtime": None, "entries": {}}
+_catalog = {"mtime": None, "table_path": None}
+_request_log = JsonlLog(REQUEST_LOG_PATH, "llm_stream.request_log")
+
+
+def request_signature(situation: str, weather: str, allergies: list[str], diseases: list[str]) -> dict:
+    return {
+        "situation": (situation or "").strip(),
+        "weather": (weather or "").strip(),
+        "allergies": sorted({a.strip() for a in allergies if a.strip()}),
+        "diseases": sorted({d.strip() for d in diseases if d.strip()}),
+    }
+
+
+def signature_key(sig: dict) -> str:
+    return signature(sig["situation"], sig["weather"], sig["allergies"], sig["diseases"])
+
+
+def log_request(sig: dict):
+    _request_log.append(sig)
+
+
+def table_path(version: str) -> str:
+    return os.path.join(PRECOMPUTED_DIR, f"llm_stream_{version}.json")
+
+
+def current_table_path(catalog_path: str = CATALOG_PATH) -> str:
+    return table_path(catalog_version(catalog_path))
+
+
+def load_entries(path: str) -> dict:
+    """파일이 바뀌었을 때만 다시 읽는다 (배치 작업이 갱신하면 재시작 없이 반영)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _lock:
+        if _table["path"] != path or _table["mtime"] != mtime:
+            with open(path, encoding="utf-8") as f:
+                _table.update(path=path, mtime=mtime, entries=json.load(f)["entries"])
+        return _table["entries"]
+
+
+def serving_table_path(catalog_path: str = CATALOG_PATH) -> str:
+    """현재 카탈로그 버전의 테이블 경로. 카탈로그 파일이 바뀌었을 때만 해시를 다시 계산한다."""
+    mtime = os.path.getmtime(catalog_path)
+    with _lock:
+        if _catalog["mtime"] != mtime:
+            _catalog.update(mtime=mtime, table_path=current_table_path(catalog_path))
+        return _catalog["table_path"]
+
+
+def lookup(sig: dict):
+    """현재 카탈로그 버전의 테이블에 정확히 같은 서명이 있으면 답변 문자열, 없으면 None"""
+    entry = load_entries(serving_table_path()).get(signature_key(sig))
+    metrics.incr("llm_stream.precomputed_hit" if entry else "llm_stream.precomputed_miss")
+    return entry["answer"] if entry else None
@@ -0,0 +1,86 @@
+# --- 토큰 예산 기반 메뉴 후보 선택 ---
+# 챗봇 시스템 프롬프트에 메뉴 전체(최대 ~775줄)를 넣는 대신
+# 상황 태그 관련도, 피드백 점수, 식당 다양성으로 순위를 매기고
+# 정해진 토큰 예산 안에서만 목록을 만든다.
+#
+# CHATBOT_MENU_TOKEN_BUDGET  메뉴 목록에 쓸 최대 토큰 수 (기본 1200)
+# CHATBOT_MAX_PER_PLACE      식당 하나당 최대 메뉴 수 (기본 2)
+
+import os
+
+import numpy as np
+import pandas as pd
+
+MENU_TOKEN_BUDGET = int(os.getenv("CHATBOT_MENU_TOKEN_BUDGET", "1200"))
+MAX_PER_PLACE = int(os.getenv("CHATBOT_MAX_PER_PLACE", "2"))
+
+TAG_WEIGHT = 2.0
+FEEDBACK_WEIGHT = 1.0
+
+# gpt-4o 입력 단가 (USD / 1M tokens), 비용 추정용
+INPUT_PRICE_PER_MILLION = float(os.getenv("LLM_INPUT_PRICE_PER_MILLION", "2.5"))
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """로컬 토크나이저(tiktoken)가 있으면 사용하고, 없으면 문자 수 기반으로 추정한다."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_chars / 4 + (len(text) - ascii_chars)) + 1
+
+
+def estimate_cost(tokens: int) -> float:
+    return tokens * INPUT_PRICE_PER_MILLION / 1_000_000
+
+
+def render_menu_lines(df: pd.DataFrame) -> pd.Series:
+    return (
+        "- [" + df["menu_name"].astype(str) + " (" + df["place_name"].astype(str) + ")]("
+        + df["url"].astype(str) + ") - 감성: " + df["top_tags"].fillna("").astype(str)
+    )
+
+
+def select_menu_candidates(df: pd.DataFrame, situation_tags: list[str], token_budget: int = MENU_TOKEN_BUDGET,
+                           max_per_place: int = MAX_PER_PLACE) -> tuple[str, dict]:
+    """(프롬프트에 넣을 메뉴 목록 문자열, 선택 통계)를 반환한다.
+
+    df에는 place_name, menu_name, url, top_tags, feedback_score 컬럼이 있어야 한다.
+    """
+    df = df.drop_duplicates(subset=["place_name", "menu_name"])
+    tags = df["top_tags"].fillna("").astype(str)
+
+    tag_hits = np.zeros(len(df))
+    for tag in situation_tags:
+        tag_hits += tags.str.contains(tag, regex=False).to_numpy()
+    feedback = df["feedback_score"].to_numpy(dtype=float) if "feedback_score" in df else np.zeros(len(df))
+    feedback = np.clip(feedback, -3, 3) / 3
+
+    ranked = df.assign(_score=TAG_WEIGHT * tag_hits + FEEDBACK_WEIGHT * feedback)
+    ranked = ranked.sort_values("_score", ascending=False, kind="stable")
+
+    # 같은 식당 메뉴가 목록을 독점하지 않도록 식당별 개수 제한
+    ranked = ranked[ranked.groupby("place_name").cumcount() < max_per_place]
+
+    lines = render_menu_lines(ranked)
+    line_tokens = np.fromiter((estimate_tokens(line) + 1 for line in lines), dtype=np.int64, count=len(lines))
+    keep = int(np.searchsorted(np.cumsum(line_tokens), token_budget, side="right"))
+
+    selected = "\n".join(lines.iloc[:keep])
+    stats = {
+        "candidates": len(df),
+        "selected": keep,
+        "selected_tokens": int(line_tokens[:keep].sum()),
+    }
+    return selected, stats
+
+
+def full_menu_tokens(df: pd.DataFrame) -> int:
+    """예산 적용 전(기존 방식) 메뉴 목록의 토큰 수"""
+    lines = render_menu_lines(df.drop_duplicates(subset=["place_name", "menu_name"]))
+    return estimate_tokens("\n".join(lines))
@@ -0,0 +1,73 @@
+# --- 프롬프트 조립 캐시 ---
+# 템플릿은 프로세스당 한 번만 컴파일하고,
+# 요청마다 다시 렌더링하던 조각(메뉴 목록, 프로필 블록)은
+# (지병 집합, 상황 태그, 카탈로그 버전 등) 서명의 해시를 키로 LRU 캐시에 보관한다.
+#
+# 같은 입력이면 항상 같은 바이트열이 나오도록 목록은 정렬해서 렌더링하고,
+# 고정 지시문을 프롬프트 앞쪽에 두어 업스트림 프롬프트 캐시(동일 prefix)가 적용되게 한다.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from langchain.prompts import ChatPromptTemplate
+
+from ai import metrics
+
+MAX_FRAGMENTS = 512
+
+_lock = threading.Lock()
+_fragments = OrderedDict()
+
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_template(template)
+
+
+def signature(*parts) -> str:
+    """순서/중복에 영향받지 않도록 리스트·집합은 정렬해서 해시한다."""
+    def normalize(value):
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return sorted(str(v) for v in value)
+        return value
+
+    payload = json.dumps([normalize(p) for p in parts], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def cached_fragment(kind: str, key: str, build) -> str:
+    """kind:key 로 렌더링된 조각을 찾고, 없으면 build()로 만들어 저장한다."""
+    cache_key = f"{kind}:{key}"
+    with _lock:
+        if cache_key in _fragments:
+            _fragments.move_to_end(cache_key)
+            metrics.incr(f"prompt_cache.{kind}.hit")
+            return _fragments[cache_key]
+
+    metrics.incr(f"prompt_cache.{kind}.miss")
+    value = build()
+    with _lock:
+        _fragments[cache_key] = value
+        while len(_fragments) > MAX_FRAGMENTS:
+            _fragments.popitem(last=False)
+    return value
+
+
+def join_or(values, empty: str = "없음") -> str:
+    return ", ".join(sorted(values)) if values else empty
+
+
+def profile_block(allergies, diseases, likes, dislikes) -> str:
+    key = signature(allergies, diseases, likes, dislikes)
+    return cached_fragment("profile", key, lambda: (
+        f"알레르기: {join_or(allergies)} / 선호 재료: {join_or(likes)} / "
+        f"비선호 재료: {join_or(dislikes)} / 질병: {join_or(diseases)}"
+    ))
+
+
+def clear():
+    with _lock:
+        _fragments.clear()
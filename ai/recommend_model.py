@@ -1,43 +1,55 @@
+# --- 메뉴 추천 모델 단독 실행 (서빙 없이 확인용) ---
+# 실행: python -m ai.recommend_model --username <사용자> [--version <버전>]
+# 예전에는 모델 클래스를 따로 정의하고 ./menu_model.pth를 import 시점에 바로 읽었지만,
+# 이제 서빙(ai.model_serving)과 같이 레지스트리(ai.model_registry)의 active 버전(또는 --version)을
+# ai.models.menu_model.load_menu_model로 읽는다. MENU_MODEL_VARIANT에 따라 state_dict/TorchScript 모두 가능.
+# 서빙과 마찬가지로 체크포인트의 특성 스키마가 현재 ai.features와 다르면 추천하지 않는다.
+
+import argparse
+
 import torch
-import torch.nn as nn
-import pandas as pd
-import numpy as np
-
-# 데이터 불러오기 (메뉴명 추출용)
-menu_df = pd.read_csv("../data/menu_price.csv")
-nutrient_df = pd.read_csv("../data/menu_nutrient.csv")
-merged = menu_df.merge(nutrient_df, left_on="menu_name", right_on="name", how="left")
-menu_list = merged["menu_name"].tolist()
-
-input_dim = 12
-output_dim = len(menu_list)
-
-class MenuRecommender(nn.Module):
-    def __init__(self, input_dim, hidden_dim, output_dim):
-        super(MenuRecommender, self).__init__()
-        self.fc1 = nn.Linear(input_dim, hidden_dim)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(hidden_dim, output_dim)
-
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.relu(x)
-        x = self.fc2(x)
-        return x
-
-model = MenuRecommender(input_dim, 64, output_dim)
-model.load_state_dict(torch.load("./menu_model.pth"))
-model.eval()
-
-def recommend(user_input):
-    user_tensor = torch.tensor([user_input], dtype=torch.float32)
+
+from ai.features import user_feature_names, user_vector
+from ai.model_registry import read_manifest, version_dir
+from ai.models.menu_model import CHECKPOINT_DIR, load_menu_model, load_metadata, serving_model_path
+from models import SessionLocal, User
+
+
+def load_recommender(version: str = None, checkpoint_dir: str = CHECKPOINT_DIR):
+    """(모델, 메타데이터). version이 없으면 레지스트리의 active 버전"""
+    version = version or read_manifest(checkpoint_dir).get("active")
+    if version is None:
+        raise FileNotFoundError("서빙할 체크포인트가 없습니다. (python -m ai.train_model)")
+    directory = version_dir(version, checkpoint_dir)
+    metadata = load_metadata(directory)
+    if metadata["feature_schema"]["names"] != user_feature_names():
+        raise ValueError(f"{version}의 특성 스키마가 현재 ai.features와 다릅니다. 다시 학습하세요.")
+    return load_menu_model(serving_model_path(directory, metadata)), metadata
+
+
+def recommend(model, metadata: dict, features) -> dict:
+    """사용자 특성 벡터(ai.features 사용자 부분) → top-1 메뉴 (menu_id, menu_name, place_name)"""
     with torch.no_grad():
-        prediction = model(user_tensor)
-        top_idx = torch.argmax(prediction).item()
-    return menu_list[top_idx]
+        prediction = model(torch.tensor([list(features)], dtype=torch.float32))[0]
+    return metadata["menus"][int(torch.argmax(prediction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--version", help="기본: 레지스트리의 active 버전")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == args.username).first()
+        if user is None:
+            raise SystemExit(f"❌ 사용자 없음: {args.username}")
+        features = user_vector(user)
+
+    model, metadata = load_recommender(args.version)
+    menu = recommend(model, metadata, features)
+    print(f"추천 메뉴: {menu['menu_name']} ({menu['place_name']}, menu_id={menu['menu_id']})")
+
 
-# 테스트 예
 if __name__ == "__main__":
-    test_input = [300, 50, 20, 10, 2, 5, 0, 800, 200, 1, 1, 1]  # 샘플
-    result = recommend(test_input)
-    print("추천 메뉴:", result)
+    main()
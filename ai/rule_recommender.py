@@ -0,0 +1,105 @@
+# --- 규칙 기반 메뉴 추천 (LLM 없이 동작) ---
+# /api/menu-recommend 의 필터/가중치 로직을 함수로 분리한 것.
+# LLM이 느리거나 실패했을 때 ai.orchestrator가 같은 로직으로 대체 응답을 만든다.
+
+import random
+
+import pandas as pd
+
+from ai.hybrid_retrieval import BUDGET_RANGES
+from ai.menu_catalog import get_catalog
+
+# 위험 재료 매핑
+DISEASE_DANGER_FOODS = {
+    "당뇨": ["설탕", "당", "디저트"],
+    "고혈압": ["짠", "소금", "라면", "찌개"],
+    "저혈압": ["카페인"],
+    "신장질환": ["나트륨", "짠"]
+}
+HUNGER_FOOD_CATEGORIES = {
+    "적음": ["샐러드", "요거트", "버블티", "샌드위치"],
+    "많이": ["피자", "치킨", "덮밥", "찌개", "고기"]
+}
+DRINK_PAIRINGS = {
+    "소주": ["삼겹살", "족발", "찌개", "전"],
+    "맥주": ["치킨", "피자", "감자튀김", "소시지"],
+    "와인": ["치즈", "파스타", "스테이크"]
+}
+
+
+def budget_range(budget: str):
+    """예산 문자열 → (최소, 최대) 가격, 알 수 없으면 (None, None)"""
+    for key, price_range in BUDGET_RANGES.items():
+        if key in (budget or ""):
+            return price_range
+    return None, None
+
+
+def is_safe_for_disease(menu_name: str, diseases: list[str]) -> bool:
+    for disease in diseases:
+        if any(keyword in menu_name for keyword in DISEASE_DANGER_FOODS.get(disease, [])):
+            return False
+    return True
+
+
+def filter_menus(df: pd.DataFrame, budget: str, allergies: list[str], diseases: list[str],
+                 region: str = None, exclude_menus: list[str] = ()) -> tuple[pd.DataFrame, str]:
+    """(후보 메뉴, 후보가 없을 때의 안내 메시지)"""
+    # STEP 1: 지역/예산 필터
+    low, high = budget_range(budget)
+    mask = pd.Series(True, index=df.index)
+    if region:
+        mask &= df["region"] == region
+    if low is not None:
+        mask &= df["menu_price"] >= low
+    if high is not None:
+        mask &= df["menu_price"] <= high
+    if exclude_menus:
+        mask &= ~df["menu_name"].isin(list(exclude_menus))
+    filtered = df[mask]
+    if filtered.empty:
+        return filtered, "추천할 메뉴가 없습니다 (예산 필터)"
+
+    # STEP 2: 알러지 필터
+    filtered = filtered[filtered["allergy_list"].apply(lambda x: not any(a in allergies for a in x))]
+    if filtered.empty:
+        return filtered, "알러지를 고려했을 때 추천할 수 있는 메뉴가 없습니다"
+
+    # STEP 3: 지병 필터
+    filtered = filtered[filtered["menu_name"].apply(lambda x: is_safe_for_disease(x, diseases))]
+    if filtered.empty:
+        return filtered, "지병을 고려했을 때 안전한 메뉴가 없습니다"
+    return filtered, ""
+
+
+def candidate_weights(df: pd.DataFrame, alone: str = "", hunger: str = "", drink: str = "") -> pd.Series:
+    # STEP 4: 가중치 부여
+    weights = pd.Series(1, index=df.index)
+    if alone == "혼자":
+        weights += 2 * (df["menu_price"] <= 10000)
+    hunger_words = HUNGER_FOOD_CATEGORIES.get(hunger, [])
+    drink_words = DRINK_PAIRINGS.get(drink, [])
+    weights += 2 * df["menu_name"].apply(lambda name: any(w in name for w in hunger_words))
+    weights += 2 * df["menu_name"].apply(lambda name: any(w in name for w in drink_words))
+    return weights
+
+
+def rule_recommend(budget: str, allergies: list[str], diseases: list[str], region: str = None,
+                   alone: str = "", hunger: str = "", drink: str = "", exclude_menus: list[str] = (),
+                   k: int = 1) -> tuple[list, str]:
+    """가중치 비례로 서로 다른 메뉴 k개를 뽑는다. (행 목록, 실패 메시지)"""
+    filtered, message = filter_menus(get_catalog(), budget, allergies, diseases, region, exclude_menus)
+    if filtered.empty:
+        return [], message
+    weights = candidate_weights(filtered, alone, hunger, drink)
+    picked = filtered.sample(n=min(k, len(filtered)), weights=weights, random_state=random.randrange(2 ** 32))
+    return [row for _, row in picked.iterrows()], ""
+
+
+def template_reason(row, context: str = "") -> str:
+    """LLM 없이 감성 태그(top_tags)로 추천 이유를 만든다."""
+    tags = ", ".join(row["tag_list"][:3])
+    lead = f"'{context}' 상황에 맞춰 " if context else ""
+    if tags:
+        return f"{lead}{tags} 평이 많은 {row['place_name']}의 {row['menu_name']}({row['menu_price']:,}원)을 추천해요."
+    return f"{lead}{row['place_name']}의 {row['menu_name']}({row['menu_price']:,}원)을 추천해요."
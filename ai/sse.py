@@ -0,0 +1,161 @@
+# --- SSE 스트리밍 공통 유틸 ---
+# 모델 토큰을 크기/시간 기준으로 묶어서 프레임 수를 줄이고,
+# 검색 등 토큰이 없는 긴 구간에는 heartbeat 주석을 보내 연결을 유지한다.
+
+import asyncio
+import contextlib
+import os
+import time
+from fastapi.responses import StreamingResponse
+from ai import metrics
+
+FLUSH_BYTES = 64        # 버퍼가 이 크기 이상이면 즉시 전송
+FLUSH_INTERVAL = 0.04   # 첫 토큰이 버퍼에 들어온 뒤 최대 대기 시간 (초)
+HEARTBEAT_INTERVAL = 10.0
+
+# 동시에 upstream LLM 스트림을 소비할 수 있는 최대 개수
+MAX_CONCURRENT_STREAMS = int(os.getenv("MAX_CONCURRENT_STREAMS", "32"))
+stream_slots = asyncio.Semaphore(MAX_CONCURRENT_STREAMS)
+
+END_FRAME = "data: [END]\n\n"
+HEARTBEAT_FRAME = ": keep-alive\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Content-Type": "text/event-stream",
+}
+
+
+class SSEMessage(str):
+    """토큰과 합치지 않고 단독 프레임으로 보내야 하는 메시지"""
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def sse_frame(text: str) -> str:
+    # 줄바꿈이 포함된 토큰도 SSE 규격에 맞게 여러 data: 줄로 나눈다
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+
+async def coalesce(source, flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL,
+                   heartbeat_interval=HEARTBEAT_INTERVAL, request=None):
+    """토큰 async iterator를 SSE 프레임 문자열 async iterator로 변환한다.
+
+    request가 주어지면 프레임을 보내기 전에 연결 종료 여부를 확인하고,
+    끊겼으면 ClientDisconnected를 던진다. 어떤 이유로든 종료되면
+    source를 소비하던 task를 취소해서 upstream LLM 호출도 함께 중단된다.
+    """
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async with stream_slots:
+                async for item in source:
+                    await queue.put(item)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    async def check_connection():
+        if request is not None and await request.is_disconnected():
+            raise ClientDisconnected()
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(pump())
+    buffer, buffer_bytes, deadline = [], 0, None
+
+    def flush():
+        nonlocal buffer, buffer_bytes, deadline
+        frame = sse_frame("".join(buffer))
+        buffer, buffer_bytes, deadline = [], 0, None
+        return frame
+
+    try:
+        while True:
+            if not queue.empty():
+                item = queue.get_nowait()
+            else:
+                timeout = heartbeat_interval if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    await check_connection()
+                    yield flush() if buffer else HEARTBEAT_FRAME
+                    continue
+
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                if buffer:
+                    yield flush()
+                raise item
+            if isinstance(item, SSEMessage):
+                if buffer:
+                    yield flush()
+                yield sse_frame(item)
+                continue
+            if not item:
+                continue
+
+            buffer.append(item)
+            buffer_bytes += len(item.encode("utf-8"))
+            if deadline is None:
+                deadline = loop.time() + flush_interval
+            if buffer_bytes >= flush_bytes:
+                await check_connection()
+                yield flush()
+
+        if buffer:
+            yield flush()
+    finally:
+        producer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
+
+
+async def stream_events(source, error_message: str, name: str = "sse", request=None, **options):
+    """coalesce() 결과에 오류 메시지와 [END] 종료 프레임을 보장해서 붙인다.
+
+    클라이언트가 중간에 끊으면(연결 확인 실패, send 실패로 인한 취소/close)
+    upstream 작업을 취소하고 {name}.aborted 카운터를 올린다.
+    """
+    started = time.perf_counter()
+    frames = 0
+    completed = False
+    events = coalesce(source, request=request, **options)
+    try:
+        try:
+            async for frame in events:
+                if frame is not HEARTBEAT_FRAME:
+                    frames += 1
+                yield frame
+        except ClientDisconnected:
+            return
+        except Exception as e:
+            print(f"[ERROR] {name} 스트리밍 실패:", e)
+            yield sse_frame(error_message)
+        completed = True
+        metrics.observe(f"{name}.frames", frames)
+        metrics.observe(f"{name}.total_ms", (time.perf_counter() - started) * 1000)
+        yield END_FRAME
+    finally:
+        if not completed:
+            metrics.incr(f"{name}.aborted")
+        await events.aclose()
+
+
+def sse_response(frames, headers: dict = None) -> StreamingResponse:
+    return StreamingResponse(frames, media_type="text/event-stream", headers={**SSE_HEADERS, **(headers or {})})
+
+
+def sse_error_response(message: str) -> StreamingResponse:
+    async def frames():
+        yield sse_frame(message)
+        yield END_FRAME
+
+    return sse_response(frames())
@@ -0,0 +1,203 @@
+# --- 구조화 출력 + 로컬 JSON 복구 + 카탈로그 메뉴명 검증 ---
+# 1) OpenAI 모델이면 with_structured_output(include_raw=True)로 모델이 직접 스키마에 맞춰 응답하게 한다.
+#    PydanticOutputParser의 긴 형식 안내문 대신 짧은 JSON 예시 한 줄만 프롬프트에 넣는다.
+# 2) 구조화 출력이 없거나(가짜 백엔드 등) 파싱이 실패하면, 코드 펜스/후행 쉼표/따옴표 등을
+#    로컬에서 고쳐 보고 필드 이름·타입을 모델에 맞게 맞춘 뒤에야 실패로 처리한다.
+# 3) recommended_menu가 실제 카탈로그에 있는 메뉴인지 이름 인덱스로 확인하고,
+#    없으면 대체 옵션 중 실제 메뉴로 바꾸거나 실패로 처리한다 (오케스트레이터가 규칙 추천으로 대체).
+
+import ast
+import json
+import re
+from functools import lru_cache
+
+from pydantic import ValidationError
+
+from ai import metrics
+from ai.backends import is_fake_backend
+from ai.menu_catalog import get_catalog
+from ai.prompt_budget import estimate_tokens
+
+# PydanticOutputParser.get_format_instructions() (~250 토큰) 대신 쓰는 짧은 형식 안내
+COMPACT_FORMAT_INSTRUCTIONS = (
+    'Respond with JSON only: {"recommended_menu": "<menu name from the list>", '
+    '"recommendation_reason": "<1-2 sentences in Korean>", "alternative_options": ["<menu>", "<menu>"]}'
+)
+
+# 모델이 다른 이름으로 답했을 때 맞춰 줄 필드 별칭
+FIELD_ALIASES = {
+    "recommended_menu": ["menu", "recommendation", "recommended", "main_menu", "추천 메뉴", "추천메뉴"],
+    "recommendation_reason": ["reason", "explanation", "why", "추천 이유", "이유"],
+    "alternative_options": ["alternatives", "alternative", "options", "other_options", "대체 옵션", "대안"],
+}
+
+_fence = re.compile(r"^```[a-zA-Z]*\s*|\s*```$", re.MULTILINE)
+_trailing_comma = re.compile(r",\s*([}\]])")
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+# ---------------------------
+# 로컬 JSON 복구
+# ---------------------------
+def extract_object(text: str) -> str:
+    """문자열에서 가장 바깥 {...} 구간을 꺼낸다 (따옴표 안의 괄호는 무시)"""
+    start = text.find("{")
+    if start < 0:
+        raise StructuredOutputError("JSON 객체가 없습니다.")
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            escaped = ch == "\\" and not escaped
+            if ch == '"' and not escaped:
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # 닫는 괄호가 잘린 경우
+    return text[start:] + "}" * depth
+
+
+def repair_json(text: str) -> dict:
+    cleaned = _fence.sub("", (text or "").strip())
+    cleaned = cleaned.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
+    candidate = _trailing_comma.sub(r"\1", extract_object(cleaned))
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    try:
+        # 작은따옴표 / True·None 등 파이썬 리터럴 형태
+        value = ast.literal_eval(candidate)
+        if isinstance(value, dict):
+            return value
+    except (ValueError, SyntaxError):
+        pass
+    raise StructuredOutputError(f"JSON 복구 실패: {candidate[:200]}")
+
+
+def coerce_fields(data: dict, model_cls):
+    """별칭 필드 이름, 문자열로 온 목록 등을 모델 스키마에 맞춘다."""
+    normalized = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for key in [field] + aliases:
+            if key in data:
+                normalized[field] = data[key]
+                break
+
+    alternatives = normalized.get("alternative_options", [])
+    if isinstance(alternatives, str):
+        alternatives = [a.strip() for a in re.split(r"[,\n/]", alternatives) if a.strip()]
+    normalized["alternative_options"] = [str(a).strip() for a in alternatives if str(a).strip()]
+    if isinstance(normalized.get("recommended_menu"), list):
+        normalized["recommended_menu"] = normalized["recommended_menu"][0] if normalized["recommended_menu"] else ""
+    normalized.setdefault("recommendation_reason", "")
+    if not normalized.get("recommended_menu"):
+        raise StructuredOutputError("recommended_menu가 없습니다.")
+    try:
+        return model_cls(**normalized)
+    except ValidationError as e:
+        raise StructuredOutputError(f"스키마 검증 실패: {e}") from e
+
+
+def parse_recommendation(text: str, model_cls):
+    return coerce_fields(repair_json(text), model_cls)
+
+
+# ---------------------------
+# 카탈로그 메뉴명 인덱스
+# ---------------------------
+def normalize_name(name: str) -> str:
+    name = re.sub(r"\(.*?\)", "", str(name))  # "순두부 (일신기사식당)" 형태
+    return re.sub(r"[\s\W_]+", "", name).lower()
+
+
+@lru_cache(maxsize=4)
+def menu_name_index(catalog_path: str = None) -> dict:
+    df = get_catalog(catalog_path) if catalog_path else get_catalog()
+    index = {}
+    for name in df["menu_name"].dropna().unique():
+        index.setdefault(normalize_name(name), name)
+    return index
+
+
+def match_menu(name: str):
+    """카탈로그의 정식 메뉴명, 없으면 None.
+    공백/기호/괄호 차이만 허용하는 완전 일치 — "땅콩 순두부"를 "순두부"로 바꾸는 식의 부분 일치는
+    알레르기/지병 필터를 통과하지 않은 메뉴를 만들 수 있으므로 하지 않는다."""
+    key = normalize_name(name)
+    return menu_name_index().get(key) if key else None
+
+
+def validate_menu(result):
+    canonical = match_menu(result.recommended_menu)
+    alternatives = [m for m in (match_menu(a) for a in result.alternative_options) if m]
+    if canonical is None:
+        metrics.incr("structured_output.invalid_menu")
+        if not alternatives:
+            raise StructuredOutputError(f"카탈로그에 없는 메뉴: {result.recommended_menu}")
+        canonical, alternatives = alternatives[0], alternatives[1:]
+    result.recommended_menu = canonical
+    result.alternative_options = [a for a in dict.fromkeys(alternatives) if a != canonical]
+    return result
+
+
+# ---------------------------
+# 호출
+# ---------------------------
+_structured = {}
+
+
+def structured_runnable(llm, model_cls):
+    """네이티브 구조화 출력을 지원하면 그 Runnable, 아니면 None"""
+    key = (id(llm), model_cls)
+    if key not in _structured:
+        runnable = None
+        if not is_fake_backend():
+            try:
+                runnable = llm.with_structured_output(model_cls, include_raw=True)
+            except NotImplementedError:
+                runnable = None
+        _structured[key] = runnable
+    return _structured[key]
+
+
+def raw_text(message) -> str:
+    """구조화 출력 파싱이 실패했을 때 원본 메시지에서 JSON 텍스트를 꺼낸다."""
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        return json.dumps(tool_calls[0]["args"], ensure_ascii=False)
+    for call in message.additional_kwargs.get("tool_calls", []):
+        return call["function"]["arguments"]
+    return message.content
+
+
+def invoke_structured(llm, prompt: str, model_cls, name: str) -> dict:
+    metrics.observe(f"{name}.prompt_tokens", estimate_tokens(prompt))
+    runnable = structured_runnable(llm, model_cls)
+
+    if runnable is not None:
+        output = runnable.invoke(prompt)
+        result, text = output["parsed"], raw_text(output["raw"])
+    else:
+        result, text = None, llm.invoke(prompt).content
+
+    if result is None:
+        try:
+            result = parse_recommendation(text, model_cls)
+            metrics.incr("structured_output.local_parsed")
+        except StructuredOutputError:
+            metrics.incr("structured_output.parse_failed")
+            raise
+    else:
+        metrics.incr("structured_output.native")
+    return validate_menu(result).dict()
@@ -0,0 +1,117 @@
+# --- 최근 N턴 + 누적 요약 메모리 ---
+# ConversationBufferMemory는 매 턴 전체 기록을 다시 보내 프롬프트가 선형으로 커진다.
+# 여기서는 최근 SUMMARY_WINDOW_TURNS 턴만 원문으로 두고, 그보다 오래된 턴은
+# 기록 맨 앞의 요약 메시지(SystemMessage, additional_kwargs["summary"]=True)로 접는다.
+#
+# 요약은 응답을 보낸 뒤 백그라운드에서 만든다 (FastAPI BackgroundTasks). 응답 지연에는 영향 없음.
+# 요약도 기록 안에 저장되므로 CHAT_HISTORY_BACKEND=sqlite일 때 워커 간에 그대로 공유된다.
+#
+# SUMMARY_WINDOW_TURNS  원문으로 유지할 최근 턴 수 (기본 4)
+# SUMMARY_BATCH_TURNS   이만큼 턴이 더 쌓이면 한 번에 요약 (기본 2)
+
+import os
+import threading
+import time
+
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import SystemMessage, get_buffer_string
+
+from ai import metrics
+from ai.backends import get_chat_model
+from ai.conversation_store import ConversationStore, is_summary
+from ai.prompt_budget import estimate_tokens
+
+WINDOW_TURNS = int(os.getenv("SUMMARY_WINDOW_TURNS", "4"))
+BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "2"))
+
+SUMMARY_PROMPT = """다음은 음식 추천 챗봇과 사용자의 대화 요약과 그 이후 대화입니다.
+사용자의 취향, 알레르기/건강 관련 언급, 이미 추천한 메뉴, 사용자의 반응을 중심으로
+기존 요약에 새 대화를 합친 요약을 한국어 5문장 이내로 작성하세요.
+
+[기존 요약]
+{summary}
+
+[새 대화]
+{conversation}
+
+[새 요약]"""
+
+
+def split_summary(messages: list) -> tuple[str, list]:
+    """(요약 문자열, 요약 이후 메시지)"""
+    if messages and is_summary(messages[0]):
+        return str(messages[0].content), messages[1:]
+    return "", messages
+
+
+def summary_message(text: str) -> SystemMessage:
+    return SystemMessage(content=text, additional_kwargs={"summary": True})
+
+
+class WindowSummaryMemory(ConversationBufferMemory):
+    """요약 + 최근 window_turns 턴만 프롬프트에 넣는 메모리 (저장은 기존처럼 chat_memory에)"""
+
+    window_turns: int = WINDOW_TURNS
+
+    @property
+    def buffer_as_str(self) -> str:
+        summary, messages = split_summary(self.chat_memory.messages)
+        recent = get_buffer_string(
+            messages[-2 * self.window_turns:], human_prefix=self.human_prefix, ai_prefix=self.ai_prefix
+        )
+        text = f"(이전 대화 요약) {summary}\n{recent}" if summary else recent
+        metrics.observe("chat_summary.history_tokens", estimate_tokens(text))
+        return text
+
+
+class ConversationSummarizer:
+    def __init__(self, store: ConversationStore, window_turns: int = WINDOW_TURNS, batch_turns: int = BATCH_TURNS):
+        self.store = store
+        self.window_turns = window_turns
+        self.batch_turns = batch_turns
+        self.llm = get_chat_model("gpt-3.5-turbo", temperature=0, priority="batch")
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def maybe_summarize(self, session_id: str):
+        """응답 후 백그라운드에서 호출: 창 밖으로 밀려난 턴이 충분히 쌓였으면 요약에 합친다."""
+        with self._lock:
+            if session_id in self._running:
+                return
+            self._running.add(session_id)
+        try:
+            self._summarize(session_id)
+        except Exception as e:
+            metrics.incr("chat_summary.failed")
+            print(f"⚠️ 대화 요약 실패 ({session_id}): {e}")
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
+
+    def _summarize(self, session_id: str):
+        history = self.store.get(session_id)
+        if history is None:
+            return
+        snapshot = list(history.messages)
+        summary, messages = split_summary(snapshot)
+        keep = 2 * self.window_turns
+        if len(messages) < keep + 2 * self.batch_turns:
+            return
+
+        folded = messages[:-keep]
+        started = time.perf_counter()
+        response = self.llm.invoke(SUMMARY_PROMPT.format(
+            summary=summary or "없음", conversation=get_buffer_string(folded, human_prefix="User", ai_prefix="AI")
+        ))
+        metrics.observe("chat_summary.latency_ms", (time.perf_counter() - started) * 1000)
+
+        fold_end = len(snapshot) - keep
+
+        def replace(current):
+            # 요약하는 동안 앞부분이 바뀌었으면(trim/다른 요약) 이번 결과는 버린다
+            if current[:fold_end] != snapshot[:fold_end]:
+                return None
+            return [summary_message(response.content)] + current[fold_end:]
+
+        if self.store.rewrite(session_id, replace):
+            metrics.incr("chat_summary.folded_messages", len(folded))
@@ -0,0 +1,92 @@
+# --- LLM 추천 증류 학생 모델 학습 ---
+# 실행: python -m ai.train_distilled [--log ./data/distill_pairs.jsonl] [--epochs 50] [--batch-size 64]
+#
+# ai.distillation이 남긴 교사(LLM) 응답 로그(특성 벡터 → 메뉴명)를 분류 문제로 학습한다.
+#   라벨: 추천 메뉴 가중치 1.0, 대체 메뉴 ALTERNATIVE_WEIGHT
+#   출력: 로그에 나온 메뉴 중 카탈로그에 있는 것 (이름 오름차순)
+# 로그 VALID_EVERY번째 줄마다 검증용으로 떼어 두고 추천 메뉴만 라벨로 쓰므로,
+# 검증 top1 = 교사와의 top-1 일치율, top5 = 교사 추천이 학생 상위 5개 안에 드는 비율이다.
+# 학습 루프/조기 종료는 ai.train_model.fit, 결과는 ai/checkpoints/distilled/<버전>/ (레지스트리 등록).
+
+import argparse
+import time
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from ai.distillation import DISTILL_DIR, DISTILL_LOG_PATH, read_pairs
+from ai.features import schema
+from ai.menu_catalog import get_catalog
+from ai.models.menu_model import MenuRecommender
+from ai.train_model import BATCH_SIZE, LEARNING_RATE, MAX_EPOCHS, PATIENCE, VALID_EVERY, fit, save_checkpoint
+
+DISTILLED_HIDDEN_DIM = 32
+ALTERNATIVE_WEIGHT = 0.3
+
+
+def build_dataset(pairs: list[dict], menus: list[str], with_alternatives: bool) -> TensorDataset:
+    index = {name: i for i, name in enumerate(menus)}
+    inputs, labels, weights = [], [], []
+    for i, pair in enumerate(pairs):
+        targets = [(pair["menu"], 1.0)]
+        if with_alternatives:
+            targets += [(name, ALTERNATIVE_WEIGHT) for name in pair["alternatives"]]
+        for name, weight in targets:
+            if name in index:
+                inputs.append(i)
+                labels.append(index[name])
+                weights.append(weight)
+
+    # 로그에 인코딩된 특성 벡터가 그대로 있으므로 다시 인코딩하지 않는다 (read_pairs가 스키마 일치만 돌려줌)
+    features = torch.tensor([pair["features"] for pair in pairs], dtype=torch.float32) \
+        if pairs else torch.zeros(0, schema()["dim"])
+    return TensorDataset(features[inputs], torch.tensor(labels, dtype=torch.long),
+                         torch.tensor(weights, dtype=torch.float32))
+
+
+def train(log_path: str = DISTILL_LOG_PATH, epochs: int = MAX_EPOCHS, batch_size: int = BATCH_SIZE,
+          learning_rate: float = LEARNING_RATE, patience: int = PATIENCE):
+    pairs = read_pairs(log_path)
+    catalog_names = set(get_catalog()["menu_name"])
+    menus = sorted({name for pair in pairs for name in [pair["menu"], *pair["alternatives"]]} & catalog_names)
+    if not menus:
+        print("학습할 교사 응답이 없습니다. (LLM 엔드포인트 일반 모드 응답이 DISTILL_LOG_PATH에 쌓여야 합니다)")
+        return None
+
+    train_pairs = [pair for i, pair in enumerate(pairs) if i % VALID_EVERY != 0]
+    valid_pairs = [pair for i, pair in enumerate(pairs) if i % VALID_EVERY == 0]
+    train_loader = DataLoader(build_dataset(train_pairs, menus, with_alternatives=True),
+                              batch_size=batch_size, shuffle=True)
+    valid_loader = DataLoader(build_dataset(valid_pairs, menus, with_alternatives=False), batch_size=batch_size)
+
+    feature_schema = schema()
+    model = MenuRecommender(feature_schema["dim"], DISTILLED_HIDDEN_DIM, len(menus))
+    metrics = fit(model, train_loader, valid_loader, epochs=epochs, learning_rate=learning_rate, patience=patience)
+    if metrics is None:
+        return None
+    print(f"teacher agreement: top1={metrics['top1']} top5={metrics['top5']} ({metrics['examples']} pairs)")
+
+    metadata = {
+        "created_at": time.time(),
+        "feature_schema": feature_schema,
+        "menus": menus,
+        "hidden_dim": DISTILLED_HIDDEN_DIM,
+        "metrics": metrics,
+        "pairs": len(pairs),
+        "endpoints": sorted({pair["endpoint"] for pair in pairs}),
+        "params": {"batch_size": batch_size, "learning_rate": learning_rate, "patience": patience,
+                   "alternative_weight": ALTERNATIVE_WEIGHT, "valid_every": VALID_EVERY},
+    }
+    return save_checkpoint(model, metadata, DISTILL_DIR)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log", default=DISTILL_LOG_PATH)
+    parser.add_argument("--epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    args = parser.parse_args()
+
+    train(args.log, args.epochs, args.batch_size, args.lr, args.patience)
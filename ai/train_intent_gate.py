@@ -0,0 +1,174 @@
+# --- 인텐트 게이트 학습 ---
+# 실행: python -m ai.train_intent_gate [--data data/intent_messages.csv 추가.csv ...] [--catalog data/final_menu_data.csv]
+# text,label(food | off_topic) CSV로 로지스틱 회귀를 학습하고 ai/models/intent_gate.json 을 만든다.
+# INTENT_LOG_PATH 로 쌓인 실제 메시지 로그는 라벨을 붙여 CSV로 만든 뒤 --data 에 추가하면 된다.
+# 카탈로그의 메뉴명(과 "<메뉴> 먹고 싶어" 같은 짧은 문장)도 food 예시로 넣고,
+# 배포 모델이 카탈로그 메뉴명을 하나라도 차단하면 아티팩트를 쓰지 않고 실패한다.
+#
+# 검증 세트 기준 precision/recall(off_topic = 차단 대상)과 절약되는 LLM 호출 수를
+# 기존 키워드 방식과 비교해 출력한다.
+
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+
+from ai.intent_gate import FEATURE_DIM, GATE_PATH, IntentGate, features, sigmoid
+from ai.menu_catalog import CATALOG_PATH
+
+EPOCHS = 40
+LEARNING_RATE = 0.5
+L2 = 1e-4
+BETA = 0.5  # 음식 요청을 막는 실수가 더 치명적이므로 precision에 가중치를 둔 F-beta로 기준 선택
+SEED = 42
+MIN_THRESHOLD = 0.7  # 애매한 점수(0.5 근처)는 차단하지 않고 LLM으로 보낸다
+MENU_PHRASES = ["{}", "{} 먹고 싶어", "{} 추천", "{} 어때"]
+SHORT_FOOD_PHRASES = ["배고파", "밥", "점심", "저녁", "아침", "야식", "간식", "메뉴", "뭐 먹지", "추천", "맛집",
+                      "국밥", "고기", "치킨", "피자", "라면", "면", "매운 거", "따뜻한 거", "시원한 거"]
+
+
+def load_examples(paths: list[str]) -> list[tuple[str, int]]:
+    examples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                examples.append((row["text"], 1 if row["label"] == "off_topic" else 0))
+    return examples
+
+
+def catalog_menu_names(path: str = CATALOG_PATH) -> list[str]:
+    # 메뉴명 열만 필요하므로 load_catalog(전처리 포함) 대신 csv로 바로 읽는다
+    with open(path, encoding="utf-8") as f:
+        return sorted({row["menu_name"].strip() for row in csv.DictReader(f) if row["menu_name"].strip()})
+
+
+def food_examples(menu_names: list[str]) -> list[tuple[str, int]]:
+    """카탈로그 메뉴명 + 짧은 음식 문장 (모두 food)"""
+    rng = random.Random(SEED)
+    examples = [(text, 0) for text in SHORT_FOOD_PHRASES]
+    for name in menu_names:
+        examples.append((name, 0))
+        examples.append((rng.choice(MENU_PHRASES[1:]).format(name), 0))
+    return examples
+
+
+def blocked_menu_names(gate: IntentGate, threshold: float, menu_names: list[str]) -> list[str]:
+    return [name for name in menu_names if gate.score(name) >= threshold]
+
+
+def split(examples, ratio=0.2):
+    rng = random.Random(SEED)
+    by_label = {0: [], 1: []}
+    for ex in examples:
+        by_label[ex[1]].append(ex)
+    train, valid = [], []
+    for group in by_label.values():
+        rng.shuffle(group)
+        cut = max(1, int(len(group) * ratio))
+        valid += group[:cut]
+        train += group[cut:]
+    return train, valid
+
+
+def train(examples) -> tuple[dict, float]:
+    rng = random.Random(SEED)
+    data = [(features(text), label) for text, label in examples]
+    # 라벨 비율이 달라도(로그 데이터 추가 등) 한쪽으로 치우치지 않도록 클래스별 가중치 적용
+    positives = sum(label for _, label in data)
+    class_weight = {1: len(data) / (2 * max(positives, 1)), 0: len(data) / (2 * max(len(data) - positives, 1))}
+    weights, bias = {}, 0.0
+    for epoch in range(EPOCHS):
+        rng.shuffle(data)
+        lr = LEARNING_RATE / (1 + epoch * 0.1)
+        for x, y in data:
+            z = bias + sum(weights.get(i, 0.0) * v for i, v in x.items())
+            grad = (sigmoid(z) - y) * class_weight[y]
+            for i, v in x.items():
+                w = weights.get(i, 0.0)
+                weights[i] = w - lr * (grad * v + L2 * w)
+            bias -= lr * grad
+    return weights, bias
+
+
+def evaluate(gate: IntentGate, examples, threshold: float) -> dict:
+    tp = fp = fn = 0
+    for text, label in examples:
+        blocked = gate.score(text) >= threshold
+        tp += blocked and label == 1
+        fp += blocked and label == 0
+        fn += (not blocked) and label == 1
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "saved_calls": tp,
+        "wrongly_blocked": fp,
+    }
+
+
+def f_beta(result: dict) -> float:
+    p, r = result["precision"], result["recall"]
+    return (1 + BETA ** 2) * p * r / (BETA ** 2 * p + r) if p + r else 0.0
+
+
+def choose_threshold(gate: IntentGate, examples) -> float:
+    thresholds = [t / 100 for t in range(int(MIN_THRESHOLD * 100), 96, 5)]
+    return max(thresholds, key=lambda t: f_beta(evaluate(gate, examples, t)))
+
+
+def report(label, result, total):
+    print(f"{label:<10} precision={result['precision']:.3f} recall={result['recall']:.3f} "
+          f"saved LLM calls={result['saved_calls']}/{total} wrongly blocked={result['wrongly_blocked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", nargs="+", default=["./data/intent_messages.csv"])
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--output", default=GATE_PATH)
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    menu_names = catalog_menu_names(args.catalog)
+    train_set, valid_set = split(examples)
+    print(f"examples={len(examples)} (train {len(train_set)}, valid {len(valid_set)}), "
+          f"catalog menus={len(menu_names)}, dim={FEATURE_DIM}")
+
+    # 카탈로그 예시는 학습에만 넣는다 (검증 지표는 실제 메시지 분포 기준으로 유지)
+    weights, bias = train(train_set + food_examples(menu_names))
+    gate = IntentGate(weights, bias)
+    threshold = choose_threshold(gate, valid_set)
+
+    report("keywords", evaluate(IntentGate(), valid_set, 0.5), len(valid_set))
+    report("model", evaluate(gate, valid_set, threshold), len(valid_set))
+
+    texts = [text for text, _ in valid_set] * 20
+    started = time.perf_counter()
+    for text in texts:
+        gate.score(text)
+    print(f"threshold={threshold:.2f}  score latency={(time.perf_counter() - started) / len(texts) * 1e6:.1f}µs/message")
+
+    # 배포용 모델은 전체 데이터로 다시 학습
+    weights, bias = train(examples + food_examples(menu_names))
+    artifact = {
+        "feature_dim": FEATURE_DIM,
+        "threshold": threshold,
+        "bias": round(bias, 6),
+        "weights": {str(i): round(w, 5) for i, w in sorted(weights.items()) if abs(w) >= 1e-4},
+    }
+
+    # 빌드 검사: 저장될 가중치(반올림/가지치기 후) 그대로 카탈로그 메뉴명이 하나도 막히지 않아야 한다
+    deployed = IntentGate({int(i): w for i, w in artifact["weights"].items()}, artifact["bias"])
+    blocked = blocked_menu_names(deployed, threshold, menu_names)
+    if blocked:
+        print(f"❌ 카탈로그 메뉴 {len(blocked)}개가 차단됩니다: {', '.join(blocked[:20])}")
+        sys.exit(1)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, separators=(",", ":"))
+    print(f"✅ {args.output} 저장 (가중치 {len(artifact['weights'])}개, 카탈로그 메뉴 {len(menu_names)}개 통과)")
+
+
+if __name__ == "__main__":
+    main()
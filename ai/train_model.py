@@ -1,109 +1,270 @@
-import pandas as pd
+# --- 피드백/리뷰/추천 기록으로 메뉴 추천 모델 학습 ---
+# 실행: python -m ai.train_model [--epochs 50] [--batch-size 64] [--workers 2]
+#
+# 라벨 (사용자 → menu_id)
+#   menu_feedback          feedback == "good"        가중치 1.0
+#   reviews                rating >= 4               가중치 1.0
+#   recommendation_history 추천받은 기록 (약한 신호)  가중치 0.3
+# SQLite에서 CHUNK_SIZE 행씩 읽어 사용자 프로필을 한꺼번에 조회하고 ai.features로 배치 인코딩한다.
+# 라벨에는 요청 상황(날씨/혼밥/예산)이 기록되지 않으므로 입력은 사용자 부분(user_schema)만 쓴다.
+# (빈 상황으로 학습하고 서빙에서 실제 상황을 넣으면 학습 때 본 적 없는 입력 분포가 된다)
+# DataLoader 워커마다 id % workers 로 나눠 읽고, id % VALID_EVERY == 0 인 행은 검증용(조기 종료),
+# id % VALID_EVERY == 1 인 행은 오프라인 평가용 test split(benchmarks/eval_recommenders)으로 떼어 두고 학습에서 읽지 않는다.
+# 출력 차원은 카탈로그의 menu_id 목록을 따르며, 검증 손실이 PATIENCE 에폭 동안 나아지지 않으면 멈춘다.
+# 결과는 ai/checkpoints/<버전>/ 에 model.pth + metadata.json으로 저장하고 레지스트리(ai.model_registry)에
+# 서빙 버전으로 등록한다. --candidate 면 서빙 버전은 그대로 두고 섀도 평가 후보로만 등록한다.
+
+import argparse
+import copy
+import json
+import os
+import random
+import time
+
 import torch
-import torch.nn as nn
-from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.model_selection import train_test_split
-
-# 데이터 예시 (User 데이터 + Menu 데이터)
-user_data = [
-    {
-        "allergies": ["달걀", "갑각류"],
-        "diseases": ["고혈압"],
-        "prefers": ["매운 음식"],
-        "dislikes": ["기름진 음식"],
-        "weather": "맑음",
-        "solo": 1,
-        "budget": 10000,
-        "menu": "순두부"
-    },
-    {
-        "allergies": [],
-        "diseases": [],
-        "prefers": ["담백한 음식"],
-        "dislikes": ["짠 음식"],
-        "weather": "비",
-        "solo": 0,
-        "budget": 8000,
-        "menu": "비빔밥"
-    },
-]
-
-# 메뉴 리스트
-menus = ["순두부", "비빔밥", "삼계탕", "불고기백반"]
-
-# 알러지, 지병, 선호, 비선호 가능한 것들 (모델 통일성 위해 미리 고정)
-allergies_list = ["달걀", "갑각류", "밀", "땅콩/대두", "우유"]
-diseases_list = ["고혈압", "저혈압", "당뇨"]
-pref_menu_list = ["매운 음식", "담백한 음식", "기름진 음식", "짠 음식"]
-weather_list = ["맑음", "흐림", "비", "더움"]
-
-# 인코더 준비
-mlb_allergy = MultiLabelBinarizer(classes=allergies_list)
-mlb_disease = MultiLabelBinarizer(classes=diseases_list)
-mlb_prefer = MultiLabelBinarizer(classes=pref_menu_list)
-mlb_weather = MultiLabelBinarizer(classes=weather_list)
-mlb_menu = MultiLabelBinarizer(classes=menus)
-
-X = []
-y = []
-
-for user in user_data:
-    # 인코딩
-    allergy_encoded = mlb_allergy.fit_transform([user["allergies"]])[0]
-    disease_encoded = mlb_disease.fit_transform([user["diseases"]])[0]
-    prefer_encoded = mlb_prefer.fit_transform([user["prefers"]])[0]
-    dislike_encoded = mlb_prefer.fit_transform([user["dislikes"]])[0]
-    weather_encoded = mlb_weather.fit_transform([[user["weather"]]])[0]
-    solo_encoded = [user["solo"]]
-    budget_encoded = [user["budget"] / 10000]  # 정규화
-
-    input_vector = list(allergy_encoded) + list(disease_encoded) + list(prefer_encoded) + list(dislike_encoded) + list(weather_encoded) + solo_encoded + budget_encoded
-    X.append(input_vector)
-
-    # 메뉴
-    y.append(mlb_menu.fit_transform([[user["menu"]]])[0])
-
-X = torch.tensor(X, dtype=torch.float32)
-y = torch.tensor(y, dtype=torch.float32)
-
-# 모델 정의
-class MenuRecommender(nn.Module):
-    def __init__(self, input_dim, hidden_dim, output_dim):
-        super(MenuRecommender, self).__init__()
-        self.fc1 = nn.Linear(input_dim, hidden_dim)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(hidden_dim, output_dim)
-        self.softmax = nn.Softmax(dim=1)
-
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.relu(x)
-        x = self.fc2(x)
-        return self.softmax(x)
-
-INPUT_DIM = X.shape[1]
-OUTPUT_DIM = y.shape[1]
-
-model = MenuRecommender(INPUT_DIM, 64, OUTPUT_DIM)
-criterion = nn.CrossEntropyLoss()
-optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
-
-# CrossEntropyLoss expects labels as class index → argmax 필요
-y_class = torch.argmax(y, dim=1)
-
-# 학습
-for epoch in range(1000):
-    model.train()
-    outputs = model(X)
-    loss = criterion(outputs, y_class)
-
-    optimizer.zero_grad()
-    loss.backward()
-    optimizer.step()
-
-    if (epoch+1) % 200 == 0:
-        print(f"Epoch {epoch+1}, Loss: {loss.item()}")
-
-# 저장
-torch.save(model.state_dict(), "./ai/menu_model.pth")
-print("모델 저장 완료")
+import torch.nn.functional as F
+from sqlalchemy import create_engine, exists, literal, select, union_all
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from ai.features import UserProfile, encode_profiles, user_schema
+from ai.menu_catalog import CATALOG_PATH, catalog_version, get_catalog
+from ai.model_registry import register, set_shadow
+from ai.models.menu_model import CHECKPOINT_DIR, HIDDEN_DIM, MenuRecommender
+from models import DATABASE_URL, Feedback, RecommendationHistory, Review, UserAllergy, UserDisease, UserPreference
+
+CHUNK_SIZE = 1000
+BATCH_SIZE = 64
+MAX_EPOCHS = 50
+PATIENCE = 5
+LEARNING_RATE = 1e-3
+VALID_EVERY = 10   # id % 10 == 0 → 검증, == 1 → 테스트 (각 약 10%)
+SPLIT_REMAINDERS = {"valid": 0, "test": 1}
+NUM_WORKERS = 2
+MIN_RATING = 4
+LABEL_WEIGHTS = {"feedback": 1.0, "review": 1.0, "history": 0.3}
+
+
+def menu_mapping(catalog_path: str = CATALOG_PATH) -> list[dict]:
+    """출력 인덱스 순서의 메뉴 목록 (menu_id 오름차순)"""
+    df = get_catalog(catalog_path).sort_values("menu_id")
+    return [
+        {"menu_id": int(row.menu_id), "menu_name": row.menu_name, "place_name": row.place_name}
+        for row in df.itertuples()
+    ]
+
+
+def label_query(split: str, worker_id: int = 0, num_workers: int = 1):
+    """split: "train" | "valid" | "test" """
+    def source(name, table, *conditions):
+        remainder = table.id % VALID_EVERY
+        if split in SPLIT_REMAINDERS:
+            in_split = remainder == SPLIT_REMAINDERS[split]
+        else:  # train: 검증/테스트 어느 쪽에도 속하지 않는 행
+            in_split = remainder.not_in(list(SPLIT_REMAINDERS.values()))
+        return select(
+            literal(name).label("source"), table.id.label("id"),
+            table.user_id.label("user_id"), table.menu_id.label("menu_id"),
+        ).where(
+            table.user_id.isnot(None), table.menu_id.isnot(None),
+            in_split,
+            (table.id % num_workers) == worker_id,
+            *conditions,
+        )
+
+    return union_all(
+        source("feedback", Feedback, Feedback.feedback == "good"),
+        source("review", Review, Review.rating >= MIN_RATING),
+        # 싫어요를 누른 추천 기록은 제외 (히스토리 API와 같은 기준)
+        source("history", RecommendationHistory, ~exists().where(
+            Feedback.user_id == RecommendationHistory.user_id,
+            Feedback.menu_id == RecommendationHistory.menu_id,
+            Feedback.feedback == "bad",
+        )),
+    )
+
+
+def load_profiles(conn, user_ids: set) -> dict:
+    """한 청크에 나온 사용자들의 프로필을 테이블당 쿼리 한 번으로 읽는다."""
+    fields = {uid: {"allergies": [], "diseases": [], "likes": [], "dislikes": []} for uid in user_ids}
+    ids = list(user_ids)
+    for uid, allergy in conn.execute(select(UserAllergy.user_id, UserAllergy.allergy)
+                                     .where(UserAllergy.user_id.in_(ids))):
+        fields[uid]["allergies"].append(allergy)
+    for uid, disease in conn.execute(select(UserDisease.user_id, UserDisease.disease)
+                                     .where(UserDisease.user_id.in_(ids))):
+        fields[uid]["diseases"].append(disease)
+    for uid, kind, menu_name in conn.execute(
+            select(UserPreference.user_id, UserPreference.preference_type, UserPreference.menu_name)
+            .where(UserPreference.user_id.in_(ids))):
+        fields[uid]["likes" if kind == "선호" else "dislikes"].append(menu_name)
+    return {uid: UserProfile(**{k: tuple(v) for k, v in f.items()}) for uid, f in fields.items()}
+
+
+class FeedbackExamples(IterableDataset):
+    """(특성 벡터, 출력 인덱스, 가중치)를 SQLite에서 청크 단위로 읽어 내보낸다."""
+
+    def __init__(self, split: str, menu_ids: list[int], database_url: str = DATABASE_URL,
+                 chunk_size: int = CHUNK_SIZE):
+        self.split = split
+        self.index = {menu_id: i for i, menu_id in enumerate(menu_ids)}
+        self.database_url = database_url
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker_id, num_workers = (info.id, info.num_workers) if info else (0, 1)
+        # 포크된 연결을 공유하지 않도록 워커마다 엔진을 새로 만든다
+        engine = create_engine(self.database_url)
+        try:
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(
+                    label_query(self.split, worker_id, num_workers))
+                while rows := result.fetchmany(self.chunk_size):
+                    yield from self._encode_chunk(conn, rows)
+        finally:
+            engine.dispose()
+
+    def _encode_chunk(self, conn, rows):
+        rows = [r for r in rows if r.menu_id in self.index]
+        if not rows:
+            return
+        if self.split == "train":
+            # 테이블 순서대로 읽히므로 청크 안에서라도 섞어 배치가 한 출처로 몰리지 않게 한다
+            random.shuffle(rows)
+        profiles = load_profiles(conn, {r.user_id for r in rows})
+        features = torch.from_numpy(encode_profiles([profiles[r.user_id] for r in rows]))
+        for row, x in zip(rows, features):
+            yield x, self.index[row.menu_id], LABEL_WEIGHTS[row.source]
+
+
+def menu_log_probs(model, x: torch.Tensor) -> torch.Tensor:
+    # MenuRecommender는 softmax 출력이므로 log를 취해 NLL로 계산한다 (softmax 두 번 적용 방지)
+    return torch.log(model(x).clamp_min(1e-9))
+
+
+def weighted_nll(log_probs: torch.Tensor, targets: torch.Tensor, weights: torch.Tensor) -> torch.Tensor:
+    losses = F.nll_loss(log_probs, targets, reduction="none")
+    return (losses * weights).sum() / weights.sum()
+
+
+def evaluate(model, loader, log_probs_fn=menu_log_probs) -> dict:
+    model.eval()
+    loss_sum, weight_sum, top1, top5, count = 0.0, 0.0, 0, 0, 0
+    with torch.no_grad():
+        for x, y, w in loader:
+            log_probs = log_probs_fn(model, x)
+            w = w.float()
+            loss_sum += weighted_nll(log_probs, y, w).item() * w.sum().item()
+            weight_sum += w.sum().item()
+            ranked = log_probs.topk(min(5, log_probs.shape[1]), dim=1).indices
+            top1 += (ranked[:, 0] == y).sum().item()
+            top5 += (ranked == y.unsqueeze(1)).any(dim=1).sum().item()
+            count += len(y)
+    if count == 0:
+        return {"loss": None, "top1": None, "top5": None, "examples": 0}
+    return {"loss": loss_sum / weight_sum, "top1": top1 / count, "top5": top5 / count, "examples": count}
+
+
+def fit(model, train_loader, valid_loader, log_probs_fn=menu_log_probs, epochs: int = MAX_EPOCHS,
+        learning_rate: float = LEARNING_RATE, patience: int = PATIENCE):
+    """미니배치 학습 + 검증 손실 기준 조기 종료. 가장 좋았던 가중치를 model에 되돌려 놓고 지표를 반환한다.
+    라벨이 하나도 없으면 None"""
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    best = {"loss": float("inf")}
+    best_state, best_epoch, stale, train_examples = None, 0, 0, 0
+    for epoch in range(1, epochs + 1):
+        started = time.perf_counter()
+        model.train()
+        train_loss, train_examples = 0.0, 0
+        for x, y, w in train_loader:
+            loss = weighted_nll(log_probs_fn(model, x), y, w.float())
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            train_loss += loss.item() * len(y)
+            train_examples += len(y)
+        if train_examples == 0:
+            print("학습할 라벨이 없습니다. (menu_feedback / reviews / recommendation_history)")
+            return None
+
+        valid = evaluate(model, valid_loader, log_probs_fn)
+        # 검증 데이터가 없으면 학습 손실로 조기 종료를 판단
+        monitored = valid["loss"] if valid["loss"] is not None else train_loss / train_examples
+        print(f"epoch {epoch:3d} train_loss={train_loss / train_examples:.4f} "
+              f"valid_loss={monitored:.4f} top1={valid['top1']} top5={valid['top5']} "
+              f"({time.perf_counter() - started:.1f}s)")
+
+        if monitored < best["loss"]:
+            best = {**valid, "loss": monitored}
+            best_state, best_epoch, stale = copy.deepcopy(model.state_dict()), epoch, 0
+        else:
+            stale += 1
+            if stale >= patience:
+                print(f"early stopping (best epoch {best_epoch})")
+                break
+
+    model.load_state_dict(best_state)
+    return {**best, "best_epoch": best_epoch, "train_examples": train_examples}
+
+
+def data_loaders(menu_ids: list[int], batch_size: int = BATCH_SIZE, num_workers: int = NUM_WORKERS):
+    loader_args = {"batch_size": batch_size, "num_workers": num_workers, "persistent_workers": num_workers > 0}
+    return (DataLoader(FeedbackExamples("train", menu_ids), **loader_args),
+            DataLoader(FeedbackExamples("valid", menu_ids), **loader_args))
+
+
+def train(epochs: int = MAX_EPOCHS, batch_size: int = BATCH_SIZE, num_workers: int = NUM_WORKERS,
+          learning_rate: float = LEARNING_RATE, patience: int = PATIENCE, catalog_path: str = CATALOG_PATH,
+          activate: bool = True):
+    menus = menu_mapping(catalog_path)
+    train_loader, valid_loader = data_loaders([m["menu_id"] for m in menus], batch_size, num_workers)
+
+    feature_schema = user_schema()
+    model = MenuRecommender(feature_schema["dim"], HIDDEN_DIM, len(menus))
+    metrics = fit(model, train_loader, valid_loader, epochs=epochs, learning_rate=learning_rate, patience=patience)
+    if metrics is None:
+        return None
+
+    metadata = {
+        "created_at": time.time(),
+        "catalog_version": catalog_version(catalog_path),
+        "feature_schema": feature_schema,
+        "menus": menus,
+        "hidden_dim": HIDDEN_DIM,
+        "metrics": metrics,
+        "params": {"batch_size": batch_size, "learning_rate": learning_rate, "patience": patience,
+                   "label_weights": LABEL_WEIGHTS, "min_rating": MIN_RATING, "valid_every": VALID_EVERY},
+    }
+    return save_checkpoint(model, metadata, activate=activate)
+
+
+def save_checkpoint(model, metadata: dict, checkpoint_dir: str = CHECKPOINT_DIR, activate: bool = True) -> str:
+    """버전 디렉터리에 저장하고 레지스트리(manifest.json)에 등록한다.
+    activate=False면 서빙 버전은 그대로 두고 섀도 평가 후보로 지정한다."""
+    version = time.strftime("%Y%m%d-%H%M%S")
+    directory = os.path.join(checkpoint_dir, version)
+    os.makedirs(directory, exist_ok=True)
+    torch.save(model.state_dict(), os.path.join(directory, "model.pth"))
+    with open(os.path.join(directory, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, **metadata}, f, ensure_ascii=False, indent=2)
+
+    register(directory, checkpoint_dir, activate=activate)
+    if not activate:
+        set_shadow(version, checkpoint_dir)
+    print(f"saved {directory} ({'active' if activate else 'shadow'})")
+    return directory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--candidate", action="store_true", help="바로 서빙하지 않고 섀도 평가 후보로 등록")
+    args = parser.parse_args()
+
+    train(args.epochs, args.batch_size, args.workers, args.lr, args.patience, args.catalog,
+          activate=not args.candidate)
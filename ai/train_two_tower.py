@@ -0,0 +1,62 @@
+# --- 투 타워 모델 학습 ---
+# 실행: python -m ai.train_two_tower [--epochs 50] [--batch-size 64] [--workers 2]
+#
+# 라벨/데이터 로더/조기 종료는 ai.train_model과 같다 (feedback / reviews / recommendation_history).
+# 배치마다 카탈로그 전체 메뉴의 아이템 타워 임베딩을 계산해 전체 메뉴 softmax로 학습하므로
+# 아이템 타워가 메뉴 id가 아닌 속성으로 일반화된다.
+# 결과는 ai/checkpoints/two_tower/<버전>/ 에 저장하고 two_tower/LATEST를 갱신한다.
+
+import argparse
+import time
+
+import torch
+import torch.nn.functional as F
+
+from ai.features import encode_items, item_schema, user_schema
+from ai.menu_catalog import CATALOG_PATH, catalog_version, get_catalog
+from ai.models.two_tower import EMBEDDING_DIM, TEMPERATURE, TOWER_HIDDEN_DIM, TWO_TOWER_DIR, TwoTowerModel
+from ai.train_model import (BATCH_SIZE, LABEL_WEIGHTS, LEARNING_RATE, MAX_EPOCHS, NUM_WORKERS, PATIENCE,
+                            data_loaders, fit, save_checkpoint)
+
+
+def train(epochs: int = MAX_EPOCHS, batch_size: int = BATCH_SIZE, num_workers: int = NUM_WORKERS,
+          learning_rate: float = LEARNING_RATE, patience: int = PATIENCE, catalog_path: str = CATALOG_PATH):
+    df = get_catalog(catalog_path).sort_values("menu_id")
+    menu_ids = [int(m) for m in df["menu_id"]]
+    item_x = torch.from_numpy(encode_items(df))
+    train_loader, valid_loader = data_loaders(menu_ids, batch_size, num_workers)
+
+    def log_probs(model, x):
+        return F.log_softmax(model(x, item_x), dim=1)
+
+    model = TwoTowerModel()
+    metrics = fit(model, train_loader, valid_loader, log_probs, epochs, learning_rate, patience)
+    if metrics is None:
+        return None
+
+    metadata = {
+        "created_at": time.time(),
+        "catalog_version": catalog_version(catalog_path),
+        "feature_schema": user_schema(),
+        "item_schema": item_schema(),
+        "hidden_dim": TOWER_HIDDEN_DIM,
+        "embedding_dim": EMBEDDING_DIM,
+        "temperature": TEMPERATURE,
+        "metrics": metrics,
+        "params": {"batch_size": batch_size, "learning_rate": learning_rate, "patience": patience,
+                   "label_weights": LABEL_WEIGHTS},
+    }
+    return save_checkpoint(model, metadata, TWO_TOWER_DIR)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=MAX_EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    train(args.epochs, args.batch_size, args.workers, args.lr, args.patience, args.catalog)
@@ -0,0 +1,184 @@
+# --- NumPy 기반 인메모리 벡터 인덱스 (Chroma 대체용) ---
+# 메뉴 카탈로그는 수백 건 수준이라 전체 임베딩을 float32 행렬 하나로 올려두고
+# 행렬-벡터 곱 한 번으로 top-k를 구한다.
+#
+# 디스크 구조 (예: ./vector_index/menu_db/)
+#   vectors.npy      (N, D) float32, L2 정규화, mmap으로 로드
+#   documents.jsonl  행마다 {"id", "page_content", "metadata"}
+#
+# 라우터별 선택: VECTOR_STORE=numpy|chroma (전체 기본값),
+#               VECTOR_STORE_<ROUTER>=numpy|chroma (라우터별 덮어쓰기)
+# 기존 Chroma 컬렉션 변환: python -m ai.vector_index ./chroma_db/menu_db
+
+import json
+import os
+import sys
+from typing import Any, Callable, List, Optional, Union
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+INDEX_ROOT = "./vector_index"
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+
+MetadataFilter = Union[dict, Callable[[dict], bool], None]
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class NumpyVectorIndex:
+    def __init__(self, path: str, embedding, mmap: bool = True):
+        self.path = path
+        self.embedding = embedding
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r" if mmap else None)
+
+        self.ids, self.documents = [], []
+        with open(os.path.join(path, DOCUMENTS_FILE), encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.documents.append(Document(page_content=row["page_content"], metadata=row["metadata"]))
+
+        if len(self.documents) != self.vectors.shape[0]:
+            raise ValueError(f"{path}: 문서 수({len(self.documents)})와 벡터 수({self.vectors.shape[0]})가 다릅니다.")
+        self._columns = {}
+
+    # ---------------------------
+    # 저장
+    # ---------------------------
+    @staticmethod
+    def write(path: str, ids: List[str], documents: List[Document], vectors) -> None:
+        os.makedirs(path, exist_ok=True)
+        matrix = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(documents), -1))
+
+        # 쓰는 도중 서버가 읽지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_vectors = os.path.join(path, VECTORS_FILE + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix))
+        tmp_docs = os.path.join(path, DOCUMENTS_FILE + ".tmp")
+        with open(tmp_docs, "w", encoding="utf-8") as f:
+            for doc_id, doc in zip(ids, documents):
+                f.write(json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                                   ensure_ascii=False) + "\n")
+
+        os.replace(tmp_vectors, os.path.join(path, VECTORS_FILE))
+        os.replace(tmp_docs, os.path.join(path, DOCUMENTS_FILE))
+
+    @classmethod
+    def from_documents(cls, documents: List[Document], embedding, path: str, ids: Optional[List[str]] = None):
+        ids = ids or [str(i) for i in range(len(documents))]
+        vectors = embedding.embed_documents([doc.page_content for doc in documents])
+        cls.write(path, ids, documents, vectors)
+        return cls(path, embedding)
+
+    @classmethod
+    def from_chroma(cls, chroma, embedding, path: str):
+        data = chroma.get(include=["embeddings", "documents", "metadatas"])
+        documents = [Document(page_content=text or "", metadata=meta or {})
+                     for text, meta in zip(data["documents"], data["metadatas"])]
+        cls.write(path, list(data["ids"]), documents, data["embeddings"])
+        return cls(path, embedding)
+
+    # ---------------------------
+    # 검색
+    # ---------------------------
+    def column(self, key: str) -> np.ndarray:
+        # 메타데이터 필터용 컬럼 배열 (처음 사용할 때 한 번만 생성)
+        if key not in self._columns:
+            values = [doc.metadata.get(key) for doc in self.documents]
+            if all(isinstance(v, (int, float, str)) for v in values):
+                self._columns[key] = np.asarray(values)
+            else:
+                column = np.empty(len(values), dtype=object)
+                for i, value in enumerate(values):
+                    column[i] = value
+                self._columns[key] = column
+        return self._columns[key]
+
+    def filter_mask(self, filter: MetadataFilter) -> Optional[np.ndarray]:
+        if filter is None:
+            return None
+        if callable(filter):
+            return np.fromiter((bool(filter(doc.metadata)) for doc in self.documents),
+                               dtype=bool, count=len(self.documents))
+
+        mask = np.ones(len(self.documents), dtype=bool)
+        for key, expected in filter.items():
+            values = expected if isinstance(expected, (list, tuple, set)) else [expected]
+            mask &= np.isin(self.column(key), list(values))
+        return mask
+
+    def search_by_vector(self, vector, k: int = 4, filter: MetadataFilter = None, mask: np.ndarray = None):
+        """(행 번호 배열, 유사도 배열)을 유사도 내림차순으로 반환한다."""
+        query = normalize(np.asarray(vector, dtype=np.float32))
+        if mask is None:
+            mask = self.filter_mask(filter)
+
+        if mask is None:
+            rows = None
+            scores = self.vectors @ query
+        else:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return rows, np.empty(0, dtype=np.float32)
+            scores = self.vectors[rows] @ query
+
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return (top if rows is None else rows[top]), scores[top]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: MetadataFilter = None):
+        rows, scores = self.search_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+        return [(self.documents[i], float(s)) for i, s in zip(rows, scores)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: MetadataFilter = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def as_retriever(self, search_kwargs: Optional[dict] = None, **kwargs) -> "NumpyRetriever":
+        return NumpyRetriever(index=self, search_kwargs=search_kwargs or {})
+
+
+class NumpyRetriever(BaseRetriever):
+    index: Any
+    search_kwargs: dict = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.index.similarity_search(
+            query, k=self.search_kwargs.get("k", 4), filter=self.search_kwargs.get("filter")
+        )
+
+
+def index_path_for(persist_directory: str) -> str:
+    return os.path.join(INDEX_ROOT, os.path.basename(os.path.normpath(persist_directory)))
+
+
+def vector_store_kind(router: str) -> str:
+    default = os.getenv("VECTOR_STORE", "chroma")
+    return os.getenv(f"VECTOR_STORE_{router.upper()}", default).lower()
+
+
+def open_vector_store(router: str, persist_directory: str, chroma_cls, embedding):
+    """라우터 설정에 따라 NumpyVectorIndex 또는 Chroma를 연다."""
+    if vector_store_kind(router) == "numpy":
+        return NumpyVectorIndex(index_path_for(persist_directory), embedding)
+    return chroma_cls(persist_directory=persist_directory, embedding_function=embedding)
+
+
+if __name__ == "__main__":
+    # 기존 Chroma 컬렉션을 NumPy 인덱스로 변환
+    from langchain_chroma import Chroma
+    from ai.backends import get_embeddings
+
+    for persist_directory in sys.argv[1:] or ["./chroma_db/menu_db"]:
+        embedding = get_embeddings()
+        chroma = Chroma(persist_directory=persist_directory, embedding_function=embedding)
+        index = NumpyVectorIndex.from_chroma(chroma, embedding, index_path_for(persist_directory))
+        print(f"✅ {persist_directory} → {index.path} ({index.vectors.shape[0]}건, {index.vectors.shape[1]}차원)")
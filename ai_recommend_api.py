@@ -1,39 +1,31 @@
-from fastapi import APIRouter, Depends
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import User, SessionLocal
 from pydantic import BaseModel
-import torch
-import torch.nn as nn
+from ai.features import user_vector
+from ai.model_serving import get_server
+from ai.models.menu_model import latest_checkpoint
+from ai.models.two_tower import TWO_TOWER_DIR, load_two_tower
 
 router = APIRouter()
 
-# AI 모델
-class MenuRecommender(nn.Module):
-    def __init__(self, input_dim, hidden_dim, output_dim):
-        super(MenuRecommender, self).__init__()
-        self.fc1 = nn.Linear(input_dim, hidden_dim)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(hidden_dim, output_dim)
-        self.softmax = nn.Softmax(dim=1)
+# AI 모델: 레지스트리(ai/checkpoints/manifest.json)의 active 버전 (출력 인덱스 → 카탈로그 menu_id)
+# 워커 스레드가 모델을 소유하고 동시 요청을 묶어 한 번에 추론하며, 버전이 바뀌면 재시작 없이 교체된다
+model_server = get_server()
 
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.relu(x)
-        x = self.fc2(x)
-        return self.softmax(x)
-
-INPUT_DIM = 20
-OUTPUT_DIM = 50
-
-model = MenuRecommender(INPUT_DIM, 64, OUTPUT_DIM)
-model.load_state_dict(torch.load("./ai/menu_model.pth"))
-model.eval()
-
-menu_list = [f"메뉴{i}" for i in range(OUTPUT_DIM)]
+# 투 타워 모델: 아이템 임베딩 행렬은 로드할 때 현재 카탈로그로 한 번 계산
+two_tower_checkpoint = latest_checkpoint(TWO_TOWER_DIR)
+two_tower = load_two_tower(two_tower_checkpoint) if two_tower_checkpoint else None
 
+# 모델은 사용자 프로필만 입력으로 받는다 (학습 라벨에 날씨/혼밥/예산이 없음, ai.features 참고)
 class AIRecommendRequest(BaseModel):
     username: str
 
+class TwoTowerRequest(AIRecommendRequest):
+    k: int = 5
+
 def get_db():
     db = SessionLocal()
     try:
@@ -44,21 +36,37 @@ def get_db():
 @router.post("/ai_recommend")
 def ai_recommend(request: AIRecommendRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == request.username).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    model = model_server.current()
+    if model is None:
+        raise HTTPException(status_code=503, detail="학습된 추천 모델이 없습니다. (python -m ai.train_model)")
+    if not model.schema_matches:
+        raise HTTPException(status_code=503, detail="추천 모델을 현재 특성 스키마로 다시 학습해야 합니다.")
 
-    allergies = [a.allergy for a in user.allergies]
-    diseases = [d.disease for d in user.diseases]
-    prefers = [p.menu_name for p in user.preferences if p.preference_type == "선호"]
-    dislikes = [p.menu_name for p in user.preferences if p.preference_type == "비선호"]
+    # 사용자 데이터 → 고정 어휘 특성 벡터 (학습과 같은 ai.features 사용자 부분, user_id별 캐시)
+    user_data = user_vector(user).tolist()
 
-    # 사용자 데이터 → 숫자 벡터 (예시로 단순화)
-    user_data = [len(allergies), len(diseases), len(prefers), len(dislikes)] + [0] * (INPUT_DIM - 4)
+    started = time.perf_counter()
+    try:
+        prediction = model.worker.predict(user_data)
+    except FutureTimeout:
+        raise HTTPException(status_code=503, detail="추천 모델 응답이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.")
+    model_server.shadow(model, user_data, prediction, (time.perf_counter() - started) * 1000)
+
+    menu = model.top_menu(prediction)
 
-    user_tensor = torch.tensor([user_data], dtype=torch.float32)
+    return {"recommended_menu": menu["menu_name"], "menu_id": menu["menu_id"], "place_name": menu["place_name"],
+            "model_version": model.version}
 
-    with torch.no_grad():
-        prediction = model(user_tensor)
-        top_menu_index = torch.argmax(prediction).item()
 
-    recommended_menu = menu_list[top_menu_index]
+@router.post("/ai_recommend/two_tower")
+def ai_recommend_two_tower(request: TwoTowerRequest, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.username == request.username).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if two_tower is None:
+        raise HTTPException(status_code=503, detail="학습된 투 타워 모델이 없습니다. (python -m ai.train_two_tower)")
 
-    return {"recommended_menu": recommended_menu}
+    # 사용자 타워 forward 한 번 + 아이템 행렬 내적, 알레르기/지병 위험 메뉴는 top-k 전에 제외
+    return {"recommendations": two_tower.recommend(user, k=max(1, min(request.k, 50)))}
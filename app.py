@@ -3,9 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from passlib.context import CryptContext
+import asyncio
 import pandas as pd
-import torch
-import torch.nn as nn
 
 # 내부 모듈 Import
 from mypage_api import mypage_router
@@ -17,6 +16,8 @@ from backend.llm_recommend_api import router as llm_recommend_router  # Streamin
 from models import User, SessionLocal
 from ai.langchain_recommender import recommend_menu as llm_recommend_menu
 from feedback_api import router as feedback_router 
+from ai.model_serving import get_server
+from ai.inference_worker import PREDICT_TIMEOUT
 
 app = FastAPI(title="오늘의 먹방은 API", version="1.0.0")
 
@@ -124,38 +125,27 @@ def recommend(request: RecommendRequest, db: Session = Depends(get_db)):
 class RecommendInput(BaseModel):
     user_data: list
 
-INPUT_DIM = 20
-OUTPUT_DIM = 50
-
-class MenuRecommender(nn.Module):
-    def __init__(self, input_dim, hidden_dim, output_dim):
-        super(MenuRecommender, self).__init__()
-        self.fc1 = nn.Linear(input_dim, hidden_dim)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(hidden_dim, output_dim)
-        self.softmax = nn.Softmax(dim=1)
-
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.relu(x)
-        x = self.fc2(x)
-        return self.softmax(x)
-
-model = MenuRecommender(INPUT_DIM, 64, OUTPUT_DIM)
-model.load_state_dict(torch.load("menu_model.pth"))
-model.eval()
-
-menu_list = [f"메뉴{i}" for i in range(OUTPUT_DIM)]
+# 모델은 레지스트리의 active 버전을 워커 스레드가 소유하고, 동시에 들어온 요청을 묶어 forward 한 번으로 처리한다
+model_server = get_server()
 
 @app.post("/api/ai_recommend")
-def ai_recommend(input_data: RecommendInput):
-    user_tensor = torch.tensor([input_data.user_data], dtype=torch.float32)
-
-    with torch.no_grad():
-        prediction = model(user_tensor)
-        top_menu_index = torch.argmax(prediction).item()
+async def ai_recommend(input_data: RecommendInput):
+    model = model_server.current()
+    if model is None:
+        raise HTTPException(status_code=503, detail="학습된 추천 모델이 없습니다. (python -m ai.train_model)")
+    if not model.schema_matches:
+        raise HTTPException(status_code=503, detail="추천 모델을 현재 특성 스키마로 다시 학습해야 합니다.")
+    try:
+        future = model.worker.submit(input_data.user_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # 시간이 지나면 Future까지 취소되어 워커가 이 요청을 건너뛴다
+        prediction = await asyncio.wait_for(asyncio.wrap_future(future), PREDICT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="추천 모델 응답이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.")
 
-    recommended_menu = menu_list[top_menu_index]
+    recommended_menu = model.top_menu(prediction)["menu_name"]
     return {"recommended_menu": recommended_menu}
 
 # -------------------------------
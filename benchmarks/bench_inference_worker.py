@@ -0,0 +1,61 @@
+# --- 마이크로 배치 추론 워커 벤치마크 ---
+# 실행: python -m benchmarks.bench_inference_worker
+# 동시 클라이언트 1/8/64개가 각자 REQUESTS_PER_CLIENT번 추론을 요청할 때
+#   direct : 요청 스레드에서 배치 1로 forward (기존 ai_recommend 방식, torch 기본 스레드 수)
+#   worker : ai.inference_worker.InferenceWorker (마이크로 배치 + 고정 스레드 수)
+# 처리량(req/s)과 p50/p99 지연을 비교한다. 체크포인트 없이 임의 가중치 모델로 측정한다.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from ai import metrics
+from ai.inference_worker import InferenceWorker
+from ai.models.menu_model import HIDDEN_DIM, INPUT_DIM, OUTPUT_DIM, MenuRecommender
+
+CLIENTS = [1, 8, 64]
+REQUESTS_PER_CLIENT = 200
+
+
+def direct_predict(model, features):
+    with torch.no_grad():
+        return model(torch.tensor([features], dtype=torch.float32))[0].tolist()
+
+
+def run(label: str, clients: int, predict):
+    def client(seed):
+        generator = torch.Generator().manual_seed(seed)
+        latencies = []
+        for _ in range(REQUESTS_PER_CLIENT):
+            features = torch.rand(INPUT_DIM, generator=generator).tolist()
+            started = time.perf_counter()
+            predict(features)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [ms for result in pool.map(client, range(clients)) for ms in result]
+    wall = time.perf_counter() - started
+    print(f"  {label:6s} clients={clients:3d} {len(latencies) / wall:8.0f} req/s "
+          f"p50={metrics.percentile(latencies, 50):6.2f}ms p99={metrics.percentile(latencies, 99):6.2f}ms")
+
+
+def main():
+    model = MenuRecommender(INPUT_DIM, HIDDEN_DIM, OUTPUT_DIM).eval()
+    # set_num_threads는 프로세스 전역이므로 direct를 먼저 모두 돌린 뒤 워커를 시작한다
+    for clients in CLIENTS:
+        run("direct", clients, lambda features: direct_predict(model, features))
+
+    worker = InferenceWorker(model, name="bench_inference")
+    for clients in CLIENTS:
+        run("worker", clients, worker.predict)
+
+    batch_sizes = metrics.snapshot()["timings"]["bench_inference.batch_size"]
+    print(f"worker batch size p50={batch_sizes['p50']:.0f} p99={batch_sizes['p99']:.0f} "
+          f"(max {worker.max_batch_size}, wait {worker.max_wait * 1000:.0f}ms, threads {worker.num_threads})")
+
+
+if __name__ == "__main__":
+    main()
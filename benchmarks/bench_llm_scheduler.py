@@ -0,0 +1,88 @@
+# --- LLM 스케줄러 벤치마크 (429를 내는 가짜 업스트림) ---
+# 실행: python -m benchmarks.bench_llm_scheduler
+# 초당 LIMIT건을 넘으면 429를 내는 ai.backends.FakeUpstream에 stream/chat/batch 워커가 동시에 호출한다.
+#   direct    : OpenAI 클라이언트 기본값처럼 각자 2번까지 지수 백오프 재시도
+#   scheduler : ai.llm_scheduler.LLMScheduler (토큰 버킷 + 우선순위 + 지터 백오프)
+# 성공/실패 수, 업스트림이 낸 429 수, 등급별 지연 p50/p99를 비교한다.
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai import metrics
+from ai.backends import FakeRateLimitError, FakeUpstream
+from ai.llm_scheduler import LLMScheduler
+
+LIMIT = 20             # 업스트림 한도 (초당 요청 수)
+SERVICE_SECONDS = 0.05
+WORKERS = {"stream": 8, "chat": 8, "batch": 16}
+CALLS_PER_WORKER = 10
+
+
+def direct_call(upstream: FakeUpstream):
+    # openai-python 기본값: max_retries=2, 0.5s부터 2배씩 (최대 8s), 25% 지터
+    for attempt in range(3):
+        try:
+            upstream.admit()
+            time.sleep(SERVICE_SECONDS)
+            return
+        except FakeRateLimitError:
+            if attempt == 2:
+                raise
+            time.sleep(min(8.0, 0.5 * 2 ** attempt) * (1 - 0.25 * random.random()))
+
+
+def run(label: str, call):
+    latencies = {priority: [] for priority in WORKERS}
+    failures = {priority: 0 for priority in WORKERS}
+    lock = threading.Lock()
+
+    def worker(priority):
+        for _ in range(CALLS_PER_WORKER):
+            started = time.perf_counter()
+            try:
+                call(priority)
+                ok = True
+            except FakeRateLimitError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies[priority].append((time.perf_counter() - started) * 1000)
+                else:
+                    failures[priority] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sum(WORKERS.values())) as pool:
+        for priority, count in WORKERS.items():
+            for _ in range(count):
+                pool.submit(worker, priority)
+    wall = time.perf_counter() - started
+
+    print(f"[{label}] {wall:.1f}s")
+    for priority in WORKERS:
+        samples = latencies[priority]
+        print(f"  {priority:6s} ok={len(samples):3d} failed={failures[priority]:3d} "
+              f"p50={metrics.percentile(samples, 50):7.0f}ms p99={metrics.percentile(samples, 99):7.0f}ms")
+
+
+def main():
+    upstream = FakeUpstream(LIMIT, window=1.0)
+    run("direct", lambda priority: direct_call(upstream))
+    print(f"  upstream 429s: {upstream.rejected}")
+
+    upstream = FakeUpstream(LIMIT, window=1.0)
+    # 버킷 한도는 업스트림 한도의 90%로 (윈도 경계에서 429가 나지 않게 여유를 둠)
+    scheduler = LLMScheduler(requests_per_minute=LIMIT * 60 * 0.9, tokens_per_minute=10 ** 9,
+                             max_retries=6, burst_seconds=0.5, name="bench_scheduler")
+
+    def scheduled_call(priority):
+        scheduler.run(upstream.admit, priority)
+        time.sleep(SERVICE_SECONDS)
+
+    run("scheduler", scheduled_call)
+    print(f"  upstream 429s: {upstream.rejected}")
+
+
+if __name__ == "__main__":
+    main()
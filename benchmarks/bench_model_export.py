@@ -0,0 +1,73 @@
+# --- 메뉴 모델 변형(float / TorchScript / int8) 벤치마크 ---
+# 실행: python -m benchmarks.bench_model_export
+# 출력층 크기(현재 카탈로그 규모 / 지역 확장 후 규모)별로 임의 가중치 모델을 만들어 ai.export_model로 내보내고,
+# 변형마다 별도 프로세스에서 로드해 파일 크기, 로드 후 RSS 증가량, 배치 1/64 지연 p50/p99,
+# float 대비 top-1 일치율을 비교한다.
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+import torch
+
+from ai import metrics
+from ai.export_model import export_variants
+from ai.features import USER_DIM
+from ai.models.menu_model import HIDDEN_DIM, VARIANT_FILES, MenuRecommender, load_menu_model
+
+OUTPUT_SIZES = [775, 20000]
+ITERATIONS = 300
+BATCH_SIZES = [1, 64]
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(path: str) -> dict:
+    torch.set_num_threads(1)
+    before = rss_kb()
+    model = load_menu_model(path)
+    inputs = {b: (torch.rand(b, USER_DIM) < 0.2).float() for b in BATCH_SIZES}
+    with torch.inference_mode():
+        model(inputs[1])  # 워밍업 (TorchScript 최적화 패스 포함)
+        loaded = rss_kb()
+        result = {"rss_mb": (loaded - before) / 1024}
+        for batch_size, x in inputs.items():
+            samples = []
+            for _ in range(ITERATIONS):
+                started = time.perf_counter()
+                model(x)
+                samples.append((time.perf_counter() - started) * 1000)
+            result[f"b{batch_size}"] = (metrics.percentile(samples, 50), metrics.percentile(samples, 99))
+    return result
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")
+    for output_dim in OUTPUT_SIZES:
+        print(f"[menus={output_dim}]")
+        with tempfile.TemporaryDirectory() as directory:
+            model = MenuRecommender(USER_DIM, HIDDEN_DIM, output_dim).eval()
+            torch.save(model.state_dict(), os.path.join(directory, VARIANT_FILES["float"]))
+            inputs = (torch.rand(1024, USER_DIM) < 0.2).float()
+            variants = export_variants(model, directory, inputs)
+
+            for name, filename in VARIANT_FILES.items():
+                path = os.path.join(directory, filename)
+                with ctx.Pool(1) as pool:
+                    result = pool.apply(measure, (path,))
+                agreement = variants[name]["parity"]["top1_agreement"] if name in variants else 1.0
+                print(f"  {name:12s} size={os.path.getsize(path) / 1024:8.1f}KB rss=+{result['rss_mb']:6.1f}MB "
+                      + " ".join(f"b{b} p50={result[f'b{b}'][0]:.3f}ms p99={result[f'b{b}'][1]:.3f}ms"
+                                 for b in BATCH_SIZES)
+                      + f" top1={agreement:.4f}")
+
+
+if __name__ == "__main__":
+    main()
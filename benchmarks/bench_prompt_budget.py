@@ -0,0 +1,43 @@
+# --- 챗봇 메뉴 목록 토큰 예산 벤치마크 ---
+# 실행: python -m benchmarks.bench_prompt_budget
+# 기존 방식(상황 태그에 맞는 메뉴 전체, 없으면 전체 메뉴)과 예산 적용 후 목록의
+# 프롬프트 토큰 수, 예상 입력 비용, 후보 선택 시간을 상황별로 비교한다.
+# 첫 토큰 지연은 서버 실행 후 /metrics 의 chatbot_stream.ttft_ms 로 확인한다.
+
+import time
+
+import pandas as pd
+
+from ai.hybrid_retrieval import extract_situation_tags
+from ai.prompt_budget import MENU_TOKEN_BUDGET, estimate_cost, estimate_tokens, render_menu_lines, select_menu_candidates
+
+SITUATIONS = ["매콤한 게 땡겨", "어제 술 마셔서 해장이 필요해", "친구랑 저녁 약속", "배고픈데 야식", "그냥 아무거나"]
+
+
+def legacy_menu_list(df: pd.DataFrame, situation_tags: list[str]) -> str:
+    relevant = df[df["top_tags"].apply(lambda x: any(tag in str(x) for tag in situation_tags))]
+    fallback = relevant if not relevant.empty else df
+    return "\n".join(render_menu_lines(fallback.drop_duplicates(subset=["place_name", "menu_name"])))
+
+
+def main():
+    df = pd.read_csv("./data/final_menu_data_with_emotion.csv")
+    df["feedback_score"] = 0
+    print(f"menus={len(df)}, budget={MENU_TOKEN_BUDGET} tokens")
+    print(f"{'situation':<20} {'before':>8} {'after':>8} {'cost before':>12} {'cost after':>11} {'select ms':>10}")
+
+    for situation in SITUATIONS:
+        tags = extract_situation_tags(situation)
+        before = estimate_tokens(legacy_menu_list(df, tags))
+
+        started = time.perf_counter()
+        selected, _ = select_menu_candidates(df, tags)
+        elapsed = (time.perf_counter() - started) * 1000
+        after = estimate_tokens(selected)
+
+        print(f"{situation:<20} {before:>8} {after:>8} {estimate_cost(before):>11.5f}$ "
+              f"{estimate_cost(after):>10.5f}$ {elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
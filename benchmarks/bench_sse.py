@@ -0,0 +1,55 @@
+# --- SSE 프레임 묶음 벤치마크 ---
+# 실행: python -m benchmarks.bench_sse
+# 토큰마다 프레임을 보내는 기존 방식과 ai.sse.coalesce 방식의
+# 응답당 프레임 수, 전송 바이트, 스트림당 CPU 시간을 비교한다.
+
+import asyncio
+import time
+from ai.sse import coalesce, sse_frame
+
+STREAMS = 50
+TOKENS_PER_RESPONSE = 400
+TOKEN_INTERVAL = 0.002   # 약 500 tokens/s
+TOKEN = "맛있는"
+
+
+async def fake_tokens():
+    for _ in range(TOKENS_PER_RESPONSE):
+        await asyncio.sleep(TOKEN_INTERVAL)
+        yield TOKEN
+
+
+async def per_token_frames():
+    async for token in fake_tokens():
+        yield sse_frame(token)
+
+
+async def consume(frames):
+    count, size = 0, 0
+    async for frame in frames:
+        count += 1
+        size += len(frame.encode("utf-8"))
+    return count, size
+
+
+async def run(label, make_frames):
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(*(consume(make_frames()) for _ in range(STREAMS)))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    frames = sum(r[0] for r in results) / STREAMS
+    size = sum(r[1] for r in results) / STREAMS
+    print(f"{label:<12} frames/response={frames:8.1f}  bytes/response={size:9.0f}  "
+          f"cpu/stream={cpu / STREAMS * 1000:7.2f}ms  wall={wall:.2f}s")
+
+
+async def main():
+    print(f"streams={STREAMS}, tokens/response={TOKENS_PER_RESPONSE}")
+    await run("per-token", per_token_frames)
+    await run("coalesced", lambda: coalesce(fake_tokens()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
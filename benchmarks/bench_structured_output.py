@@ -0,0 +1,53 @@
+# --- 구조화 출력 / JSON 복구 벤치마크 ---
+# 실행: python -m benchmarks.bench_structured_output
+# 1) 형식 안내문 토큰 수: PydanticOutputParser.get_format_instructions() vs 짧은 JSON 예시
+# 2) 실제로 자주 보이는 깨진 응답 형태에 대한 파싱 실패율: PydanticOutputParser vs 로컬 복구
+
+from langchain.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, Field
+
+from ai.prompt_budget import estimate_tokens
+from ai.structured_output import COMPACT_FORMAT_INSTRUCTIONS, StructuredOutputError, parse_recommendation
+
+
+class MenuRecommendation(BaseModel):
+    recommended_menu: str = Field(description="추천 메뉴")
+    recommendation_reason: str = Field(description="추천 이유")
+    alternative_options: list[str] = Field(description="대체 옵션")
+
+
+SAMPLES = [
+    '{"recommended_menu": "순두부", "recommendation_reason": "따뜻해요", "alternative_options": ["비빔밥"]}',
+    '```json\n{"recommended_menu": "순두부", "recommendation_reason": "따뜻해요", "alternative_options": ["비빔밥"]}\n```',
+    '{"recommended_menu": "김치찌개", "recommendation_reason": "얼큰해요", "alternative_options": ["냉면", "칼국수",],}',
+    '추천드릴게요!\n{"recommended_menu": "제육덮밥", "recommendation_reason": "든든해요", "alternative_options": []}',
+    "{'recommended_menu': '돈가스', 'recommendation_reason': '바삭해요', 'alternative_options': ['냉면']}",
+    '{"menu": "칼국수", "reason": "비 오는 날", "alternatives": "수제비, 김치전"}',
+    '{“recommended_menu”: “삼계탕”, “recommendation_reason”: “보양식”, “alternative_options”: [“순두부”]}',
+    '{"recommended_menu": "비빔밥", "recommendation_reason": "건강식", "alternative_options": ["순두부"]',
+    '죄송하지만 추천이 어렵습니다.',
+]
+
+
+def main():
+    parser = PydanticOutputParser(pydantic_object=MenuRecommendation)
+    before = estimate_tokens(parser.get_format_instructions())
+    after = estimate_tokens(COMPACT_FORMAT_INSTRUCTIONS)
+    print(f"format instructions: {before} → {after} tokens per prompt")
+
+    strict_failures = repaired_failures = 0
+    for sample in SAMPLES:
+        try:
+            parser.parse(sample)
+        except Exception:
+            strict_failures += 1
+        try:
+            parse_recommendation(sample, MenuRecommendation)
+        except StructuredOutputError:
+            repaired_failures += 1
+    print(f"parse failures: PydanticOutputParser {strict_failures}/{len(SAMPLES)}, "
+          f"local repair {repaired_failures}/{len(SAMPLES)}")
+
+
+if __name__ == "__main__":
+    main()
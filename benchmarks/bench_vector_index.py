@@ -0,0 +1,89 @@
+# --- NumPy 인덱스 vs Chroma 검색 벤치마크 ---
+# 실행: python -m benchmarks.bench_vector_index
+# 메뉴 카탈로그 + 상황 데이터(약 795건)를 같은 해싱 임베딩으로 두 저장소에 넣고
+# 쿼리 지연(p50/p99)과 로드 후 RSS 증가량을 비교한다. (네트워크 불필요)
+
+import os
+import tempfile
+import time
+
+import pandas as pd
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from ai.backends import HashingEmbeddings
+from ai.metrics import percentile
+from ai.vector_index import NumpyVectorIndex
+
+QUERIES = ["비 오는 날 따뜻한 국물", "매운 음식 야식", "가성비 좋은 혼밥", "달달한 디저트", "해장 메뉴"] * 40
+K = 5
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_documents():
+    menu_df = pd.read_csv("./data/final_menu_data.csv")
+    situation_df = pd.read_csv("./data/situation_recommend.csv")
+    docs = [
+        Document(page_content=f"{r.menu_name} ({r.place_name}) 지역: {r.region} 가격: {r.menu_price} 감성: {r.top_tags}",
+                 metadata={"menu_id": int(r.menu_id), "region": r.region})
+        for r in menu_df.itertuples()
+    ]
+    docs += [
+        Document(page_content=f"{r['situation']}: {r['추천 메뉴']} - {r['이유']}", metadata={"situation": r["situation"]})
+        for _, r in situation_df.iterrows()
+    ]
+    return docs
+
+
+def bench(label, search, vectors):
+    latencies = []
+    for vector in vectors:
+        started = time.perf_counter()
+        search(vector)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<8} p50={percentile(latencies, 50):7.3f}ms  p99={percentile(latencies, 99):7.3f}ms")
+
+
+def main():
+    embedding = HashingEmbeddings()
+    documents = load_documents()
+    vectors = embedding.embed_documents([doc.page_content for doc in documents])
+    query_vectors = [embedding.embed_query(q) for q in QUERIES]
+    print(f"documents={len(documents)}, dim={embedding.dim}, queries={len(QUERIES)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        numpy_path = os.path.join(tmp, "numpy")
+        NumpyVectorIndex.write(numpy_path, [str(i) for i in range(len(documents))], documents, vectors)
+        chroma_path = os.path.join(tmp, "chroma")
+        chroma = Chroma(persist_directory=chroma_path, embedding_function=embedding)
+        chroma.add_texts([d.page_content for d in documents], [d.metadata for d in documents])
+        del chroma
+
+        before = rss_mb()
+        index = NumpyVectorIndex(numpy_path, embedding)
+        bench("numpy", lambda v: index.search_by_vector(v, k=K), query_vectors)
+        print(f"         RSS +{rss_mb() - before:.1f}MB")
+
+        before = rss_mb()
+        chroma = Chroma(persist_directory=chroma_path, embedding_function=embedding)
+        bench("chroma", lambda v: chroma.similarity_search_by_vector(v, k=K), query_vectors)
+        print(f"         RSS +{rss_mb() - before:.1f}MB")
+
+        bench("numpy+f", lambda v: index.search_by_vector(v, k=K, filter={"region": "청파동"}), query_vectors)
+        bench("chroma+f", lambda v: chroma.similarity_search_by_vector(v, k=K, filter={"region": "청파동"}),
+              query_vectors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# --- 추천기 오프라인 평가 / 지연 하니스 ---
+# 실행: LLM_BACKEND=fake python -m benchmarks.eval_recommenders [--k 5] [--limit 100] [--concurrency 8]
+#                                                            [--only rule,pytorch] [--output report.json]
+#
+# 학습과 조기 종료 어디에도 쓰지 않는 test split(ai.train_model.label_query("test"): 좋아요 피드백 / 4점 이상 리뷰 / 추천 기록)을
+# 같은 인터페이스(recommend(case, k) → 메뉴 이름 순위 목록)로 각 추천기에 다시 넣어 비교한다.
+#   rule            규칙 기반 (/api/menu-recommend 와 같은 ai.rule_recommender)
+#   pytorch         레지스트리 active 버전의 MenuRecommender (ai.model_serving 워커 경유)
+#   two_tower       투 타워 모델 (체크포인트가 있을 때)
+#   distilled       LLM 응답을 증류한 학생 모델 (LLM 라우터의 mode="fast", ai.distillation)
+#   ai_recommend    /ai/recommend 라우터 (ai.improved_ai_model)
+#   menu_llm        /menu/llm-recommend 라우터 (ai.langchain_recommender)
+#   chatbot_stream  /api/llm-recommend-stream (ai.chatbot_integration), 스트림 본문에서 카탈로그 메뉴명을 추출
+# LLM 추천기는 라우터 함수를 그대로 호출하므로 지연 예산/규칙 대체(tier)까지 포함해 측정된다.
+# 실제 API 과금을 막기 위해 LLM_BACKEND=fake 가 아니면 --live 없이는 LLM 추천기를 건너뛴다.
+#
+# 지표
+#   hit_rate@1 / hit_rate@k   테스트 라벨 메뉴가 상위 1 / k개 안에 있는 비율
+#   violation_rate            추천 항목 중 사용자 알레르기/지병 위험 메뉴 비율 (unsafe_case_rate: 한 건이라도 있는 요청)
+#   unknown_rate              카탈로그에 없는 메뉴명 비율 (LLM 환각)
+#   diversity / coverage      서로 다른 추천 메뉴 수 / 전체 추천 항목 수, / 카탈로그 메뉴 수
+#   latency p50/p95/p99, throughput(req/s)  concurrency개 스레드로 동시에 요청했을 때
+#   fallback_rate             LLM 라우터가 규칙 기반으로 대체한 비율 (ai.orchestrator tier 카운터)
+# 테스트 라벨에는 요청 상황이 없으므로 날씨는 케이스마다 돌려 쓰고 예산은 지정하지 않는다.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy import create_engine, select
+
+from ai import metrics
+from ai.backends import LLM_BACKEND, is_fake_backend
+from ai.features import WEATHERS, RequestContext, UserProfile, encode_profiles
+from ai.menu_catalog import get_catalog
+from ai.rule_recommender import is_safe_for_disease
+from ai.train_model import label_query, load_profiles
+from models import DATABASE_URL, SessionLocal, User
+
+DEFAULT_K = 5
+DEFAULT_LIMIT = 100
+DEFAULT_CONCURRENCY = 8
+ALONE = "여럿"
+SITUATION = "오늘 먹을 메뉴 추천해줘"
+NO_RECOMMENDATION = "추천 불가"
+
+
+@dataclass(frozen=True)
+class Case:
+    user_id: int
+    username: str
+    profile: UserProfile
+    context: RequestContext
+    target_menu: str
+    source: str
+
+
+def load_cases(limit: int = DEFAULT_LIMIT, seed: int = 0) -> list[Case]:
+    catalog = get_catalog()
+    names = dict(zip(catalog["menu_id"].astype(int), catalog["menu_name"]))
+    engine = create_engine(DATABASE_URL)
+    try:
+        with engine.connect() as conn:
+            rows = sorted((r for r in conn.execute(label_query("test")) if r.menu_id in names),
+                          key=lambda r: (r.source, r.id))
+            rows = random.Random(seed).sample(rows, min(limit, len(rows)))
+            user_ids = {r.user_id for r in rows}
+            profiles = load_profiles(conn, user_ids)
+            usernames = dict(conn.execute(select(User.id, User.username).where(User.id.in_(list(user_ids)))).all())
+    finally:
+        engine.dispose()
+
+    rows = [r for r in rows if r.user_id in usernames]
+    return [
+        Case(r.user_id, usernames[r.user_id], profiles[r.user_id],
+             RequestContext(weather=WEATHERS[i % len(WEATHERS)]), names[r.menu_id], r.source)
+        for i, r in enumerate(rows)
+    ]
+
+
+def catalog_risks() -> dict:
+    """메뉴명 → (알레르기 집합, 주의 질환 집합). 같은 이름의 메뉴가 여러 식당에 있으면 합친다."""
+    risks = {}
+    for name, allergies, diseases in zip(*(get_catalog()[c] for c in ("menu_name", "allergy_list", "disease_list"))):
+        known = risks.setdefault(name, (set(), set()))
+        known[0].update(allergies)
+        known[1].update(diseases)
+    return risks
+
+
+def mentioned_menus(text: str, names: list[str]) -> list[str]:
+    """자유 텍스트에 나온 카탈로그 메뉴명을 등장 순서대로 (긴 이름 우선, 겹치는 짧은 이름은 무시)"""
+    found, taken = [], []
+    for name in names:
+        start = text.find(name)
+        while start != -1:
+            end = start + len(name)
+            if not any(s < end and start < e for s, e in taken):
+                found.append((start, name))
+                taken.append((start, end))
+                break
+            start = text.find(name, start + 1)
+    return [name for _, name in sorted(found)]
+
+
+# ---------------------------
+# 추천기 어댑터
+# ---------------------------
+class Recommender:
+    name = ""
+    llm = False
+    tier_prefix = None  # ai.orchestrator.recommend_with_budget에 넘기는 이름
+
+    def recommend(self, case: Case, k: int) -> list[str]:
+        raise NotImplementedError
+
+
+class RuleAdapter(Recommender):
+    name = "rule"
+
+    def __init__(self):
+        from ai.rule_recommender import rule_recommend
+        self._recommend = rule_recommend
+
+    def recommend(self, case, k):
+        rows, _ = self._recommend("", list(case.profile.allergies), list(case.profile.diseases), alone=ALONE, k=k)
+        return [row["menu_name"] for row in rows]
+
+
+class TorchAdapter(Recommender):
+    name = "pytorch"
+
+    def __init__(self):
+        from ai.model_serving import load_version
+        from ai.models.menu_model import latest_checkpoint
+        checkpoint = latest_checkpoint()
+        if checkpoint is None:
+            raise RuntimeError("체크포인트가 없습니다. (python -m ai.train_model)")
+        self.model = load_version(checkpoint, name="eval_pytorch")
+        if not self.model.schema_matches:
+            raise RuntimeError(f"{checkpoint}의 특성 스키마가 현재 ai.features와 다릅니다.")
+
+    def recommend(self, case, k):
+        prediction = self.model.worker.predict(encode_profiles([case.profile])[0].tolist())
+        ranked = sorted(range(len(prediction)), key=prediction.__getitem__, reverse=True)[:k]
+        return [self.model.menus[i]["menu_name"] for i in ranked]
+
+
+class TwoTowerAdapter(Recommender):
+    name = "two_tower"
+
+    def __init__(self):
+        from ai.models.menu_model import latest_checkpoint
+        from ai.models.two_tower import TWO_TOWER_DIR, load_two_tower
+        checkpoint = latest_checkpoint(TWO_TOWER_DIR)
+        if checkpoint is None:
+            raise RuntimeError("투 타워 체크포인트가 없습니다. (python -m ai.train_two_tower)")
+        self.model = load_two_tower(checkpoint)
+
+    def recommend(self, case, k):
+        embedding = self.model.user_embedding(encode_profiles([case.profile])[0])
+        top = self.model.index.top_k(embedding, list(case.profile.allergies), list(case.profile.diseases), k)
+        return [self.model.index.menus[i]["menu_name"] for i, _ in top]
+
+
+class DistilledAdapter(Recommender):
+    name = "distilled"
+
+    def __init__(self):
+        from ai.distillation import get_student
+        self.model = get_student()
+        if self.model is None:
+            raise RuntimeError("증류 모델이 없습니다. (python -m ai.train_distilled)")
+
+    def recommend(self, case, k):
+        return self.model.rank(case.profile, case.context, k)
+
+
+def recommendation_names(result: dict) -> list[str]:
+    names = [result["recommended_menu"], *result.get("alternative_options", [])]
+    return [name for name in names if name and name != NO_RECOMMENDATION]
+
+
+class AIRecommendAdapter(Recommender):
+    name = "ai_recommend"
+    llm = True
+    tier_prefix = "ai_recommend"
+
+    def __init__(self):
+        from ai.improved_ai_model import RecommendRequest, recommend_menu
+        self._request, self._endpoint = RecommendRequest, recommend_menu
+
+    def recommend(self, case, k):
+        # 이 라우터는 예산이 낮음/중간/높음 중 하나여야 한다
+        request = self._request(username=case.username, weather=case.context.weather, alone=ALONE, budget="중간")
+        db = SessionLocal()
+        try:
+            return recommendation_names(self._endpoint(request, db))[:k]
+        finally:
+            db.close()
+
+
+class MenuLLMAdapter(Recommender):
+    name = "menu_llm"
+    llm = True
+    tier_prefix = "menu_llm_recommend"
+
+    def __init__(self):
+        from ai.langchain_recommender import LLMRecommendRequest, llm_recommend
+        self._request, self._endpoint = LLMRecommendRequest, llm_recommend
+
+    def recommend(self, case, k):
+        request = self._request(username=case.username, weather=case.context.weather, alone=ALONE, budget="")
+        db = SessionLocal()
+        try:
+            return recommendation_names(self._endpoint(request, db))[:k]
+        finally:
+            db.close()
+
+
+class ChatbotStreamAdapter(Recommender):
+    name = "chatbot_stream"
+    llm = True
+
+    def __init__(self):
+        from ai.chatbot_integration import llm_recommend_stream
+        self._endpoint = llm_recommend_stream
+        self._names = sorted(set(get_catalog()["menu_name"]), key=len, reverse=True)
+
+    def recommend(self, case, k):
+        return mentioned_menus(asyncio.run(self._read_stream(case)), self._names)[:k]
+
+    async def _read_stream(self, case) -> str:
+        db = SessionLocal()
+        try:
+            response = await self._endpoint(None, case.user_id, case.context.weather, SITUATION, None, db)
+            lines = []
+            async for frame in response.body_iterator:
+                frame = frame.decode("utf-8") if isinstance(frame, bytes) else frame
+                lines += [line[len("data: "):] for line in frame.split("\n")
+                          if line.startswith("data: ") and line != "data: [END]"]
+            return "\n".join(lines)
+        finally:
+            db.close()
+
+
+RECOMMENDERS = {cls.name: cls for cls in (RuleAdapter, TorchAdapter, TwoTowerAdapter, DistilledAdapter,
+                                          AIRecommendAdapter, MenuLLMAdapter, ChatbotStreamAdapter)}
+
+
+# ---------------------------
+# 평가
+# ---------------------------
+def ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
+
+
+def is_violation(profile: UserProfile, name: str, risks: tuple) -> bool:
+    allergies, diseases = risks
+    return bool(allergies & set(profile.allergies)) or bool(diseases & set(profile.diseases)) \
+        or not is_safe_for_disease(name, list(profile.diseases))
+
+
+def summarize(results: list, k: int, elapsed: float, risks: dict) -> dict:
+    latencies = [ms for _, _, ms, _ in results]
+    answered = [(case, names) for case, names, _, error in results if error is None]
+    hit1 = hitk = items = violations = unknown = unsafe_cases = empty = 0
+    distinct = set()
+    for case, names in answered:
+        empty += not names
+        hit1 += names[:1] == [case.target_menu]
+        hitk += case.target_menu in names
+        unsafe = False
+        for name in names:
+            items += 1
+            distinct.add(name)
+            if name not in risks:
+                unknown += 1
+            elif is_violation(case.profile, name, risks[name]):
+                violations += 1
+                unsafe = True
+        unsafe_cases += unsafe
+
+    return {
+        "cases": len(results),
+        "errors": len(results) - len(answered),
+        "hit_rate@1": ratio(hit1, len(answered)),
+        f"hit_rate@{k}": ratio(hitk, len(answered)),
+        "violation_rate": ratio(violations, items),
+        "unsafe_case_rate": ratio(unsafe_cases, len(answered)),
+        "unknown_rate": ratio(unknown, items),
+        "empty_rate": ratio(empty, len(answered)),
+        "diversity": ratio(len(distinct), items),
+        "coverage": ratio(len(distinct), len(risks)),
+        "latency_ms": {f"p{q}": metrics.percentile(latencies, q) for q in (50, 95, 99)},
+        "throughput_rps": ratio(len(results), elapsed),
+    }
+
+
+def tier_counts(prefix: str) -> tuple[int, int]:
+    counters = metrics.snapshot()["counters"]
+    return counters.get(f"{prefix}.tier.llm", 0), counters.get(f"{prefix}.tier.rule", 0)
+
+
+def evaluate(recommender: Recommender, cases: list[Case], k: int, concurrency: int, risks: dict) -> dict:
+    def run(case):
+        started = time.perf_counter()
+        try:
+            names, error = recommender.recommend(case, k)[:k], None
+        except Exception as e:
+            names, error = None, repr(e)
+        return case, names, (time.perf_counter() - started) * 1000, error
+
+    run(cases[0])  # 워밍업 (인덱스/모델 첫 로드, 스레드 시작)은 측정에서 뺀다
+    before = tier_counts(recommender.tier_prefix) if recommender.tier_prefix else None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run, cases))
+    report = summarize(results, k, time.perf_counter() - started, risks)
+
+    if before is not None:
+        llm, rule = (after - prior for after, prior in zip(tier_counts(recommender.tier_prefix), before))
+        report["fallback_rate"] = ratio(rule, llm + rule)
+    errors = [error for _, _, _, error in results if error]
+    if errors:
+        print(f"  ⚠️ {recommender.name}: {len(errors)}건 실패 (예: {errors[0]})")
+    return report
+
+
+def print_report(name: str, report: dict, k: int):
+    latency = report["latency_ms"]
+    extra = f" fallback={report['fallback_rate']:.2f}" if "fallback_rate" in report else ""
+    print(f"{name:15s} hit@1={report['hit_rate@1']:.3f} hit@{k}={report[f'hit_rate@{k}']:.3f} "
+          f"violation={report['violation_rate']:.3f} unknown={report['unknown_rate']:.3f} "
+          f"diversity={report['diversity']:.3f} coverage={report['coverage']:.3f} "
+          f"p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms "
+          f"rps={report['throughput_rps']:.1f} errors={report['errors']}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="테스트 케이스 수 (무작위 샘플)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--only", default=",".join(RECOMMENDERS), help="쉼표로 구분한 추천기 이름")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--live", action="store_true", help="LLM_BACKEND=fake가 아니어도 LLM 추천기 실행 (API 과금)")
+    parser.add_argument("--output", default=None, help="JSON 보고서 경로")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    cases = load_cases(args.limit, args.seed)
+    if not cases:
+        raise SystemExit("test split에 라벨이 없습니다. (menu_feedback / reviews / recommendation_history)")
+    risks = catalog_risks()
+    print(f"cases={len(cases)} k={args.k} concurrency={args.concurrency} backend={LLM_BACKEND}")
+
+    report = {"k": args.k, "cases": len(cases), "concurrency": args.concurrency, "backend": LLM_BACKEND,
+              "recommenders": {}}
+    for name in args.only.split(","):
+        cls = RECOMMENDERS[name.strip()]
+        if cls.llm and not is_fake_backend() and not args.live:
+            print(f"⚠️ {cls.name}: LLM_BACKEND=fake 로 실행하거나 --live 를 지정하세요. 건너뜁니다.")
+            continue
+        try:
+            recommender = cls()
+        except Exception as e:
+            print(f"⚠️ {cls.name}: 준비 실패, 건너뜁니다. ({e})")
+            continue
+        report["recommenders"][cls.name] = evaluate(recommender, cases, args.k, args.concurrency, risks)
+        print_report(cls.name, report["recommenders"][cls.name], args.k)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# --- AI 엔드포인트 부하 테스트 ---
+# 서버를 가짜 백엔드로 띄운 뒤 실행한다.
+#   LLM_BACKEND=fake uvicorn main:app --port 8000
+#   python -m benchmarks.load_test --target recommend --concurrency 16 --requests 200
+#
+# 스트리밍 엔드포인트는 첫 바이트까지 시간(TTFB)과 전체 시간을 함께 측정한다.
+
+import argparse
+import asyncio
+import time
+import httpx
+from ai.metrics import percentile
+
+TARGETS = {
+    "recommend": ("POST", "/ai/recommend", {"weather": "맑음", "alone": "혼자", "budget": "중간"}),
+    "llm-recommend": ("POST", "/menu/llm-recommend", {"weather": "비", "alone": "여럿", "budget": "중간"}),
+    "chat": ("POST", "/chatbot/chat", {"message": "오늘 점심 뭐 먹을까?"}),
+    "stream": ("GET", "/api/llm-recommend-stream", {"weather": "비", "situation": "비오는 날"}),
+}
+
+
+async def one_request(client, method, path, payload, args):
+    started = time.perf_counter()
+    ttfb = None
+    if method == "GET":
+        params = dict(payload, user_id=args.user_id)
+        async with client.stream("GET", path, params=params) as response:
+            async for line in response.aiter_lines():
+                if ttfb is None and line.startswith("data:"):
+                    ttfb = time.perf_counter() - started
+                if line.strip() == "data: [END]":
+                    break
+    else:
+        body = dict(payload, username=args.username)
+        response = await client.post(path, json=body)
+        response.raise_for_status()
+    total = time.perf_counter() - started
+    return total, ttfb if ttfb is not None else total
+
+
+async def main(args):
+    method, path, payload = TARGETS[args.target]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    totals, ttfbs, errors = [], [], 0
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            async with semaphore:
+                try:
+                    total, ttfb = await one_request(client, method, path, payload, args)
+                    totals.append(total * 1000)
+                    ttfbs.append(ttfb * 1000)
+                except Exception as e:
+                    errors += 1
+                    print("[ERROR]", e)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.target}: {len(totals)} ok / {errors} errors, {len(totals) / elapsed:.1f} req/s")
+    for name, values in (("total", totals), ("ttfb", ttfbs)):
+        print(f"  {name:<5} p50={percentile(values, 50):8.1f}ms  p95={percentile(values, 95):8.1f}ms  "
+              f"p99={percentile(values, 99):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--target", choices=TARGETS, default="recommend")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--username", default="test")
+    parser.add_argument("--user-id", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends
-from sse_starlette.sse import EventSourceResponse
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 from database import SessionLocal
 from models import User
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from ai import metrics
+from ai.backends import get_chat_model, get_embeddings
+from ai.vector_index import open_vector_store
+from ai.build_menu_index import open_menu_index
+from ai.hybrid_retrieval import RetrievalFilters, extract_situation_tags, hybrid_search
+from ai.sse import stream_events, sse_response, sse_error_response
+from ai.precomputed import log_request, lookup, request_signature
 import asyncio
+import time
 
 load_dotenv()
 
 router = APIRouter()
 
 # Vector DB
-menu_db = Chroma(
-    persist_directory="./chroma_db",
-    embedding_function=OpenAIEmbeddings()
-)
-situation_db = Chroma(
-    persist_directory="./chroma_situation_db",
-    embedding_function=OpenAIEmbeddings()
-)
+# 메뉴 검색은 카탈로그 인덱스(알레르기/지병 메타데이터 포함)를 사용
+try:
+    menu_db = open_menu_index("llm_stream")
+except Exception as e:
+    print(f"⚠️ llm_recommend_api: 메뉴 인덱스를 열 수 없습니다. 검색 없이 스트리밍합니다. ({e})")
+    menu_db = None
+situation_db = open_vector_store("llm_stream", "./chroma_situation_db", Chroma, get_embeddings())
+
+# LLM / 프롬프트는 요청마다 만들지 않고 한 번만 생성
+llm = get_chat_model("gpt-3.5-turbo", streaming=True, priority="stream")
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a concise and friendly AI assistant for the 'Today's Menu' app. "
+     "Respond only to food-related questions or menu recommendations. "
+     "If the input is unrelated (e.g., 'hello', 'I'm bored'), reply with: 'This service is only for menu recommendations.' "
+     "Keep your answers within 3 sentences and use bullet points if possible."),
+    ("user", "{input}")
+])
+
+chain = prompt | llm
 
 # DB 세션
 def get_db():
@@ -32,66 +50,92 @@ def get_db():
     finally:
         db.close()
 
-@router.get("/llm-recommend-stream")
-async def llm_recommend_stream(user_id: int, weather: str, situation: str, db: Session = Depends(get_db)):
-    # 1. 사용자 정보 조회 및 프로필 구성
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return EventSourceResponse(iter(["data: 사용자 정보를 찾을 수 없습니다.\n\ndata: [END]\n\n"]))
+SITUATION_DB_SITUATIONS = ["비오는 날", "추운 날", "더운 날", "스트레스 받을 때", "피곤할 때"]
 
-    allergies = [a.allergy for a in user.allergies]
-    diseases = [d.disease for d in user.diseases]
 
+def build_request(situation: str, weather: str, allergies: list[str], diseases: list[str]):
+    """(LLM 입력 문자열, 검색 함수) — 엔드포인트와 미리 생성 배치 작업이 같은 입력을 쓰도록 분리"""
     user_profile = f"""
     [사용자 정보]
     - 지병: {', '.join(diseases) if diseases else '없음'}
     - 알레르기: {', '.join(allergies) if allergies else '없음'}
     """.strip()
 
-    # 2. 상황 기반 DB 선택 및 입력 구성
-    if situation in ["비오는 날", "추운 날", "더운 날", "스트레스 받을 때", "피곤할 때"]:
+    if situation in SITUATION_DB_SITUATIONS:
         retriever = situation_db.as_retriever(search_kwargs={"k": 3})
+        retrieve = retriever.ainvoke
         context_input = (
             f"Situation: {situation}\n"
             f"{user_profile}\n"
             "Please recommend appropriate menus and explain why."
         )
     else:
-        retriever = menu_db.as_retriever(search_kwargs={"k": 3})
+        # 알레르기/지병 위험 메뉴는 검색 단계에서 제외
+        filters = RetrievalFilters(allergies=allergies, diseases=diseases)
+        keywords = extract_situation_tags(f"{situation} {weather}")
+
+        async def retrieve(query):
+            if menu_db is None:
+                return []
+            return await asyncio.to_thread(hybrid_search, menu_db, query, filters, 3, keywords)
+
         context_input = (
             f"{user_profile}\n"
             f"Weather: {weather}\n"
             f"Situation: {situation}\n\n"
             "Exclude allergens if mentioned. Recommend 2–3 menu items and explain each in 1–2 short sentences."
         )
+    return context_input, retrieve
+
 
-    # 3. LLM 연결
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo", streaming=True)
+async def stream_answer(context_input: str, retrieve):
+    docs = await retrieve(context_input)
+    context = "\n".join([doc.page_content for doc in docs])
+    full_input = f"{context_input}\n\n참고 정보:\n{context}"
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         "You are a concise and friendly AI assistant for the 'Today's Menu' app. "
-         "Respond only to food-related questions or menu recommendations. "
-         "If the input is unrelated (e.g., 'hello', 'I'm bored'), reply with: 'This service is only for menu recommendations.' "
-         "Keep your answers within 3 sentences and use bullet points if possible."),
-        ("user", "{input}")
-    ])
+    async for chunk in chain.astream({"input": full_input}):
+        if chunk.content:
+            yield chunk.content
+
+
+async def generate_answer(situation: str, weather: str, allergies: list[str], diseases: list[str]) -> str:
+    """전체 답변 문자열 (ai.precompute_recommendations 배치 작업용)"""
+    context_input, retrieve = build_request(situation, weather, allergies, diseases)
+    return "".join([token async for token in stream_answer(context_input, retrieve)])
+
+
+@router.get("/llm-recommend-stream")
+async def llm_recommend_stream(request: Request, user_id: int, weather: str, situation: str, db: Session = Depends(get_db)):
+    # 1. 사용자 정보 조회
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        return sse_error_response("사용자 정보를 찾을 수 없습니다.")
+
+    allergies = [a.allergy for a in user.allergies]
+    diseases = [d.disease for d in user.diseases]
 
-    chain = prompt | llm
+    # 2. 자주 나오는 조합이면 미리 생성된 답변을 바로 보낸다 (현재 카탈로그 버전, 서명 완전 일치만)
+    sig = request_signature(situation, weather, allergies, diseases)
+    log_request(sig)
+    precomputed_answer = lookup(sig)
 
-    # 4. SSE Generator
-    async def event_generator():
-        try:
-            docs = await retriever.ainvoke(context_input)
-            context = "\n".join([doc.page_content for doc in docs])
-            full_input = f"{context_input}\n\n참고 정보:\n{context}"
+    # 3. 상황 기반 DB 선택 및 입력 구성
+    context_input, retrieve = build_request(situation, weather, allergies, diseases)
 
-            result = await llm.ainvoke(full_input)
-            yield f"data: {result.content}\n\n"
+    # 4. 토큰 생성기 (프레임 묶음/heartbeat/[END]는 ai.sse에서 처리)
+    async def token_generator():
+        if precomputed_answer is not None:
+            yield precomputed_answer
+            return
 
-        except Exception as e:
-            yield f"data: 오류가 발생했습니다: {str(e)}\n\n"
-        finally:
-            yield "data: [END]\n\n"
+        started = time.perf_counter()
+        first_token_at = None
+        async for token in stream_answer(context_input, retrieve):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics.observe("llm_stream.ttft_ms", (first_token_at - started) * 1000)
+            yield token
 
-    return EventSourceResponse(event_generator())
+    return sse_response(stream_events(
+        token_generator(), "오류가 발생했습니다. 다시 시도해 주세요.", name="llm_stream", request=request
+    ))
@@ -13,6 +13,7 @@ from llm_recommend_api import router as llm_recommend_router
 from feedback_api import router as feedback_router
 from user_api import router as user_router
 from history_api import router as history_router
+from ai import metrics
 
 # FastAPI 앱 생성 함수
 def create_app():
@@ -57,6 +58,11 @@ def create_app():
     def read_root():
         return {"message": "오늘의 먹방은 백엔드 정상 동작 중"}
 
+    # 성능 지표 조회
+    @app.get("/metrics")
+    def read_metrics():
+        return metrics.snapshot()
+
     return app
 
 # FastAPI 앱 인스턴스 생성
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, create_engine
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, Text, create_engine
 from sqlalchemy.orm import relationship, declarative_base, sessionmaker
 from datetime import datetime
 from sqlalchemy import DateTime
@@ -124,6 +124,21 @@ class RecommendationHistory(Base):
     restaurant_id = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+# -------------------- 챗봇 대화 기록 (워커 간 공유) --------------------
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+
+    session_id = Column(String, primary_key=True)
+    owner = Column(String, index=True)
+    last_used = Column(Float, index=True)  # time.time()
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, ForeignKey("chat_sessions.session_id"), index=True)
+    message = Column(Text)  # LangChain message_to_dict() JSON
+
 
 # -------------------- DB 연결 설정 --------------------
 DATABASE_URL = "sqlite:///./test.db"
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from models import SessionLocal, User, UserAllergy, UserDisease, UserPreference
 from pydantic import BaseModel
+from ai.features import invalidate_user
 
 mypage_router = APIRouter()
 
@@ -50,6 +51,7 @@ def update_mypage(data: MypageUpdateRequest, db: Session = Depends(get_db)):
         db.add(UserPreference(user_id=user.id, preference_type="비선호", menu_name=dislike))
 
     db.commit()
+    invalidate_user(user.id)
 
     return {"msg": "마이페이지 정보가 저장되었습니다."}
 
@@ -4,6 +4,7 @@ from models import User, UserAllergy, UserDisease, UserPreference, SessionLocal
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import Optional
+from ai.features import invalidate_user
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -142,5 +143,6 @@ def update_user(user_data: UserUpdate, db: Session = Depends(get_db)):
                 db.add(UserPreference(user_id=user.id, preference_type="비선호", menu_name=menu.strip()))
 
     db.commit()
+    invalidate_user(user.id)
 
     return {"msg": "User info updated"}
@@ -0,0 +1,141 @@
+# --- ai.llm_scheduler 재시도/백오프/우선순위 테스트 ---
+# 실행: python -m pytest tests/test_llm_scheduler.py
+# 429를 내는 가짜 업스트림(ai.backends.FakeUpstream)을 스케줄러 뒤에 두고 확인한다.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai import metrics
+from ai.backends import FakeRateLimitError, FakeUpstream
+from ai.llm_scheduler import DeadlineExceeded, LLMScheduler, deadline_scope
+
+
+def counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_rate_limited_calls_are_retried_after_retry_after():
+    upstream = FakeUpstream(limit=2, window=0.3)
+    scheduler = LLMScheduler(requests_per_minute=60000, name="test_sched_retry")
+
+    started = time.monotonic()
+    results = [scheduler.run(lambda: upstream.admit() or "ok") for _ in range(4)]
+    elapsed = time.monotonic() - started
+
+    assert results == ["ok"] * 4
+    assert upstream.accepted == 4 and upstream.rejected >= 1
+    assert counter("test_sched_retry.retries") == upstream.rejected
+    assert counter("test_sched_retry.rate_limited") == upstream.rejected
+    # 3번째 호출은 Retry-After(윈도가 비는 시각)까지 멈췄다가 다시 나간다
+    assert elapsed >= 0.25
+    assert scheduler.paused_until > 0
+
+
+def test_pause_holds_back_other_waiters():
+    scheduler = LLMScheduler(requests_per_minute=60000, name="test_sched_pause")
+    scheduler.paused_until = time.monotonic() + 0.2
+
+    started = time.monotonic()
+    scheduler.run(lambda: None)
+    assert time.monotonic() - started >= 0.18
+
+
+def test_gives_up_after_max_retries():
+    upstream = FakeUpstream(limit=1, window=0.2)
+    scheduler = LLMScheduler(requests_per_minute=60000, max_retries=0, name="test_sched_give_up")
+
+    scheduler.run(upstream.admit)
+    with pytest.raises(FakeRateLimitError):
+        scheduler.run(upstream.admit)
+    assert counter("test_sched_give_up.gave_up") == 1
+    assert counter("test_sched_give_up.retries") == 0
+
+
+def test_non_retryable_errors_are_not_retried():
+    scheduler = LLMScheduler(requests_per_minute=60000, name="test_sched_value_error")
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.run(fail)
+    assert len(calls) == 1
+
+
+def test_priority_order_when_bucket_is_empty():
+    # 초당 10건, 버킷 5건. 버킷을 비워 두면 대기열 순서대로 0.1초 간격으로 허가된다
+    scheduler = LLMScheduler(requests_per_minute=600, burst_seconds=0.5, name="test_sched_priority")
+    upstream = FakeUpstream(limit=100)
+    scheduler.requests.take(scheduler.requests.capacity)
+    order = []
+
+    async def call(priority: str):
+        async def send():
+            upstream.admit()
+            order.append(priority)
+        await scheduler.arun(send, priority=priority)
+
+    async def main():
+        tasks = []
+        for priority in ["batch", "chat", "batch", "stream", "chat"]:
+            tasks.append(asyncio.create_task(call(priority)))
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["stream", "chat", "chat", "batch", "batch"]
+    assert upstream.accepted == 5
+
+
+def test_thread_and_async_callers_share_the_queue():
+    scheduler = LLMScheduler(requests_per_minute=600, burst_seconds=0.5, name="test_sched_mixed")
+    scheduler.requests.take(scheduler.requests.capacity)
+    order = []
+
+    thread = threading.Thread(target=lambda: scheduler.run(lambda: order.append("thread"), priority="batch"))
+    thread.start()
+    time.sleep(0.01)
+
+    async def send():
+        order.append("stream")
+
+    async def main():
+        await scheduler.arun(send, priority="stream")
+
+    asyncio.run(main())
+    thread.join(timeout=2)
+    assert order == ["stream", "thread"]
+
+
+def test_deadline_stops_retries_that_would_overrun_it():
+    upstream = FakeUpstream(limit=1, window=1.0)
+    scheduler = LLMScheduler(requests_per_minute=60000, name="test_sched_deadline_retry")
+    scheduler.run(upstream.admit)
+
+    started = time.monotonic()
+    with deadline_scope(started + 0.2):
+        with pytest.raises(FakeRateLimitError):
+            scheduler.run(upstream.admit)
+    # Retry-After(~1초)를 기다리지 않고 바로 마지막 오류를 올린다
+    assert time.monotonic() - started < 0.1
+    assert counter("test_sched_deadline_retry.deadline_gave_up") == 1
+    assert counter("test_sched_deadline_retry.retries") == 0
+
+
+def test_deadline_removes_waiter_from_queue():
+    # 분당 6건: 버킷을 비우면 다음 허가까지 10초
+    scheduler = LLMScheduler(requests_per_minute=6, burst_seconds=10, name="test_sched_deadline_wait")
+    scheduler.requests.take(scheduler.requests.capacity)
+
+    started = time.monotonic()
+    with deadline_scope(started + 0.1):
+        with pytest.raises(DeadlineExceeded):
+            scheduler.run(lambda: None)
+    assert 0.09 <= time.monotonic() - started < 1.0
+    assert scheduler._waiting == [] and scheduler._waiters == {}
+    assert counter("test_sched_deadline_wait.deadline_exceeded") == 1
@@ -0,0 +1,73 @@
+# --- ai.sse 스트림 취소 테스트 ---
+# 실행: python -m pytest tests/test_sse.py
+# 로컬 가짜 스트리밍 LLM(ai.backends.FakeChatModel)을 upstream으로 두고 클라이언트 연결 종료를 흉내 낸다.
+
+import asyncio
+
+from ai import metrics, sse
+from ai.backends import FakeChatModel
+
+PROMPT = "오늘 점심 메뉴 추천해줘"
+
+
+class DisconnectingRequest:
+    """connected_checks번 확인까지는 연결돼 있다가 그 뒤로는 끊긴 것으로 응답하는 가짜 Request"""
+
+    def __init__(self, connected_checks: int):
+        self.connected_checks = connected_checks
+        self.checks = 0
+
+    async def is_disconnected(self) -> bool:
+        self.checks += 1
+        return self.checks > self.connected_checks
+
+
+def counter(name: str) -> int:
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def tracked_upstream(state: dict):
+    model = FakeChatModel(latency=0.0, tokens_per_second=500)
+
+    async def tokens():
+        try:
+            async for chunk in model.astream(PROMPT):
+                state["tokens"] += 1
+                yield chunk.content
+        finally:
+            state["closed"] = True
+
+    return tokens()
+
+
+async def collect(frames) -> list[str]:
+    return [frame async for frame in frames]
+
+
+def test_disconnect_closes_upstream_and_releases_slot():
+    state = {"tokens": 0, "closed": False}
+    aborted = counter("test_sse.aborted")
+
+    frames = asyncio.run(collect(sse.stream_events(
+        tracked_upstream(state), "오류", name="test_sse", request=DisconnectingRequest(connected_checks=1),
+        flush_bytes=1, heartbeat_interval=0.05,
+    )))
+
+    assert state["closed"]
+    assert len(frames) == 1 and sse.END_FRAME not in frames
+    assert sse.stream_slots._value == sse.MAX_CONCURRENT_STREAMS
+    assert counter("test_sse.aborted") == aborted + 1
+
+
+def test_completed_stream_ends_normally():
+    state = {"tokens": 0, "closed": False}
+    aborted = counter("test_sse_complete.aborted")
+
+    frames = asyncio.run(collect(sse.stream_events(
+        tracked_upstream(state), "오류", name="test_sse_complete", request=DisconnectingRequest(connected_checks=10 ** 6),
+    )))
+
+    assert state["closed"] and state["tokens"] > 1
+    assert frames[-1] == sse.END_FRAME
+    assert sse.stream_slots._value == sse.MAX_CONCURRENT_STREAMS
+    assert counter("test_sse_complete.aborted") == aborted